@@ -1,9 +1,32 @@
 # proyectos/admin.py
 from django.contrib import admin
-from .models import Proyecto
+from .models import Blob, CorreoSaliente, Proyecto, Tarea
 
 @admin.register(Proyecto)
 class ProyectoAdmin(admin.ModelAdmin):
     list_display = ('titulo', 'autor', 'carrera', 'año', 'tipo', 'fecha_subida', 'descargas', 'creado_por')
     search_fields = ('titulo', 'autor', 'descripcion', 'sinopsis')
     list_filter = ('carrera', 'tipo', 'fecha_subida')
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'proyecto', 'estado', 'intentos', 'ejecutar_despues', 'actualizada')
+    list_filter = ('tipo', 'estado')
+    search_fields = ('traza',)
+    readonly_fields = ('creada', 'actualizada', 'traza')
+
+
+@admin.register(CorreoSaliente)
+class CorreoSalienteAdmin(admin.ModelAdmin):
+    list_display = ('asunto', 'estado', 'intentos', 'ejecutar_despues', 'enviado')
+    list_filter = ('estado',)
+    search_fields = ('asunto', 'destinatarios')
+    readonly_fields = ('creado', 'enviado')
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'tamano', 'referencias', 'creado')
+    search_fields = ('nombre', 'digest')
+    readonly_fields = ('nombre', 'digest', 'tamano', 'creado')
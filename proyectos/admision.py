@@ -0,0 +1,155 @@
+# proyectos/admision.py
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# CONTROL DE ADMISIÓN PARA GEMINI
+# ------------------------------------
+# Tres capas antes de pagar una llamada:
+#   1. Cubeta de tokens por usuario/IP (en la vista): 429 si se agota.
+#   2. Single-flight: prompts idénticos en vuelo comparten una llamada.
+#   3. Sólo quien llama de verdad gasta la cubeta global y ocupa la cola;
+#      si la cubeta se agota o la cola está llena, 503 con Retry-After.
+#      La cubeta global cuenta llamadas a Gemini: una sinopsis por
+#      fragmentos gasta además un token por fragmento (tomar_global).
+# Las cubetas viven en la caché compartida (todos los workers). Sin
+# operaciones atómicas pueden dejar pasar alguna petición de más en una
+# carrera, lo cual basta para proteger la cuota.
+
+CLIENTE_CAPACIDAD = getattr(settings, "SINOPSIS_CLIENTE_CAPACIDAD", 5)
+CLIENTE_POR_MINUTO = getattr(settings, "SINOPSIS_CLIENTE_POR_MINUTO", 5)
+GLOBAL_CAPACIDAD = getattr(settings, "SINOPSIS_GLOBAL_CAPACIDAD", 30)
+GLOBAL_POR_MINUTO = getattr(settings, "SINOPSIS_GLOBAL_POR_MINUTO", 60)
+MAX_COLA = getattr(settings, "SINOPSIS_MAX_COLA", 32)
+
+# Cabecera con la IP real detrás de un proxy (p. ej. "X-Forwarded-For")
+CABECERA_IP = getattr(settings, "ADMISION_CABECERA_IP", None)
+
+metricas = Counter()  # admitidas, encoladas, coalescidas, llamadas, rechazadas_*
+
+
+class Rechazado(Exception):
+    def __init__(self, estado, reintentar, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.reintentar = max(1, int(reintentar + 0.999))
+        self.mensaje = mensaje
+
+
+# ------------------------------------
+# CUBETAS DE TOKENS
+# ------------------------------------
+async def _tomar(clave, capacidad, por_minuto, cantidad=1):
+    """Gasta `cantidad` tokens; devuelve 0 o los segundos hasta que los haya."""
+    # Más que la capacidad no cabría nunca: se cobra la cubeta llena
+    cantidad = min(cantidad, capacidad)
+    por_segundo = por_minuto / 60
+    ahora = time.time()
+    tokens, marca = await cache.aget(clave, (capacidad, ahora))
+    tokens = min(capacidad, tokens + (ahora - marca) * por_segundo)
+    if tokens < cantidad:
+        return (cantidad - tokens) / por_segundo
+    await cache.aset(clave, (tokens - cantidad, ahora), int(capacidad / por_segundo) + 60)
+    return 0
+
+
+def _identidad(request, usuario):
+    if usuario.is_authenticated:
+        return f"u{usuario.pk}"
+    if CABECERA_IP and request.headers.get(CABECERA_IP):
+        return "ip" + request.headers[CABECERA_IP].split(",")[0].strip()
+    return "ip" + request.META.get("REMOTE_ADDR", "")
+
+
+async def limitar_cliente(request):
+    usuario = await request.auser()
+    espera = await _tomar(
+        f"admision:cliente:{_identidad(request, usuario)}",
+        CLIENTE_CAPACIDAD, CLIENTE_POR_MINUTO,
+    )
+    if espera:
+        metricas["rechazadas_cliente"] += 1
+        logger.info("Sinopsis rechazada por límite de cliente (%s)", _identidad(request, usuario))
+        raise Rechazado(429, espera, "Has hecho demasiadas solicitudes. Espera un momento e inténtalo de nuevo.")
+    metricas["admitidas"] += 1
+
+
+# ------------------------------------
+# SINGLE-FLIGHT Y COLA
+# ------------------------------------
+_vuelos = weakref.WeakKeyDictionary()  # loop -> {clave: Task}
+_lock = threading.Lock()
+_en_cola = 0
+
+
+def _vuelos_del_loop():
+    loop = asyncio.get_running_loop()
+    if loop not in _vuelos:
+        _vuelos[loop] = {}
+    return _vuelos[loop]
+
+
+async def una_vez(clave, funcion):
+    """Ejecuta `funcion()` (corrutina) una sola vez por `clave` a la vez;
+    las peticiones idénticas que llegan mientras tanto esperan el mismo resultado."""
+    vuelos = _vuelos_del_loop()
+    tarea = vuelos.get(clave)
+    if tarea is None:
+        tarea = asyncio.ensure_future(funcion())
+        vuelos[clave] = tarea
+        tarea.add_done_callback(lambda _: vuelos.pop(clave, None))
+    else:
+        metricas["coalescidas"] += 1
+    # shield: si un cliente se desconecta no se cancela la llamada de los demás
+    return await asyncio.shield(tarea)
+
+
+async def entrar_en_cola():
+    """Para quien va a llamar a Gemini: cubeta global y límite de cola."""
+    global _en_cola
+
+    with _lock:
+        if _en_cola >= MAX_COLA:
+            metricas["rechazadas_cola"] += 1
+            logger.warning("Sinopsis rechazada: cola llena (%s)", _en_cola)
+            raise Rechazado(503, 5, "Hay demasiadas sinopsis en proceso. Inténtalo en unos segundos.")
+        _en_cola += 1
+
+    try:
+        await tomar_global()
+    except Rechazado:
+        salir_de_cola()
+        raise
+    metricas["encoladas"] += 1
+
+
+async def tomar_global(cantidad=1):
+    """Gasta `cantidad` llamadas de la cubeta global o lanza Rechazado (503)."""
+    espera = await _tomar("admision:global", GLOBAL_CAPACIDAD, GLOBAL_POR_MINUTO, cantidad)
+    if espera:
+        metricas["rechazadas_global"] += 1
+        logger.warning("Sinopsis rechazada: cubeta global agotada (%s llamadas)", cantidad)
+        raise Rechazado(503, espera, "El servicio de IA está saturado. Inténtalo en unos segundos.")
+
+
+def salir_de_cola():
+    global _en_cola
+    with _lock:
+        _en_cola -= 1
+
+
+def estado():
+    return {
+        **metricas,
+        "en_cola": _en_cola,
+        "en_vuelo": sum(len(v) for v in list(_vuelos.values())),
+    }
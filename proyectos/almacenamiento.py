@@ -0,0 +1,156 @@
+# proyectos/almacenamiento.py
+import hashlib
+import logging
+import os
+import re
+import shutil
+import uuid
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import trazas
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# ALMACENAMIENTO DIRECCIONADO POR CONTENIDO
+# ------------------------------------
+# Cada archivo subido se guarda una sola vez con el sha256 de su contenido:
+#   proyectos/ab/ab12….pdf
+# El hash se calcula mientras se escribe (una sola pasada). Si ya existía,
+# se descarta la copia. La tabla Blob lleva la cuenta de referencias: cada
+# save() suma una al confirmarse la transacción que lo llamó y cada
+# delete() resta una; el archivo (con sus vistas previas y miniaturas)
+# sólo se borra del disco cuando llega a cero y ningún proyecto lo usa.
+# Como el nombre depende sólo del contenido, las vistas previas, miniaturas
+# y el texto extraído se reutilizan entre proyectos con el mismo documento.
+
+TAMANO_BLOQUE = 64 * 1024
+
+_BLOB = re.compile(r"(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.[^/]*)?$")
+
+
+def ruta_blob(directorio, digest, extension):
+    return f"{directorio}/{digest[:2]}/{digest}{extension}".lstrip("/")
+
+
+def es_blob(nombre):
+    """True si `nombre` tiene la forma de ruta_blob (su contenido no puede cambiar)."""
+    return bool(_BLOB.search(nombre))
+
+
+def calcular_digest(ruta):
+    hasher = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b""):
+            hasher.update(bloque)
+    return hasher.hexdigest()
+
+
+class _Contando:
+    """Lo que FileSystemStorage._save necesita de `content`, calculando el hash al pasar."""
+
+    def __init__(self, contenido, hasher):
+        self._contenido = contenido
+        self._hasher = hasher
+
+    def chunks(self, chunk_size=None):
+        for bloque in self._contenido.chunks(chunk_size):
+            if isinstance(bloque, str):
+                bloque = bloque.encode()
+            self._hasher.update(bloque)
+            yield bloque
+
+
+class AlmacenamientoDeduplicado(FileSystemStorage):
+    def _save(self, name, content):
+        from .models import Blob
+
+        with trazas.tramo("almacenar") as tramo:
+            directorio = os.path.dirname(name)
+            extension = os.path.splitext(name)[1].lower()
+            temporal = f"{directorio}/.subida-{uuid.uuid4().hex}{extension}".lstrip("/")
+
+            if hasattr(content, "temporary_file_path"):
+                # Subida grande ya en /tmp: se hashea allí y se mueve sin copiar
+                digest = calcular_digest(content.temporary_file_path())
+                temporal = super()._save(temporal, content)
+            else:
+                hasher = hashlib.sha256()
+                temporal = super()._save(temporal, _Contando(content, hasher))
+                digest = hasher.hexdigest()
+
+            nombre = ruta_blob(directorio, digest, extension)
+            tamano = os.path.getsize(self.path(temporal))
+
+            # Con la fila del blob bloqueada un delete() no puede borrar el
+            # archivo entre que se comprueba que existe y se usa
+            with transaction.atomic():
+                Blob.objects.get_or_create(nombre=nombre, defaults={"digest": digest, "tamano": tamano})
+                Blob.objects.select_for_update().get(nombre=nombre)
+                duplicado = self.exists(nombre)
+                if duplicado:
+                    super().delete(temporal)
+                else:
+                    os.makedirs(os.path.dirname(self.path(nombre)), exist_ok=True)
+                    os.replace(self.path(temporal), self.path(nombre))
+            tramo.anotar(bytes=tamano, duplicado=duplicado)
+
+        # La referencia cuenta cuando se confirma la transacción de quien
+        # guarda (p. ej. el proyecto): si se revierte, no queda referencia.
+        transaction.on_commit(lambda: self._retener(nombre))
+        return nombre
+
+    def _retener(self, nombre):
+        from .models import Blob
+
+        with transaction.atomic():
+            if not Blob.objects.filter(nombre=nombre).update(referencias=F("referencias") + 1):
+                logger.error("Se perdió el blob %s antes de contar su referencia", nombre)
+
+    def delete(self, name):
+        from .models import Blob, Proyecto
+
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(nombre=name).first()
+            if blob is None:
+                # Archivo de antes de la deduplicación: tiene un solo dueño
+                return super().delete(name)
+
+            if blob.referencias > 1:
+                Blob.objects.filter(pk=blob.pk).update(referencias=F("referencias") - 1)
+                return
+
+            # Última referencia contada. Un proyecto ya confirmado cuya
+            # referencia aún no se sumó (on_commit pendiente) lo mantiene vivo.
+            if Proyecto.objects.filter(Q(archivo=name) | Q(portada=name)).exists():
+                Blob.objects.filter(pk=blob.pk).update(referencias=0)
+                return
+
+            blob.delete()
+            transaction.on_commit(lambda: self._borrar_archivo(name))
+
+    def _borrar_archivo(self, name):
+        super().delete(name)
+        borrar_derivados(name)
+
+
+def borrar_derivados(nombre):
+    """Vistas previas y miniaturas generadas a partir de `nombre`."""
+    from django.core.files.storage import default_storage
+
+    from . import miniaturas, vista_previa
+
+    directorios = [f"{vista_previa.PREFIJO}{nombre}"]
+    directorios += [f"{miniaturas.PREFIJO}{variante}/{nombre}" for variante in miniaturas.VARIANTES]
+    for directorio in directorios:
+        ruta = default_storage.path(directorio)
+        if os.path.isdir(ruta):
+            shutil.rmtree(ruta)
+
+
+def almacenamiento_deduplicado():
+    # Callable para FileField(storage=...): la migración no congela la instancia
+    return storages["deduplicado"]
@@ -7,3 +7,12 @@ class ProyectosConfig(AppConfig):
 
     def ready(self):
         import proyectos.signals
+
+        from django.db.backends.signals import connection_created
+        from proyectos.metricas import instrumentar_conexion
+        connection_created.connect(instrumentar_conexion)
+
+        from django.conf import settings
+        if getattr(settings, "PRECARGAR_DEPENDENCIAS", False):
+            from proyectos.utils import precargar
+            precargar()
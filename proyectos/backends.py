@@ -0,0 +1,39 @@
+# proyectos/backends.py
+from django.contrib.auth.backends import ModelBackend
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import metricas
+from .models import Usuario
+
+
+class BackendConPerfil(ModelBackend):
+    """ModelBackend que carga el usuario de la sesión junto con su Perfil
+    (un solo JOIN): la barra de navegación y `perfil` no consultan de nuevo."""
+
+    def get_user(self, user_id):
+        try:
+            usuario = Usuario._default_manager.select_related("perfil").get(pk=user_id)
+        except Usuario.DoesNotExist:
+            return None
+        return usuario if self.user_can_authenticate(usuario) else None
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """DjangoTemplates cuyas plantillas suman su tiempo de render a las
+    métricas de la petición (ver metricas.py)."""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return PlantillaMedida(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        with metricas.medir_plantilla():
+            return super().render(context, request)
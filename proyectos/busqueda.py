@@ -0,0 +1,218 @@
+# proyectos/busqueda.py
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# ------------------------------------
+# BÚSQUEDA DE TEXTO COMPLETO
+# ------------------------------------
+# El índice se crea en la migración 0002:
+#   - PostgreSQL: columna generada "busqueda" (tsvector) + índice GIN
+#   - SQLite: tabla virtual FTS5 sincronizada con triggers
+# Cubre titulo, descripcion, sinopsis_ia y texto_extraido.
+
+TABLA = "proyectos_proyecto"
+TABLA_FTS = "proyectos_proyecto_fts"
+
+# Pesos por columna (titulo, descripcion, sinopsis_ia, texto_extraido)
+PESOS_FTS = (10.0, 4.0, 4.0, 1.0)
+
+# tsvector admite como máximo 1MB; se indexa sólo el inicio del documento
+MAX_CARACTERES_INDICE = 200000
+
+COLUMNA_BUSQUEDA_PG = f"""
+ALTER TABLE {TABLA} ADD COLUMN busqueda tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('spanish', coalesce(titulo, '')), 'A') ||
+    setweight(to_tsvector('spanish', coalesce(descripcion, '')), 'B') ||
+    setweight(to_tsvector('spanish', coalesce(sinopsis_ia, '')), 'B') ||
+    setweight(to_tsvector('spanish', left(coalesce(texto_extraido, ''), {MAX_CARACTERES_INDICE})), 'C')
+) STORED
+"""
+
+INDICE_BUSQUEDA_PG = f"CREATE INDEX {TABLA}_busqueda_gin ON {TABLA} USING gin (busqueda)"
+
+TABLA_FTS5 = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+    titulo, descripcion, sinopsis_ia, texto_extraido,
+    content='{TABLA}', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+
+# Sólo se reindexa cuando cambian las columnas indexadas (no en descargas)
+TRIGGERS_FTS5 = {
+    f"{TABLA_FTS}_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {TABLA} BEGIN
+            INSERT INTO {TABLA_FTS}(rowid, titulo, descripcion, sinopsis_ia, texto_extraido)
+            VALUES (new.id, new.titulo, new.descripcion, new.sinopsis_ia, new.texto_extraido);
+        END
+    """,
+    f"{TABLA_FTS}_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {TABLA} BEGIN
+            INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, titulo, descripcion, sinopsis_ia, texto_extraido)
+            VALUES ('delete', old.id, old.titulo, old.descripcion, old.sinopsis_ia, old.texto_extraido);
+        END
+    """,
+    f"{TABLA_FTS}_au": f"""
+        CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au
+        AFTER UPDATE OF titulo, descripcion, sinopsis_ia, texto_extraido ON {TABLA} BEGIN
+            INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, titulo, descripcion, sinopsis_ia, texto_extraido)
+            VALUES ('delete', old.id, old.titulo, old.descripcion, old.sinopsis_ia, old.texto_extraido);
+            INSERT INTO {TABLA_FTS}(rowid, titulo, descripcion, sinopsis_ia, texto_extraido)
+            VALUES (new.id, new.titulo, new.descripcion, new.sinopsis_ia, new.texto_extraido);
+        END
+    """,
+}
+
+
+def crear_indice(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(COLUMNA_BUSQUEDA_PG)
+        schema_editor.execute(INDICE_BUSQUEDA_PG)
+    elif vendor == "sqlite":
+        schema_editor.execute(TABLA_FTS5)
+        for sql in TRIGGERS_FTS5.values():
+            schema_editor.execute(sql)
+        schema_editor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+
+
+def eliminar_indice(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TABLA}_busqueda_gin")
+        schema_editor.execute(f"ALTER TABLE {TABLA} DROP COLUMN IF EXISTS busqueda")
+    elif vendor == "sqlite":
+        for nombre in TRIGGERS_FTS5:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+
+
+def asegurar_triggers_sqlite(using="default"):
+    # En SQLite, algunas migraciones reconstruyen la tabla de proyectos y
+    # con ello se pierden los triggers; se recrean y se reindexa.
+    conexion = connections[using]
+    if conexion.vendor != "sqlite":
+        return
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [f"{TABLA_FTS}%"],
+        )
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        if TABLA_FTS not in existentes or existentes.issuperset(TRIGGERS_FTS5):
+            return
+        for sql in TRIGGERS_FTS5.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+
+
+# ------------------------------------
+# TRIGRAMAS PARA titulo__icontains
+# ------------------------------------
+# En PostgreSQL, icontains se traduce a UPPER("titulo") LIKE UPPER('%...%').
+# Un índice GIN con gin_trgm_ops sobre esa misma expresión evita el
+# recorrido completo de la tabla (filtro de título, admin).
+INDICE_TITULO_TRGM_PG = (
+    f'CREATE INDEX IF NOT EXISTS {TABLA}_titulo_trgm ON {TABLA} '
+    f'USING gin (UPPER("titulo") gin_trgm_ops)'
+)
+
+
+def crear_indice_titulo(schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(INDICE_TITULO_TRGM_PG)
+
+
+def eliminar_indice_titulo(schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TABLA}_titulo_trgm")
+
+
+def _consulta_fts5(q):
+    # Cada palabra se cita para que el usuario no pueda inyectar
+    # operadores FTS5; el * final permite buscar por prefijo.
+    palabras = [p.replace('"', '""') for p in q.split()]
+    return " ".join(f'"{p}"*' for p in palabras if p)
+
+
+def buscar_proyectos(queryset, q):
+    """Filtra `queryset` por `q` y lo ordena por relevancia (campo `rank`)."""
+    q = (q or "").strip()
+    if not q:
+        return queryset
+
+    if connection.vendor == "postgresql":
+        consulta = "websearch_to_tsquery('spanish', %s)"
+        coincide = RawSQL(
+            f'"{TABLA}"."busqueda" @@ {consulta}', (q,),
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f'ts_rank_cd("{TABLA}"."busqueda", {consulta})', (q,),
+            output_field=FloatField(),
+        )
+
+    elif connection.vendor == "sqlite":
+        consulta = _consulta_fts5(q)
+        if not consulta:
+            return queryset.none()
+        pesos = ", ".join(str(p) for p in PESOS_FTS)
+        coincide = RawSQL(
+            f'"{TABLA}"."id" IN (SELECT rowid FROM {TABLA_FTS} '
+            f'WHERE {TABLA_FTS} MATCH %s)', (consulta,),
+            output_field=BooleanField(),
+        )
+        # bm25() es menor cuanto más relevante; se invierte el signo.
+        # Las puntuaciones se calculan una vez en una subconsulta (LIMIT -1
+        # evita que SQLite la aplane): con MATCH dentro de la subconsulta
+        # correlacionada se repetía la búsqueda por cada fila y una palabra
+        # común sobre 20k proyectos tardaba minutos.
+        rank = RawSQL(
+            f'(SELECT m.rank FROM (SELECT rowid AS id, -bm25({TABLA_FTS}, {pesos}) AS rank '
+            f'FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s LIMIT -1) AS m '
+            f'WHERE m.id = "{TABLA}"."id")', (consulta,),
+            output_field=FloatField(),
+        )
+
+    else:
+        # Otros motores: sin índice, búsqueda simple por subcadena
+        return queryset.filter(
+            Q(titulo__icontains=q)
+            | Q(descripcion__icontains=q)
+            | Q(sinopsis_ia__icontains=q)
+            | Q(texto_extraido__icontains=q)
+        ).annotate(rank=Value(0.0, output_field=FloatField()))
+
+    return (
+        queryset.filter(coincide)
+        .annotate(rank=rank)
+        .order_by("-rank", "-fecha_subida")
+    )
+
+
+# ------------------------------------
+# FILTROS DEL CATÁLOGO
+# ------------------------------------
+def filtrar_proyectos(queryset, params):
+    """Aplica los filtros q/tipo/carrera/año de `params` (p. ej. request.GET)."""
+    tipo = params.get("tipo", "")
+    carrera = params.get("carrera", "")
+    año = params.get("año", "")
+    q = params.get("q", "")
+
+    if tipo:
+        queryset = queryset.filter(tipo=tipo)
+
+    if carrera:
+        queryset = queryset.filter(carrera=carrera)
+
+    if año.isdigit():
+        queryset = queryset.filter(año=int(año))
+
+    # búsqueda de texto completo, ordenada por relevancia
+    if q:
+        queryset = buscar_proyectos(queryset, q)
+
+    return queryset
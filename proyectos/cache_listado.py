@@ -0,0 +1,84 @@
+# proyectos/cache_listado.py
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+# ------------------------------------
+# CACHÉ DEL LISTADO DE INICIO
+# ------------------------------------
+# Se guarda el HTML ya renderizado de las tarjetas + paginación, con clave
+#   listado:<generación>:<hash de filtros normalizados y cursor>
+# Cualquier alta, edición o baja de un proyecto sube la generación (señales
+# en signals.py), así que las claves viejas dejan de usarse al instante y
+# caducan solas. Cada subida guarda también la hora del cambio, que la API
+# usa como Last-Modified del catálogo (las bajas también cuentan).
+
+TIEMPO = getattr(settings, "LISTADO_CACHE_SEGUNDOS", 600)
+CLAVE_GENERACION = "listado:generacion"
+CLAVE_MODIFICADO = "listado:modificado"
+
+PARAMETROS = ("q", "tipo", "carrera", "año", "cursor")
+
+
+def generacion():
+    valor = cache.get(CLAVE_GENERACION)
+    if valor is None:
+        # Se parte de la hora actual: si la clave se pierde (reinicio,
+        # desalojo) nunca se vuelve a una generación ya usada
+        cache.add(CLAVE_GENERACION, time.time_ns())
+        valor = cache.get(CLAVE_GENERACION, 0)
+    return valor
+
+
+def invalidar():
+    try:
+        cache.incr(CLAVE_GENERACION)
+    except ValueError:
+        cache.set(CLAVE_GENERACION, time.time_ns(), None)
+    cache.set(CLAVE_MODIFICADO, time.time(), None)
+
+
+def modificado():
+    """Hora (epoch) del último cambio en el catálogo. Si la clave se pierde
+    se toma la actual: un Last-Modified más nuevo nunca da un 304 falso."""
+    valor = cache.get(CLAVE_MODIFICADO)
+    if valor is None:
+        cache.add(CLAVE_MODIFICADO, time.time(), None)
+        valor = cache.get(CLAVE_MODIFICADO) or time.time()
+    return valor
+
+
+def normalizar(params):
+    """Los PARAMETROS tal como entran en la clave: espacios colapsados y q en minúsculas."""
+    valores = {}
+    for nombre in PARAMETROS:
+        valor = " ".join(params.get(nombre, "").split())
+        if nombre == "q":
+            valor = valor.lower()
+        valores[nombre] = valor
+    return valores
+
+
+def querystring(params):
+    """Filtros normalizados, sin el cursor, para los enlaces de paginación."""
+    return urlencode({n: v for n, v in normalizar(params).items() if v and n != "cursor"})
+
+
+def clave(params):
+    firma = "&".join(f"{n}={v}" for n, v in normalizar(params).items())
+    resumen = hashlib.sha256(firma.encode("utf-8")).hexdigest()
+    return f"listado:{generacion()}:{resumen}"
+
+
+def obtener(params, construir):
+    """Devuelve el HTML del listado para `params`; si no está en caché
+    llama a `construir()` y lo guarda."""
+    k = clave(params)
+    html = cache.get(k)
+    if html is None:
+        html = construir()
+        cache.set(k, html, TIEMPO)
+    return html
@@ -0,0 +1,102 @@
+# proyectos/cache_sinopsis.py
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+
+from .models import SinopsisCache
+
+# ------------------------------------
+# CACHÉ DE SINOPSIS (LRU EN MEMORIA + TABLA)
+# ------------------------------------
+# El mismo texto con el mismo modelo y prompt produce la misma sinopsis,
+# así que no se vuelve a pagar la llamada a Gemini por re-subidas o
+# peticiones repetidas.
+
+TAMANO_LRU = getattr(settings, "SINOPSIS_CACHE_TAMANO", 256)
+
+contadores = Counter()  # aciertos_memoria, aciertos_bd, fallos
+
+
+class CacheLRU:
+    def __init__(self, tamano):
+        self.tamano = tamano
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            if clave not in self._datos:
+                return None
+            self._datos.move_to_end(clave)
+            return self._datos[clave]
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano:
+                self._datos.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+_lru = CacheLRU(TAMANO_LRU)
+
+
+def normalizar(texto):
+    # Los saltos de línea y espacios extra de la extracción no cambian el contenido
+    return " ".join(texto.split())
+
+
+def calcular_clave(texto_normalizado, modelo, version_prompt):
+    h = hashlib.sha256()
+    h.update(f"{modelo}\n{version_prompt}\n".encode())
+    h.update(texto_normalizado.encode())
+    return h.hexdigest()
+
+
+def obtener(clave):
+    sinopsis = _lru.get(clave)
+    if sinopsis is not None:
+        contadores["aciertos_memoria"] += 1
+        return sinopsis
+
+    sinopsis = (
+        SinopsisCache.objects.filter(clave=clave)
+        .values_list("sinopsis", flat=True)
+        .first()
+    )
+    if sinopsis is not None:
+        contadores["aciertos_bd"] += 1
+        _lru.set(clave, sinopsis)
+        return sinopsis
+
+    contadores["fallos"] += 1
+    return None
+
+
+def guardar(clave, sinopsis, modelo):
+    SinopsisCache.objects.update_or_create(
+        clave=clave,
+        defaults={"sinopsis": sinopsis, "modelo": modelo},
+    )
+    _lru.set(clave, sinopsis)
+
+
+def estadisticas():
+    aciertos = contadores["aciertos_memoria"] + contadores["aciertos_bd"]
+    total = aciertos + contadores["fallos"]
+    return {
+        "aciertos_memoria": contadores["aciertos_memoria"],
+        "aciertos_bd": contadores["aciertos_bd"],
+        "fallos": contadores["fallos"],
+        "tasa_aciertos": aciertos / total if total else 0.0,
+        "entradas_memoria": len(_lru),
+    }
@@ -0,0 +1,230 @@
+# proyectos/catalogo_sintetico.py
+import random
+import time
+import unicodedata
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import cache_listado, estadisticas
+from .models import Blob, Perfil, Proyecto, Tarea, Usuario
+
+# ------------------------------------
+# CATÁLOGO SINTÉTICO
+# ------------------------------------
+# Genera proyectos realistas para pruebas de carga (sembrar_catalogo,
+# benchmark_vistas). Todo lo creado cuelga de usuarios PREFIJO*, así que se
+# puede borrar sin tocar datos reales. Los documentos son unos pocos PDFs
+# pequeños y válidos, compartidos (como blobs) por todas las filas.
+
+PREFIJO = "sintetico_"
+
+PALABRAS = (
+    "sistema gestión análisis diseño control red datos energía agua "
+    "inventario prototipo sensor aplicación móvil web industrial calidad "
+    "procesos automatización costos mantenimiento seguridad logística"
+).split()
+
+# Pesos aproximados de un tecnológico: más ingenierías que otras carreras,
+# más informes que proyectos y más entregas en los años recientes
+PESOS_CARRERA = {
+    "Ingeniería en Sistemas Computacionales": 35,
+    "Mecatrónica": 25,
+    "Ingeniería en Sistemas Automotrices": 20,
+    "Arquitectura": 12,
+    "Contabilidad": 8,
+}
+PESOS_TIPO = {
+    "Informe de Investigación": 65,
+    "Proyecto de Investigación": 35,
+}
+AÑOS_RECIENTES = 6   # los últimos años concentran casi todo
+
+LOTE = 5000
+DOCUMENTOS = 20      # PDFs distintos
+
+
+def _sin_acentos(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+
+
+def pdf_muestra(titulo, parrafos):
+    """PDF mínimo de una página con texto extraíble (Helvetica, ASCII)."""
+    lineas = [_sin_acentos(titulo)] + [_sin_acentos(p) for p in parrafos]
+    texto = " T* ".join(
+        "(" + linea.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj"
+        for linea in lineas
+    )
+    contenido = f"BT /F1 11 Tf 14 TL 50 780 Td {texto} ET".encode()
+
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(contenido), contenido),
+    ]
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for numero, objeto in enumerate(objetos, 1):
+        posiciones.append(len(salida))
+        salida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    salida += b"".join(b"%010d 00000 n \n" % p for p in posiciones)
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    return bytes(salida)
+
+
+def _frase(rnd, palabras=8):
+    return " ".join(rnd.choice(PALABRAS) for _ in range(palabras)).capitalize() + "."
+
+
+def _documentos(rnd):
+    """Sube (o reutiliza) los PDFs de muestra; devuelve [(nombre, texto)]."""
+    storage = Proyecto._meta.get_field("archivo").storage
+    documentos = []
+    for i in range(DOCUMENTOS):
+        parrafos = [_frase(rnd, 12) for _ in range(20)]
+        nombre = storage.save(f"proyectos/muestra_{i}.pdf", ContentFile(pdf_muestra(f"Documento {i}", parrafos)))
+        documentos.append((nombre, "\n".join(parrafos)))
+    return documentos
+
+
+def _repartir_fechas(desde_id):
+    # fecha_subida es auto_now_add: se reparte dentro del año de cada fila
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                f"UPDATE {Proyecto._meta.db_table} SET fecha_subida = "
+                "make_timestamptz(coalesce(\"año\", 2024), 1, 1, 8, 0, 0) "
+                "+ (id %% 365) * interval '1 day' + (id %% 36000) * interval '1 second' "
+                "WHERE id > %s",
+                [desde_id],
+            )
+        else:
+            cursor.execute(
+                f"UPDATE {Proyecto._meta.db_table} SET fecha_subida = datetime("
+                "coalesce(\"año\", 2024) || '-01-01 08:00:00', "
+                "'+' || (id %% 365) || ' days', '+' || (id %% 36000) || ' seconds') "
+                "WHERE id > %s",
+                [desde_id],
+            )
+    # Nada en el futuro: la API ordena los deltas por `actualizado`
+    nuevos = Proyecto.objects.filter(id__gt=desde_id)
+    nuevos.filter(fecha_subida__gt=timezone.now()).update(fecha_subida=timezone.now())
+    nuevos.update(actualizado=F("fecha_subida"))
+
+
+def sembrar(filas, semilla=42, usuarios=200, progreso=None):
+    """Crea `filas` proyectos sintéticos. Devuelve los segundos que tardó."""
+    rnd = random.Random(semilla)
+    inicio = time.perf_counter()
+
+    existentes = Usuario.objects.filter(username__startswith=PREFIJO).count()
+    nuevos = Usuario.objects.bulk_create(
+        Usuario(username=f"{PREFIJO}{i}", password="!", rol="estudiante")
+        for i in range(existentes, existentes + usuarios)
+    )
+    # bulk_create no dispara la señal que crea el perfil
+    Perfil.objects.bulk_create(Perfil(usuario=u) for u in nuevos)
+
+    autores = list(Usuario.objects.filter(username__startswith=PREFIJO).only("id", "username"))
+    documentos = _documentos(rnd)
+
+    carreras, pesos_carrera = zip(*PESOS_CARRERA.items())
+    tipos, pesos_tipo = zip(*PESOS_TIPO.items())
+    años = [valor for valor, _ in Proyecto.AÑO_CHOICES]
+    actual = time.localtime().tm_year
+    pesos_año = [4 if actual - AÑOS_RECIENTES < a <= actual else (0 if a > actual else 1) for a in años]
+
+    ultimo_id = Proyecto.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    usos = {nombre: 0 for nombre, _ in documentos}
+
+    with transaction.atomic():
+        lote = []
+        for i in range(filas):
+            autor = rnd.choice(autores)
+            nombre, texto = rnd.choice(documentos)
+            usos[nombre] += 1
+            lote.append(Proyecto(
+                titulo=" ".join(rnd.sample(PALABRAS, 4)).capitalize() + f" {ultimo_id + i + 1}",
+                autor=autor.username,
+                descripcion=_frase(rnd, 20),
+                carrera=rnd.choices(carreras, pesos_carrera)[0],
+                tipo=rnd.choices(tipos, pesos_tipo)[0],
+                año=rnd.choices(años, pesos_año)[0],
+                archivo=nombre,
+                texto_extraido=texto,
+                sinopsis_ia=_frase(rnd, 30),
+                paginas_vista_previa=0,
+                # Pocas descargas para casi todos y muchas para unos pocos
+                descargas=min(int(rnd.paretovariate(1.2)) - 1, 100000),
+                creado_por=autor,
+            ))
+            if len(lote) == LOTE:
+                Proyecto.objects.bulk_create(lote)
+                lote = []
+                if progreso:
+                    progreso(i + 1)
+        Proyecto.objects.bulk_create(lote)
+
+        _repartir_fechas(ultimo_id)
+
+        # Cada fila es una referencia más a su blob; cada storage.save() ya
+        # sumó una, pero al confirmarse: el ajuste va detrás, también on_commit
+        def ajustar_referencias():
+            for nombre, veces in usos.items():
+                Blob.objects.filter(nombre=nombre).update(referencias=F("referencias") + veces - 1)
+
+        transaction.on_commit(ajustar_referencias)
+
+    estadisticas.recalcular()
+    cache_listado.invalidar()
+    _analizar()
+    return time.perf_counter() - inicio
+
+
+def limpiar():
+    """Borra todo lo sintético. DELETE directo: las señales por fila con 1M
+    de proyectos tardarían horas; luego se recalcula lo derivado."""
+    usuarios = Usuario.objects.filter(username__startswith=PREFIJO)
+    with transaction.atomic():
+        # Sólo se revisan los blobs de los proyectos sintéticos (los PDFs de
+        # muestra), nunca los subidos por usuarios reales
+        muestras = list(
+            Proyecto.objects.filter(creado_por__in=usuarios).order_by()
+            .values_list("archivo", flat=True).distinct()
+        )
+        Tarea.objects.filter(proyecto__creado_por__in=usuarios).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Proyecto._meta.db_table} WHERE creado_por_id IN "
+                f"(SELECT id FROM {Usuario._meta.db_table} WHERE username LIKE %s)",
+                [PREFIJO + "%"],
+            )
+            borrados = cursor.rowcount
+        usuarios.delete()
+
+        # Blobs de muestra: se borran si ya nadie los usa y, si no, sus
+        # referencias pasan a ser los usos que quedan (archivo o portada)
+        storage = Proyecto._meta.get_field("archivo").storage
+        for blob in Blob.objects.select_for_update().filter(nombre__in=muestras):
+            usos = Proyecto.objects.filter(Q(archivo=blob.nombre) | Q(portada=blob.nombre)).count()
+            if usos == 0:
+                blob.delete()
+                transaction.on_commit(lambda nombre=blob.nombre: storage.delete(nombre))
+            elif usos != blob.referencias:
+                Blob.objects.filter(pk=blob.pk).update(referencias=usos)
+
+    estadisticas.recalcular()
+    cache_listado.invalidar()
+    return borrados
+
+
+def _analizar():
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {Proyecto._meta.db_table}" if connection.vendor == "postgresql" else "ANALYZE")
@@ -0,0 +1,98 @@
+# proyectos/contadores.py
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Proyecto
+from . import estadisticas
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# CONTADOR DE DESCARGAS
+# ------------------------------------
+# Las descargas se acumulan en memoria (por proceso) y se vuelcan cada
+# INTERVALO_VOLCADO segundos con UPDATE ... SET descargas = descargas + n.
+# Un archivo muy descargado cuesta una escritura por intervalo y no una por
+# descarga, y el incremento atómico no pierde cuentas entre workers.
+#
+# Vuelca un hilo daemon por proceso, arrancado con la primera descarga (ya
+# en el worker, después del fork): las descargas pendientes llegan a la BD
+# aunque no haya más tráfico. Al terminar el proceso vuelca atexit.
+
+INTERVALO_VOLCADO = getattr(settings, "DESCARGAS_INTERVALO_VOLCADO", 10)  # segundos
+
+_pendientes = Counter()
+_lock = threading.Lock()
+_pid_volcador = None
+
+
+def registrar_descarga(proyecto_id):
+    global _pid_volcador
+
+    with _lock:
+        _pendientes[proyecto_id] += 1
+        arrancar = _pid_volcador != os.getpid()
+        if arrancar:
+            _pid_volcador = os.getpid()
+
+    if arrancar:
+        threading.Thread(target=_volcar_cada_intervalo, name="volcado-descargas", daemon=True).start()
+
+
+def _volcar_cada_intervalo():
+    while True:
+        time.sleep(INTERVALO_VOLCADO)
+        try:
+            volcar()
+        except Exception:
+            logger.exception("Falló el volcado periódico de descargas")
+        finally:
+            # Conexión propia de este hilo: no se deja abierta entre volcados
+            connection.close()
+
+
+def volcar():
+    """Escribe en la BD las descargas acumuladas y devuelve cuántas fueron."""
+    with _lock:
+        lote = Counter(_pendientes)
+        _pendientes.clear()
+
+    if not lote:
+        return 0
+
+    # Un UPDATE por cada cantidad distinta, no uno por proyecto
+    por_cantidad = defaultdict(list)
+    for proyecto_id, cantidad in lote.items():
+        por_cantidad[cantidad].append(proyecto_id)
+
+    try:
+        with transaction.atomic():
+            for cantidad, ids in sorted(por_cantidad.items()):
+                Proyecto.objects.filter(pk__in=sorted(ids)).update(
+                    descargas=F("descargas") + cantidad
+                )
+            estadisticas.registrar_descargas(lote)
+    except Exception:
+        # Se devuelven al búfer para el siguiente volcado
+        logger.exception("No se pudieron volcar %s descargas", sum(lote.values()))
+        with _lock:
+            _pendientes.update(lote)
+        return 0
+
+    return sum(lote.values())
+
+
+def pendientes():
+    with _lock:
+        return sum(_pendientes.values())
+
+
+atexit.register(volcar)
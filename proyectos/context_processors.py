@@ -0,0 +1,58 @@
+# proyectos/context_processors.py
+import time
+
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Perfil
+
+# ------------------------------------
+# DATOS DE LA BARRA DE NAVEGACIÓN
+# ------------------------------------
+# Avatar y nombre visible se guardan en la sesión junto con una versión por
+# usuario que vive en la caché; guardar el Usuario o su Perfil sube la
+# versión (signals.py) y la siguiente petición los vuelve a leer. Como en
+# cache_listado, una versión perdida se recrea con la hora actual y nunca
+# vuelve a un valor que pueda estar guardado en una sesión.
+
+CLAVE_SESION = "navegacion"
+
+
+def _clave_version(usuario_id):
+    return f"navegacion:version:{usuario_id}"
+
+
+def invalidar(usuario_id):
+    try:
+        cache.incr(_clave_version(usuario_id))
+    except ValueError:
+        cache.set(_clave_version(usuario_id), time.time_ns(), None)
+
+
+def _calcular(usuario):
+    try:
+        avatar = usuario.perfil.avatar.name
+    except Perfil.DoesNotExist:
+        avatar = ""
+    return {
+        "avatar": avatar,
+        "nombre": usuario.first_name or usuario.username,
+    }
+
+
+def navegacion(request):
+    usuario = getattr(request, "user", None)
+    if usuario is None or not usuario.is_authenticated:
+        return {}
+
+    def datos():
+        version = cache.get_or_set(_clave_version(usuario.pk), time.time_ns, None)
+        guardado = request.session.get(CLAVE_SESION)
+        if guardado and guardado.get("version") == version:
+            return guardado
+        guardado = {"version": version, **_calcular(usuario)}
+        request.session[CLAVE_SESION] = guardado
+        return guardado
+
+    # Perezoso: sólo se calcula si la plantilla lo usa, y una vez
+    return {"navegacion": SimpleLazyObject(datos)}
@@ -0,0 +1,163 @@
+# proyectos/correo.py
+import email.policy
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import CorreoSaliente
+from .tareas import calcular_retraso
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# BANDEJA DE SALIDA
+# ------------------------------------
+# EMAIL_BACKEND apunta a BackendBandeja: send_mail() (registro, allauth,
+# restablecer contraseña) sólo inserta el mensaje en CorreoSaliente.
+# `manage.py enviar_correos` los entrega por lotes con una sola conexión
+# SMTP (CORREO_BACKEND_ENVIO) y reintenta con backoff.
+
+BACKEND_ENVIO = getattr(settings, "CORREO_BACKEND_ENVIO", "django.core.mail.backends.smtp.EmailBackend")
+MAX_INTENTOS = getattr(settings, "CORREO_MAX_INTENTOS", 5)
+BLOQUEO = getattr(settings, "CORREO_BLOQUEO", 300)  # segundos
+
+# Errores del servidor por los que conviene abrir una conexión nueva
+ERRORES_CONEXION = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+# Servidores de prueba (aiosmtpd, mailpit) que no piden usuario ni contraseña
+HOSTS_LOCALES = ("localhost", "127.0.0.1", "::1")
+
+
+def faltan_credenciales():
+    """True si se va a entregar por SMTP a un servidor remoto sin EMAIL_HOST_USER/PASSWORD."""
+    if BACKEND_ENVIO != "django.core.mail.backends.smtp.EmailBackend":
+        return False
+    if settings.EMAIL_HOST in HOSTS_LOCALES:
+        return False
+    return not (settings.EMAIL_HOST_USER and settings.EMAIL_HOST_PASSWORD)
+
+
+class BackendBandeja(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        correos = [
+            CorreoSaliente(
+                asunto=str(mensaje.subject)[:255],
+                remitente=mensaje.from_email or settings.DEFAULT_FROM_EMAIL,
+                destinatarios=mensaje.recipients(),
+                # Igual que lo arma el backend SMTP de Django al enviar
+                mensaje=mensaje.message(policy=email.policy.SMTP).as_bytes().decode("utf-8"),
+                max_intentos=MAX_INTENTOS,
+            )
+            for mensaje in email_messages
+            if mensaje.recipients()
+        ]
+        CorreoSaliente.objects.bulk_create(correos)
+        return len(correos)
+
+
+class _MensajeGuardado(EmailMessage):
+    # El MIME ya armado por BackendBandeja, para entregarlo con cualquier backend
+    def __init__(self, correo):
+        super().__init__(subject=correo.asunto, from_email=correo.remitente, to=correo.destinatarios)
+        self.crudo = correo.mensaje
+
+    def message(self, *, policy=email.policy.default):
+        return email.message_from_bytes(self.crudo.encode("utf-8"), policy=policy)
+
+
+# ------------------------------------
+# ENTREGA
+# ------------------------------------
+def reclamar_siguiente():
+    # Mismo esquema que tareas.reclamar_siguiente: UPDATE condicional
+    ahora = timezone.now()
+    # "Enviando" con el bloqueo vencido en su último intento: no se reintenta más
+    agotados = CorreoSaliente.objects.filter(
+        estado=CorreoSaliente.ENVIANDO, ejecutar_despues__lte=ahora, intentos__gte=F("max_intentos")
+    ).update(estado=CorreoSaliente.FALLIDO, error="El worker no terminó el envío en ninguno de sus intentos")
+    if agotados:
+        logger.error("%s correos descartados: bloqueo expirado en el último intento", agotados)
+
+    candidatos = (
+        CorreoSaliente.objects
+        .filter(
+            Q(estado=CorreoSaliente.PENDIENTE)
+            | Q(estado=CorreoSaliente.ENVIANDO, intentos__lt=F("max_intentos")),
+            ejecutar_despues__lte=ahora,
+        )
+        .values_list("pk", "estado", "ejecutar_despues")[:10]
+    )
+
+    for pk, estado, ejecutar_despues in candidatos:
+        reclamado = CorreoSaliente.objects.filter(
+            pk=pk, estado=estado, ejecutar_despues=ejecutar_despues
+        ).update(
+            estado=CorreoSaliente.ENVIANDO,
+            intentos=F("intentos") + 1,
+            ejecutar_despues=ahora + timedelta(seconds=BLOQUEO),
+        )
+        if reclamado:
+            return CorreoSaliente.objects.get(pk=pk)
+
+    return None
+
+
+def _fallo(correo, error, definitivo=False):
+    correo.error = str(error)
+    if definitivo or correo.intentos >= correo.max_intentos:
+        correo.estado = CorreoSaliente.FALLIDO
+        logger.error("Correo %s descartado tras %s intentos: %s", correo.pk, correo.intentos, error)
+    else:
+        correo.estado = CorreoSaliente.PENDIENTE
+        correo.ejecutar_despues = timezone.now() + timedelta(seconds=calcular_retraso(correo.intentos))
+        logger.warning("Correo %s falló (intento %s): %s", correo.pk, correo.intentos, error)
+    correo.save(update_fields=["estado", "error", "ejecutar_despues"])
+
+
+def enviar_pendientes(max_correos=50):
+    """Entrega hasta `max_correos` por una misma conexión. Devuelve (enviados, fallidos)."""
+    correo = reclamar_siguiente()
+    if correo is None:
+        return 0, 0
+
+    enviados = fallidos = 0
+    conexion = get_connection(BACKEND_ENVIO, fail_silently=False)
+    try:
+        while correo is not None:
+            try:
+                # open() no hace nada si la conexión sigue abierta; así el
+                # backend SMTP no abre y cierra una por cada mensaje
+                conexion.open()
+                if not conexion.send_messages([_MensajeGuardado(correo)]):
+                    raise ValueError("El correo no tiene destinatarios")
+            except ValueError as e:
+                # Dirección inválida: reintentar no sirve de nada
+                fallidos += 1
+                _fallo(correo, e, definitivo=True)
+            except Exception as e:
+                fallidos += 1
+                _fallo(correo, e)
+                if isinstance(e, ERRORES_CONEXION) or getattr(conexion, "connection", True) is None:
+                    # Conexión rota o imposible de abrir: se corta el lote
+                    conexion.close()
+                    break
+            else:
+                enviados += 1
+                correo.estado = CorreoSaliente.ENVIADO
+                correo.enviado = timezone.now()
+                correo.error = ""
+                correo.save(update_fields=["estado", "enviado", "error"])
+
+            if enviados + fallidos >= max_correos:
+                break
+            correo = reclamar_siguiente()
+    finally:
+        conexion.close()
+
+    return enviados, fallidos
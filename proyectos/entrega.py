@@ -0,0 +1,153 @@
+# proyectos/entrega.py
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+# ------------------------------------
+# ENTREGA DE ARCHIVOS
+# ------------------------------------
+# "python": Django sirve el archivo (con Range, ETag y 304).
+# "nginx":  se responde con X-Accel-Redirect y nginx envía los bytes.
+# "apache": se responde con X-Sendfile (mod_xsendfile).
+BACKEND = getattr(settings, "ENTREGA_ARCHIVOS", "python")
+PREFIJO_INTERNO = getattr(settings, "ENTREGA_PREFIJO_INTERNO", "/media-interna/")
+
+CACHE_INMUTABLE = f"public, max-age={getattr(settings, 'MEDIA_CACHE_SEGUNDOS', 31536000)}, immutable"
+CACHE_CORTA = f"public, max-age={getattr(settings, 'MEDIA_CACHE_CORTA_SEGUNDOS', 300)}"
+CACHE_REVALIDAR = "private, no-cache"
+
+TAMANO_BLOQUE = 64 * 1024
+
+_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _rango_solicitado(request, tamano, etag, mtime):
+    """Devuelve (inicio, fin) si hay un Range válido de un solo tramo,
+    None si se debe enviar el archivo completo y False si no es satisfacible."""
+    cabecera = request.headers.get("Range", "")
+    coincide = _RANGO.match(cabecera.strip())
+    if not coincide:
+        # Ausente, con varios tramos o en otra unidad: archivo completo
+        return None
+
+    # If-Range: sólo se respeta el Range si el archivo no cambió
+    if_range = request.headers.get("If-Range")
+    if if_range:
+        fecha = parse_http_date_safe(if_range)
+        if if_range != etag and (fecha is None or fecha < int(mtime)):
+            return None
+
+    inicio, fin = coincide.groups()
+    if not inicio and not fin:
+        return False
+    if not inicio:
+        # bytes=-N: los últimos N bytes
+        largo = int(fin)
+        if largo == 0:
+            return False
+        return max(tamano - largo, 0), tamano - 1
+
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def _leer_tramo(ruta, inicio, largo):
+    with open(ruta, "rb") as f:
+        f.seek(inicio)
+        while largo > 0:
+            bloque = f.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def servir_archivo(request, nombre, adjunto=False, nombre_descarga=None, cache_control=CACHE_REVALIDAR):
+    """Sirve `nombre` (ruta relativa a MEDIA_ROOT) según ENTREGA_ARCHIVOS."""
+    try:
+        ruta = safe_join(settings.MEDIA_ROOT, nombre)
+        info = os.stat(ruta)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404("El archivo no existe")
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404("El archivo no existe")
+
+    tamano = info.st_size
+    etag = f'"{info.st_mtime_ns:x}-{tamano:x}"'
+    tipo, codificacion = mimetypes.guess_type(ruta)
+    if tipo is None or codificacion:
+        # Un .gz se entrega tal cual, no como Content-Encoding
+        tipo = "application/octet-stream"
+
+    def cabeceras(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(info.st_mtime)
+        response["Cache-Control"] = cache_control
+        return response
+
+    # GET condicional (If-None-Match / If-Modified-Since) antes de abrir nada
+    condicional = get_conditional_response(request, etag=etag, last_modified=int(info.st_mtime))
+    if condicional is not None:
+        return cabeceras(condicional)
+
+    if BACKEND == "nginx":
+        # nginx resuelve Range y envía el archivo con sendfile
+        response = HttpResponse(content_type=tipo)
+        response["X-Accel-Redirect"] = PREFIJO_INTERNO + quote(nombre)
+    elif BACKEND == "apache":
+        response = HttpResponse(content_type=tipo)
+        response["X-Sendfile"] = ruta
+    else:
+        rango = _rango_solicitado(request, tamano, etag, info.st_mtime)
+
+        if rango is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{tamano}"
+            return cabeceras(response)
+
+        if rango:
+            inicio, fin = rango
+            largo = fin - inicio + 1
+            response = StreamingHttpResponse(
+                _leer_tramo(ruta, inicio, largo), status=206, content_type=tipo
+            )
+            response["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+            response["Content-Length"] = str(largo)
+        else:
+            # FileResponse usa wsgi.file_wrapper (sendfile) si el servidor lo ofrece
+            response = FileResponse(open(ruta, "rb"), content_type=tipo)
+
+        response["Accept-Ranges"] = "bytes"
+
+    disposicion = content_disposition_header(adjunto, nombre_descarga or os.path.basename(nombre))
+    if disposicion:
+        response["Content-Disposition"] = disposicion
+
+    return cabeceras(response)
+
+
+def es_descarga_completa(request, response):
+    # Un gestor de descargas pide varios tramos; sólo cuenta el primero
+    if response.status_code == 206:
+        return response["Content-Range"].startswith("bytes 0-")
+    if response.status_code != 200:
+        return False
+    if "X-Accel-Redirect" not in response and "X-Sendfile" not in response:
+        return True
+
+    # Con nginx/apache el Range lo resuelve el servidor web y aquí siempre
+    # se ve un 200: se mira qué pidió el cliente
+    coincide = _RANGO.match(request.headers.get("Range", "").strip())
+    return coincide is None or coincide.group(1) == "0"
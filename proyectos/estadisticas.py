@@ -0,0 +1,151 @@
+# proyectos/estadisticas.py
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Estadistica, Proyecto
+
+# ------------------------------------
+# ESTADÍSTICAS INCREMENTALES
+# ------------------------------------
+# Cada proyecto suma en cinco filas de Estadistica: el total y su carrera,
+# tipo, año y mes de subida. Las señales de Proyecto y el volcado de
+# descargas ajustan esas filas con F(); el dashboard sólo las lee.
+# `manage.py recalcular_estadisticas` reconstruye todo desde cero.
+
+DIMENSIONES = ("total", "carrera", "tipo", "año", "mes")
+
+
+def _mes(fecha):
+    return timezone.localtime(fecha).strftime("%Y-%m") if fecha else ""
+
+
+def claves(carrera, tipo, año, fecha_subida):
+    return [
+        ("total", ""),
+        ("carrera", carrera or ""),
+        ("tipo", tipo or ""),
+        ("año", str(año) if año else ""),
+        ("mes", _mes(fecha_subida)),
+    ]
+
+
+def claves_de(proyecto):
+    return claves(proyecto.carrera, proyecto.tipo, proyecto.año, proyecto.fecha_subida)
+
+
+def ajustar(claves, proyectos=0, descargas=0):
+    if not proyectos and not descargas:
+        return
+
+    for dimension, valor in claves:
+        filtro = Estadistica.objects.filter(dimension=dimension, valor=valor)
+        cambios = {"proyectos": F("proyectos") + proyectos, "descargas": F("descargas") + descargas}
+
+        if filtro.update(**cambios):
+            continue
+        try:
+            with transaction.atomic():
+                Estadistica.objects.create(
+                    dimension=dimension, valor=valor, proyectos=proyectos, descargas=descargas
+                )
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            filtro.update(**cambios)
+
+
+def registrar_altas(proyectos):
+    # Altas hechas con bulk_create (no disparan post_save)
+    acumulado = Counter()
+    for proyecto in proyectos:
+        for clave in claves_de(proyecto):
+            acumulado[clave] += 1
+
+    for clave, cantidad in acumulado.items():
+        ajustar([clave], proyectos=cantidad)
+
+
+def registrar_descargas(descargas_por_proyecto):
+    """`descargas_por_proyecto`: {proyecto_id: n} ya volcado en la BD."""
+    acumulado = Counter()
+    filas = Proyecto.objects.filter(pk__in=list(descargas_por_proyecto)).values_list(
+        "pk", "carrera", "tipo", "año", "fecha_subida"
+    )
+    for pk, carrera, tipo, año, fecha in filas:
+        for clave in claves(carrera, tipo, año, fecha):
+            acumulado[clave] += descargas_por_proyecto[pk]
+
+    for clave, cantidad in acumulado.items():
+        ajustar([clave], descargas=cantidad)
+
+
+# ------------------------------------
+# RECÁLCULO COMPLETO
+# ------------------------------------
+def recalcular(proyecto_model=Proyecto, estadistica_model=Estadistica):
+    """Reconstruye todas las filas. Acepta modelos históricos (migraciones)."""
+    proyectos = proyecto_model.objects.order_by()
+    filas = []
+
+    total = proyectos.aggregate(n=Count("id"), d=Sum("descargas"))
+    filas.append(("total", "", total["n"], total["d"] or 0))
+
+    for campo in ("carrera", "tipo", "año"):
+        for valor, n, d in proyectos.values_list(campo).annotate(n=Count("id"), d=Sum("descargas")):
+            filas.append((campo, str(valor) if valor else "", n, d or 0))
+
+    meses = Counter()
+    descargas_mes = Counter()
+    for mes, n, d in (
+        proyectos.annotate(mes=TruncMonth("fecha_subida"))
+        .values_list("mes").annotate(n=Count("id"), d=Sum("descargas"))
+    ):
+        clave = mes.strftime("%Y-%m") if mes else ""
+        meses[clave] += n
+        descargas_mes[clave] += d or 0
+    filas.extend(("mes", clave, meses[clave], descargas_mes[clave]) for clave in meses)
+
+    with transaction.atomic():
+        estadistica_model.objects.all().delete()
+        estadistica_model.objects.bulk_create(
+            estadistica_model(dimension=dim, valor=valor, proyectos=n, descargas=d)
+            for dim, valor, n, d in filas
+        )
+    return len(filas)
+
+
+# ------------------------------------
+# LECTURA
+# ------------------------------------
+def resumen():
+    datos = {dimension: [] for dimension in DIMENSIONES}
+    for fila in Estadistica.objects.filter(proyectos__gt=0):
+        datos[fila.dimension].append(fila)
+
+    total = datos["total"][0] if datos["total"] else None
+    datos["total_proyectos"] = total.proyectos if total else 0
+    datos["total_descargas"] = total.descargas if total else 0
+    datos["mes"].sort(key=lambda fila: fila.valor, reverse=True)
+    return datos
+
+
+def total_filtrado(params):
+    """Total de proyectos para los filtros de `params` si sale de una sola
+    fila de estadísticas (sin búsqueda y con un filtro como mucho); si no, None."""
+    if params.get("q"):
+        return None
+
+    filtros = [(dim, params.get(dim, "")) for dim in ("carrera", "tipo", "año") if params.get(dim)]
+    if len(filtros) > 1:
+        return None
+
+    dimension, valor = filtros[0] if filtros else ("total", "")
+    total = (
+        Estadistica.objects.filter(dimension=dimension, valor=valor)
+        .values_list("proyectos", flat=True)
+        .first()
+    )
+    return total or 0
@@ -0,0 +1,94 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+# Lo que hace un worker al arrancar: configurar Django y cargar las URLs
+# (que importan las vistas y, con ellas, utils.py)
+ARRANQUE = "import django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns"
+
+# Módulos pesados que deberían cargarse sólo al usarse
+VIGILADOS = ("google.genai", "PyPDF2", "docx", "proyectos.utils", "proyectos.views")
+
+
+def _medir(codigo):
+    """Ejecuta `codigo` en un intérprete nuevo con -X importtime.
+    Devuelve (segundos de pared, {módulo: microsegundos acumulados})."""
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    segundos = time.perf_counter() - inicio
+    if proceso.returncode:
+        raise RuntimeError(proceso.stderr[-2000:])
+
+    modulos = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        modulos[nombre.strip()] = int(acumulado)
+    return segundos, modulos
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque en frío (django.setup() + URLs) en intérpretes nuevos "
+        "con -X importtime y muestra qué módulos pesados se cargan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=5)
+        parser.add_argument(
+            "--precargar", action="store_true",
+            help="Medir también el arranque con utils.precargar() (gunicorn --preload).",
+        )
+        parser.add_argument("--top", type=int, default=10, help="Módulos más lentos a listar.")
+        parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+
+    def handle(self, *args, **options):
+        escenarios = {"arranque": ARRANQUE}
+        if options["precargar"]:
+            escenarios["arranque+precarga"] = ARRANQUE + "; from proyectos.utils import precargar; precargar()"
+
+        resultados = {}
+        for nombre, codigo in escenarios.items():
+            tiempos, modulos = [], {}
+            for _ in range(options["repeticiones"]):
+                segundos, modulos = _medir(codigo)
+                tiempos.append(segundos)
+
+            # Sólo módulos de primer nivel, para no contar dos veces
+            propios = sorted(
+                ((m, us) for m, us in modulos.items() if "." not in m or m.startswith("proyectos.")),
+                key=lambda x: -x[1],
+            )
+            resultados[nombre] = {
+                "mediana_ms": round(statistics.median(tiempos) * 1000, 1),
+                "min_ms": round(min(tiempos) * 1000, 1),
+                "modulos_importados": len(modulos),
+                "vigilados_ms": {m: round(modulos[m] / 1000, 1) for m in VIGILADOS if m in modulos},
+                "mas_lentos_ms": {m: round(us / 1000, 1) for m, us in propios[:options["top"]]},
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(resultados, indent=2, ensure_ascii=False))
+            return
+
+        for nombre, r in resultados.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{nombre} ({options['repeticiones']} repeticiones)"))
+            self.stdout.write(
+                f"  pared: mediana {r['mediana_ms']} ms, mínimo {r['min_ms']} ms, "
+                f"{r['modulos_importados']} módulos"
+            )
+            for modulo in VIGILADOS:
+                valor = r["vigilados_ms"].get(modulo)
+                self.stdout.write(f"  {modulo:<18} {'no cargado' if valor is None else f'{valor} ms'}")
+            self.stdout.write("  más lentos:")
+            for modulo, ms in r["mas_lentos_ms"].items():
+                self.stdout.write(f"    {ms:>8} ms  {modulo}")
@@ -0,0 +1,148 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from proyectos import busqueda
+from proyectos.catalogo_sintetico import PALABRAS
+from proyectos.models import Proyecto, Usuario
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra una tabla de proyectos dentro de una transacción, mide las "
+        "consultas del listado con y sin los índices de Proyecto y muestra "
+        "los planes (EXPLAIN). Al terminar se deshace todo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=100000)
+        parser.add_argument("--repeticiones", type=int, default=20)
+        parser.add_argument("--sin-planes", action="store_true", help="No imprimir EXPLAIN.")
+
+    def handle(self, *args, **options):
+        self.repeticiones = options["repeticiones"]
+        self.planes = not options["sin_planes"]
+
+        try:
+            with transaction.atomic():
+                self._sembrar(options["filas"])
+                consultas = self._consultas()
+
+                despues = self._medir("CON índices", consultas)
+                self._quitar_indices()
+                antes = self._medir("SIN índices", consultas)
+
+                self._resumen(antes, despues)
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write("Datos e índices restaurados (rollback).")
+
+    # ---------- datos ----------
+    def _sembrar(self, filas):
+        rnd = random.Random(42)
+        inicio = time.perf_counter()
+
+        usuarios = Usuario.objects.bulk_create(
+            Usuario(username=f"bench_{i}", password="!") for i in range(200)
+        )
+        tipos = [valor for valor, _ in Proyecto.TIPO_CHOICES]
+        carreras = [valor for valor, _ in Proyecto.CARRERA_CHOICES]
+        años = [valor for valor, _ in Proyecto.AÑO_CHOICES]
+
+        lote = []
+        for i in range(filas):
+            lote.append(Proyecto(
+                titulo=" ".join(rnd.sample(PALABRAS, 4)) + f" {i}",
+                autor="bench",
+                tipo=rnd.choice(tipos),
+                carrera=rnd.choice(carreras),
+                año=rnd.choice(años),
+                archivo="proyectos/bench.pdf",
+                descargas=rnd.randint(0, 5000),
+                creado_por=rnd.choice(usuarios),
+            ))
+            if len(lote) == 5000:
+                Proyecto.objects.bulk_create(lote)
+                lote = []
+        Proyecto.objects.bulk_create(lote)
+
+        # fecha_subida es auto_now_add: se reparte en los últimos años
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "UPDATE proyectos_proyecto "
+                    "SET fecha_subida = now() - (id % 1500) * interval '1 day' - id * interval '1 second'"
+                )
+            else:
+                cursor.execute(
+                    "UPDATE proyectos_proyecto SET fecha_subida = "
+                    "datetime('now', '-' || (id % 1500) || ' days', '-' || id || ' seconds')"
+                )
+        self._analizar()
+
+        self.usuario = usuarios[7]
+        self.titulo = Proyecto.objects.filter(creado_por=self.usuario).values_list("titulo", flat=True).first()
+        self.tipo, self.carrera, self.año = tipos[0], carreras[0], años[0]
+        self.stdout.write(f"{filas} proyectos sembrados en {time.perf_counter() - inicio:.1f}s")
+
+    def _analizar(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE proyectos_proyecto" if connection.vendor == "postgresql" else "ANALYZE")
+
+    def _consultas(self):
+        orden = ("-fecha_subida", "-id")
+        base = Proyecto.objects.all()
+        return {
+            "listado": base.order_by(*orden)[:9],
+            "filtro tipo": base.filter(tipo=self.tipo).order_by(*orden)[:9],
+            "filtro carrera": base.filter(carrera=self.carrera).order_by(*orden)[:9],
+            "filtro año": base.filter(año=self.año).order_by(*orden)[:9],
+            "mis proyectos": base.filter(creado_por=self.usuario).order_by(*orden),
+            "duplicado al subir": base.filter(titulo=self.titulo, creado_por=self.usuario).order_by().only("id")[:1],
+            "titulo icontains": base.filter(titulo__icontains="automatiza").order_by(*orden)[:9],
+            "top descargas": base.order_by("-descargas", "-id")[:100],
+        }
+
+    def _quitar_indices(self):
+        # DROP INDEX directo: el schema editor de SQLite no se puede usar
+        # dentro de la transacción que luego se deshace
+        nombres = [indice.name for indice in Proyecto._meta.indexes]
+        if connection.vendor == "postgresql":
+            nombres.append(f"{busqueda.TABLA}_titulo_trgm")
+        with connection.cursor() as cursor:
+            for nombre in nombres:
+                cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(nombre)}")
+        self._analizar()
+
+    # ---------- medición ----------
+    def _medir(self, etiqueta, consultas):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {etiqueta} =="))
+        tiempos = {}
+        for nombre, qs in consultas.items():
+            list(qs.all())  # calentamiento
+            muestras = []
+            for _ in range(self.repeticiones):
+                inicio = time.perf_counter()
+                list(qs.all())
+                muestras.append((time.perf_counter() - inicio) * 1000)
+            tiempos[nombre] = statistics.median(muestras)
+
+            self.stdout.write(f"{nombre}: {tiempos[nombre]:.2f} ms (mediana)")
+            if self.planes:
+                for linea in qs.explain().splitlines():
+                    self.stdout.write(f"    {linea}")
+        return tiempos
+
+    def _resumen(self, antes, despues):
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== Resumen =="))
+        self.stdout.write(f"{'consulta':<22}{'sin (ms)':>12}{'con (ms)':>12}{'mejora':>10}")
+        for nombre in antes:
+            mejora = antes[nombre] / despues[nombre] if despues[nombre] else 0
+            self.stdout.write(f"{nombre:<22}{antes[nombre]:>12.2f}{despues[nombre]:>12.2f}{mejora:>9.1f}x")
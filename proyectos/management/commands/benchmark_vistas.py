@@ -0,0 +1,326 @@
+import json
+import re
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from proyectos import cache_listado, catalogo_sintetico, utils, views
+from proyectos.models import Blob, Proyecto, Usuario
+
+# Métricas que se comparan con --comparar (más es peor en todas)
+COMPARADAS = ("p50_ms", "p95_ms", "consultas_mediana")
+
+
+class _GeminiFalso:
+    """Sustituye al cliente de Gemini: responde al instante y sin red."""
+
+    def __init__(self):
+        respuesta = SimpleNamespace(text="Sinopsis de prueba.")
+
+        async def generar_async(**kwargs):
+            return respuesta
+
+        async def cerrar():
+            pass
+
+        self.models = SimpleNamespace(generate_content=lambda **kwargs: respuesta)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=generar_async), aclose=cerrar)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentil(muestras, p):
+    if len(muestras) == 1:
+        return muestras[0]
+    return statistics.quantiles(muestras, n=100, method="inclusive")[p - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p90/p95/p99) y número de consultas de las vistas "
+        "principales con el cliente de Gemini sustituido. Emite JSON para "
+        "comparar entre commits (--salida, --comparar). Usa los datos de la BD "
+        "actual: siembra antes con sembrar_catalogo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=50, help="Peticiones medidas por escenario.")
+        parser.add_argument("--calentamiento", type=int, default=3)
+        parser.add_argument("--concurrencia", type=int, default=1, help="Hilos haciendo peticiones a la vez.")
+        parser.add_argument("--profundidad", type=int, default=50, help="Página del listado para 'inicio_profundo'.")
+        parser.add_argument("--solo", default="", help="Escenarios separados por comas.")
+        parser.add_argument("--salida", help="Escribir el resultado JSON en este archivo.")
+        parser.add_argument("--comparar", help="JSON de una ejecución anterior para comparar.")
+        parser.add_argument("--umbral", type=float, default=20.0, help="%% de empeoramiento que cuenta como regresión.")
+
+    def handle(self, *args, **options):
+        if not Proyecto.objects.exists():
+            raise CommandError("No hay proyectos: ejecuta antes `manage.py sembrar_catalogo 1k`.")
+
+        self.usuario = (
+            Usuario.objects.filter(username__startswith=catalogo_sintetico.PREFIJO).first()
+            or Usuario.objects.filter(rol="estudiante").first()
+        )
+        if self.usuario is None:
+            raise CommandError("Hace falta al menos un usuario estudiante.")
+        self.pdf = catalogo_sintetico.pdf_muestra("Benchmark", ["Documento subido por benchmark_vistas."])
+        self.subidas = 0
+        self.lock = threading.Lock()
+
+        resultados = self._ejecutar(options)
+
+        informe = {
+            "fecha": timezone.now().isoformat(),
+            "commit": self._commit(),
+            "base_de_datos": connection.vendor,
+            "proyectos": Proyecto.objects.count(),
+            "repeticiones": options["repeticiones"],
+            "concurrencia": options["concurrencia"],
+            "escenarios": resultados,
+        }
+
+        self._tabla(resultados)
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                json.dump(informe, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"JSON escrito en {options['salida']}")
+        else:
+            self.stdout.write(json.dumps(informe, indent=2, ensure_ascii=False))
+
+        if options["comparar"]:
+            self._comparar(options["comparar"], informe, options["umbral"])
+
+    def _ejecutar(self, options):
+        hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        # Las descargas van a un búfer que se vuelca en otra conexión (hilo de
+        # contadores.py, atexit): el rollback de _hilo no las desharía
+        with (
+            override_settings(ALLOWED_HOSTS=hosts),
+            mock.patch.object(utils, "obtener_cliente", _GeminiFalso),
+            mock.patch.object(utils, "_crear_cliente", _GeminiFalso),
+            mock.patch.object(views, "registrar_descarga", lambda proyecto_id: None),
+        ):
+            escenarios = self._escenarios(options["profundidad"])
+            solo = {s.strip() for s in options["solo"].split(",") if s.strip()}
+            if solo - set(escenarios):
+                raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(solo - set(escenarios)))}")
+
+            resultados = {}
+            for nombre, escenario in escenarios.items():
+                if solo and nombre not in solo:
+                    continue
+                resultados[nombre] = self._medir(nombre, escenario, options)
+        return resultados
+
+    # ---------- escenarios ----------
+    def _escenarios(self, profundidad):
+        """nombre -> dict(url, metodo, autenticado, preparar, veces)."""
+        proyectos = list(
+            Proyecto.objects.order_by("-descargas", "-id").values_list("id", "carrera", "tipo", "año")[:50]
+        )
+        ids = [p[0] for p in proyectos]
+        _, carrera, tipo, año = proyectos[0]
+        palabra = catalogo_sintetico.PALABRAS[0]
+        # Un sondeo de sincronización típico: lo modificado en el último día
+        reciente = quote((timezone.now() - timedelta(days=1)).isoformat())
+
+        def rotar(plantilla):
+            contador = iter(range(10 ** 9))
+            return lambda: plantilla.format(ids[next(contador) % len(ids)])
+
+        def fijo(url):
+            return lambda: url
+
+        return {
+            "inicio": {"url": fijo("/")},
+            "inicio_sin_cache": {"url": fijo("/"), "preparar": cache_listado.invalidar},
+            "inicio_filtro_tipo": {"url": fijo(f"/?tipo={tipo}"), "preparar": cache_listado.invalidar},
+            "inicio_filtro_carrera_año": {
+                "url": fijo(f"/?carrera={carrera}&año={año}"), "preparar": cache_listado.invalidar,
+            },
+            "inicio_busqueda": {"url": fijo(f"/?q={palabra}"), "preparar": cache_listado.invalidar},
+            "inicio_profundo": {
+                "url": fijo(self._pagina_profunda(profundidad)), "preparar": cache_listado.invalidar,
+            },
+            "dashboard": {"url": fijo("/dashboard/"), "autenticado": True},
+            "export_csv_filtrado": {"url": fijo(f"/export/?carrera={carrera}&año={año}")},
+            "export_csv_completo": {"url": fijo("/export/"), "veces": 0.1},
+            "api_catalogo": {"url": fijo(f"/api/proyectos/?carrera={carrera}")},
+            "api_delta": {"url": fijo(f"/api/proyectos/?updated_since={reciente}&campos=id,titulo,actualizado")},
+            "descargar": {"url": rotar("/descargar/{}/")},
+            "ver_proyecto": {"url": rotar("/proyecto/{}/")},
+            "subir": {"url": fijo("/subir/"), "metodo": "post", "autenticado": True, "datos": self._datos_subida},
+        }
+
+    def _pagina_profunda(self, profundidad):
+        # Se sigue el enlace "Siguiente" como lo haría un usuario
+        cliente, url = Client(), "/"
+        for _ in range(profundidad - 1):
+            html = cliente.get(url).content.decode()
+            siguiente = re.search(r'href="\?([^"]*cursor=[^"]+)"[^>]*>\s*Siguiente', html)
+            if not siguiente:
+                break
+            url = "/?" + siguiente.group(1).replace("&amp;", "&")
+        return url
+
+    def _datos_subida(self):
+        with self.lock:
+            self.subidas += 1
+            numero = self.subidas
+        return {
+            "titulo": f"Benchmark {numero} {time.time_ns()}",
+            "descripcion": "Subida de benchmark_vistas",
+            "carrera": Proyecto.CARRERA_CHOICES[0][0],
+            "tipo": Proyecto.TIPO_CHOICES[0][0],
+            "año": str(Proyecto.AÑO_CHOICES[-1][0]),
+            "archivo": SimpleUploadedFile("benchmark.pdf", self.pdf, "application/pdf"),
+        }
+
+    # ---------- medición ----------
+    def _peticion(self, cliente, escenario):
+        if escenario.get("preparar"):
+            escenario["preparar"]()
+        metodo = escenario.get("metodo", "get")
+        datos = escenario["datos"]() if escenario.get("datos") else None
+
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            response = getattr(cliente, metodo)(escenario["url"](), datos)
+            if response.streaming:
+                # Se mide hasta el último byte, como lo recibiría el navegador.
+                # Al agotarse, el Client cierra la respuesta (y el archivo).
+                for _ in response.streaming_content:
+                    pass
+            segundos = time.perf_counter() - inicio
+        return segundos * 1000, len(consultas), response.status_code
+
+    def _hilo(self, escenario, repeticiones, calentamiento):
+        cliente = Client()
+        if escenario.get("autenticado"):
+            cliente.force_login(self.usuario)
+
+        muestras = []
+        escritos = []
+        inicio = timezone.now()
+        try:
+            # Lo que escribe el escenario (subir) se deshace al terminar
+            with transaction.atomic():
+                for i in range(calentamiento + repeticiones):
+                    resultado = self._peticion(cliente, escenario)
+                    if i >= calentamiento:
+                        muestras.append(resultado)
+                escritos = list(Blob.objects.filter(creado__gte=inicio).values_list("nombre", flat=True))
+                raise _Rollback
+        except _Rollback:
+            self._borrar_archivos_huerfanos(escritos)
+        finally:
+            close_old_connections()
+        return muestras
+
+    def _borrar_archivos_huerfanos(self, nombres):
+        # El rollback quita las filas Blob pero no los archivos del disco. Los
+        # que aún tienen fila los guardó otro proceso en ese tiempo: se quedan.
+        almacenamiento = Proyecto._meta.get_field("archivo").storage
+        conservados = set(Blob.objects.filter(nombre__in=nombres).values_list("nombre", flat=True))
+        for nombre in set(nombres) - conservados:
+            almacenamiento.delete(nombre)
+
+    def _medir(self, nombre, escenario, options):
+        hilos = max(1, options["concurrencia"])
+        repeticiones = max(hilos, int(options["repeticiones"] * escenario.get("veces", 1)))
+        por_hilo = [repeticiones // hilos + (i < repeticiones % hilos) for i in range(hilos)]
+
+        inicio = time.perf_counter()
+        if hilos == 1:
+            muestras = self._hilo(escenario, por_hilo[0], options["calentamiento"])
+        else:
+            with ThreadPoolExecutor(max_workers=hilos) as pool:
+                partes = pool.map(lambda n: self._hilo(escenario, n, options["calentamiento"]), por_hilo)
+                muestras = [m for parte in partes for m in parte]
+        total = time.perf_counter() - inicio
+
+        tiempos = [m[0] for m in muestras]
+        consultas = [m[1] for m in muestras]
+        resultado = {
+            "n": len(muestras),
+            "p50_ms": round(_percentil(tiempos, 50), 2),
+            "p90_ms": round(_percentil(tiempos, 90), 2),
+            "p95_ms": round(_percentil(tiempos, 95), 2),
+            "p99_ms": round(_percentil(tiempos, 99), 2),
+            "max_ms": round(max(tiempos), 2),
+            "media_ms": round(statistics.fmean(tiempos), 2),
+            "consultas_mediana": statistics.median(consultas),
+            "consultas_max": max(consultas),
+            "estados": dict(Counter(str(m[2]) for m in muestras)),
+            "peticiones_por_segundo": round(len(muestras) / total, 1),
+        }
+        self.stderr.write(f"  {nombre}: p50 {resultado['p50_ms']} ms, {resultado['consultas_mediana']} consultas")
+        return resultado
+
+    # ---------- salida ----------
+    def _tabla(self, resultados):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{'escenario':<28}{'p50':>9}{'p95':>9}{'p99':>9}{'consultas':>11}{'req/s':>9}  estados"
+        ))
+        for nombre, r in resultados.items():
+            self.stdout.write(
+                f"{nombre:<28}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+                f"{r['consultas_mediana']:>11}{r['peticiones_por_segundo']:>9}  {r['estados']}"
+            )
+
+    def _comparar(self, ruta, actual, umbral):
+        resultados = actual["escenarios"]
+        with open(ruta, encoding="utf-8") as f:
+            base = json.load(f)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nComparación con {ruta} ({base.get('commit') or 'sin commit'})"))
+        for clave in ("base_de_datos", "proyectos", "concurrencia"):
+            if base.get(clave) != actual[clave]:
+                self.stdout.write(self.style.WARNING(
+                    f"  Ojo: {clave} distinto ({base.get(clave)} vs {actual[clave]}); la comparación no es justa."
+                ))
+
+        regresiones = []
+        for nombre, r in resultados.items():
+            anterior = base.get("escenarios", {}).get(nombre)
+            if not anterior:
+                continue
+            cambios = []
+            for metrica in COMPARADAS:
+                antes, ahora = anterior.get(metrica), r[metrica]
+                if not antes:
+                    continue
+                delta = (ahora - antes) / antes * 100
+                cambios.append(f"{metrica} {antes}→{ahora} ({delta:+.0f}%)")
+                if delta > umbral:
+                    regresiones.append(f"{nombre}.{metrica}")
+            self.stdout.write(f"  {nombre:<28}" + ", ".join(cambios))
+
+        if regresiones:
+            raise CommandError(f"Regresiones de más del {umbral:.0f}%: {', '.join(regresiones)}")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones."))
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                cwd=settings.BASE_DIR, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,105 @@
+import os
+import shutil
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from proyectos import cache_listado
+from proyectos.almacenamiento import borrar_derivados, calcular_digest, ruta_blob
+from proyectos.models import Blob, Proyecto
+
+CAMPOS = ("archivo", "portada")
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa los documentos y portadas existentes al almacenamiento por contenido: "
+        "cada archivo distinto queda una sola vez con su sha256 y las copias se borran."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Sólo informar, sin mover ni borrar nada.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        storage = Proyecto._meta.get_field("archivo").storage
+        registrados = set(Blob.objects.values_list("nombre", flat=True))
+
+        # nombre actual -> [pk, ...] por campo; los que ya son blobs se saltan
+        pendientes = defaultdict(list)
+        for campo in CAMPOS:
+            filas = Proyecto.objects.exclude(**{campo: ""}).exclude(**{f"{campo}__isnull": True})
+            for pk, nombre in filas.values_list("pk", campo).iterator():
+                if nombre not in registrados:
+                    pendientes[(campo, nombre)].append(pk)
+
+        archivos = liberados = faltantes = migrados = 0
+        vistos = set()
+        try:
+            for (campo, nombre), pks in sorted(pendientes.items()):
+                if not storage.exists(nombre):
+                    faltantes += 1
+                    self.stderr.write(f"  No existe: {nombre} ({len(pks)} proyectos)")
+                    continue
+
+                tamano = storage.size(nombre)
+                destino = ruta_blob(
+                    os.path.dirname(nombre), calcular_digest(storage.path(nombre)),
+                    os.path.splitext(nombre)[1].lower(),
+                )
+                if destino in vistos or storage.exists(destino):
+                    liberados += tamano
+                vistos.add(destino)
+                archivos += 1
+                self.stdout.write(f"  {nombre} -> {destino} ({len(pks)} proyectos)")
+                if dry_run:
+                    continue
+
+                self._migrar(storage, campo, nombre, destino, pks, tamano)
+                migrados += 1
+        finally:
+            if migrados:
+                # _migrar usa update(), que no dispara señales: el listado
+                # y el ETag de la API se invalidan aquí, una vez por lote
+                cache_listado.invalidar()
+
+        mb = liberados / 1024 / 1024
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"[dry-run] {archivos} archivos -> {len(vistos)} blobs, {mb:.1f} MB de copias a liberar."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{archivos} archivos -> {len(vistos)} blobs, {mb:.1f} MB de copias liberados."
+            ))
+        if faltantes:
+            self.stdout.write(self.style.WARNING(f"{faltantes} archivos referenciados no existen en disco."))
+
+    def _migrar(self, storage, campo, nombre, destino, pks, tamano):
+        origen, final = storage.path(nombre), storage.path(destino)
+
+        # Enlace duro: el archivo sigue en su sitio hasta que la BD apunte al blob
+        if not storage.exists(destino):
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            try:
+                os.link(origen, final)
+            except OSError:
+                shutil.copy2(origen, final)
+
+        with transaction.atomic():
+            Blob.objects.get_or_create(
+                nombre=destino, defaults={"digest": os.path.basename(destino).split(".")[0], "tamano": tamano}
+            )
+            Blob.objects.filter(nombre=destino).update(referencias=F("referencias") + len(pks))
+
+            # update(): ni estadísticas ni señales de archivos reemplazados
+            cambios = {campo: destino}
+            if campo == "archivo":
+                cambios["paginas_vista_previa"] = None  # se regeneran (o reutilizan) con el nombre nuevo
+            Proyecto.objects.filter(pk__in=pks).update(**cambios)
+
+        os.remove(origen)
+        # Vistas previas y miniaturas cuelgan del nombre del original
+        borrar_derivados(nombre)
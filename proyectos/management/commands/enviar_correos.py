@@ -0,0 +1,56 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from proyectos.correo import enviar_pendientes, faltan_credenciales
+
+
+class Command(BaseCommand):
+    help = "Worker de la bandeja de salida: entrega los correos encolados por SMTP."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--una-vez", action="store_true",
+            help="Envía los correos pendientes y termina.",
+        )
+        parser.add_argument(
+            "--intervalo", type=float, default=5.0,
+            help="Segundos de espera cuando la bandeja está vacía.",
+        )
+        parser.add_argument(
+            "--lote", type=int, default=50,
+            help="Correos a enviar por cada conexión SMTP.",
+        )
+
+    def handle(self, *args, **options):
+        if faltan_credenciales():
+            raise CommandError(
+                "EMAIL_HOST_USER y EMAIL_HOST_PASSWORD están vacíos: defínelos en .env "
+                "(con Gmail, una contraseña de aplicación) antes de arrancar el worker."
+            )
+
+        self.detener = False
+        signal.signal(signal.SIGTERM, self._detener)
+        signal.signal(signal.SIGINT, self._detener)
+
+        total_enviados = total_fallidos = 0
+        while not self.detener:
+            close_old_connections()
+            enviados, fallidos = enviar_pendientes(max_correos=options["lote"])
+            total_enviados += enviados
+            total_fallidos += fallidos
+
+            if options["una_vez"] and enviados + fallidos < options["lote"]:
+                break
+            if not enviados:
+                # Bandeja vacía o servidor caído: esperar antes de otra conexión
+                time.sleep(options["intervalo"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Correos enviados: {total_enviados}, fallidos: {total_fallidos}"
+        ))
+
+    def _detener(self, signum, frame):
+        self.detener = True
@@ -0,0 +1,53 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from proyectos import miniaturas
+from proyectos.models import Perfil, Proyecto, Usuario
+
+VARIANTES_PORTADA = ("tarjeta", "detalle", "mini")
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las miniaturas WebP/JPEG de portadas y avatares existentes. "
+        "Sólo crea las que falten salvo con --forzar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forzar", action="store_true", help="Regenerar aunque ya existan.")
+
+    def handle(self, *args, **options):
+        forzar = options["forzar"]
+
+        portadas = (
+            Proyecto.objects.exclude(portada="").exclude(portada__isnull=True)
+            .values_list("portada", flat=True).distinct()
+        )
+        avatares = set(Perfil.objects.exclude(avatar="").values_list("avatar", flat=True))
+        avatares |= set(Usuario.objects.exclude(avatar="").values_list("avatar", flat=True))
+
+        trabajos = [(nombre, v) for nombre in portadas.iterator() for v in VARIANTES_PORTADA]
+        trabajos += [(nombre, "avatar") for nombre in sorted(avatares)]
+
+        creadas = 0
+        for i, (nombre, variante) in enumerate(trabajos, 1):
+            creadas += miniaturas.generar(nombre, variante, forzar=forzar)
+            if i % 100 == 0:
+                self.stdout.write(f"  {i}/{len(trabajos)}")
+
+        self.stdout.write(self.style.SUCCESS(f"{creadas} miniaturas creadas."))
+        self._comparar_pesos(portadas)
+
+    def _comparar_pesos(self, portadas):
+        # Peso de las portadas de una página del listado: original vs tarjeta
+        originales = reducidas = 0
+        for nombre in portadas[:9]:
+            variante = miniaturas.ruta(nombre, "tarjeta", miniaturas.VARIANTES["tarjeta"]["anchos"][0], "webp")
+            if default_storage.exists(nombre) and default_storage.exists(variante):
+                originales += default_storage.size(nombre)
+                reducidas += default_storage.size(variante)
+        if reducidas:
+            self.stdout.write(
+                f"Portadas de una página: {originales / 1024:.0f} KB originales, "
+                f"{reducidas / 1024:.0f} KB en miniatura ({originales / reducidas:.1f}x menos)."
+            )
@@ -0,0 +1,224 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from proyectos.forms import ProyectoForm
+from proyectos import cache_listado, estadisticas
+from proyectos.models import Blob, Proyecto, Tarea, Usuario
+
+EXTENSIONES = {".pdf", ".docx"}
+
+
+def _extraer(ruta):
+    # Se ejecuta en los procesos del pool
+    from proyectos.utils import extraer_documento
+
+    try:
+        with open(ruta, "rb") as archivo:
+            resultado = extraer_documento(archivo)
+        return resultado.texto.replace("\x00", ""), resultado.bytes_leidos, None
+    except Exception as e:
+        return "", 0, str(e)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa documentos existentes como proyectos desde un directorio "
+        "o un manifiesto CSV (columnas: archivo, titulo, descripcion, carrera, "
+        "tipo, año y opcionalmente usuario y autor)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("origen", help="Directorio con PDF/DOCX o archivo CSV.")
+        parser.add_argument("--usuario", required=True, help="Usuario que figura como creador.")
+        parser.add_argument("--carrera", default="", help="Carrera por defecto.")
+        parser.add_argument("--tipo", default="", help="Tipo por defecto.")
+        parser.add_argument("--año", dest="anio", default="", help="Año por defecto.")
+        parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--lote", type=int, default=200, help="Filas por bulk_create.")
+        parser.add_argument(
+            "--estado",
+            help="Archivo de control para reanudar (por defecto <origen>.importados).",
+        )
+        parser.add_argument(
+            "--sin-sinopsis", action="store_true",
+            help="No encolar la generación de sinopsis IA.",
+        )
+
+    # ------------------------------------
+    # ENTRADAS
+    # ------------------------------------
+    def _leer_entradas(self, origen, opciones):
+        por_defecto = {
+            "carrera": opciones["carrera"],
+            "tipo": opciones["tipo"],
+            "año": opciones["anio"],
+            "descripcion": "",
+        }
+
+        if origen.is_dir():
+            for ruta in sorted(origen.rglob("*")):
+                if ruta.suffix.lower() in EXTENSIONES:
+                    titulo = ruta.stem.replace("_", " ").strip()
+                    yield {**por_defecto, "archivo": str(ruta), "titulo": titulo}
+            return
+
+        with open(origen, newline="", encoding="utf-8-sig") as f:
+            for fila in csv.DictReader(f):
+                entrada = {**por_defecto, **{k: v for k, v in fila.items() if v}}
+                ruta = Path(entrada["archivo"])
+                if not ruta.is_absolute():
+                    ruta = origen.parent / ruta
+                entrada["archivo"] = str(ruta)
+                yield entrada
+
+    def _validar(self, entrada):
+        # Mismas reglas que el formulario de subida
+        archivo = File(open(entrada["archivo"], "rb"), name=os.path.basename(entrada["archivo"]))
+        form = ProyectoForm(
+            data={k: entrada.get(k, "") for k in ("titulo", "descripcion", "carrera", "año", "tipo")},
+            files={"archivo": archivo},
+        )
+        if form.is_valid():
+            return form.save(commit=False), archivo
+
+        archivo.close()
+        errores = "; ".join(f"{campo}: {' '.join(msgs)}" for campo, msgs in form.errors.items())
+        self.stderr.write(f"Omitido {entrada['archivo']}: {errores}")
+        return None, None
+
+    # ------------------------------------
+    # IMPORTACIÓN
+    # ------------------------------------
+    def handle(self, *args, **opciones):
+        origen = Path(opciones["origen"])
+        if not origen.exists():
+            raise CommandError(f"No existe {origen}")
+
+        try:
+            usuario_defecto = Usuario.objects.get(username=opciones["usuario"])
+        except Usuario.DoesNotExist:
+            raise CommandError(f"No existe el usuario {opciones['usuario']}")
+
+        ruta_estado = Path(opciones["estado"] or f"{str(origen).rstrip('/')}.importados")
+        hechos = set()
+        if ruta_estado.exists():
+            hechos = set(ruta_estado.read_text(encoding="utf-8").splitlines())
+
+        usuarios = {usuario_defecto.username: usuario_defecto}
+        titulos = set(Proyecto.objects.values_list("titulo", "creado_por_id"))
+
+        # Validación en el proceso principal; extracción en paralelo
+        pendientes = []
+        for entrada in self._leer_entradas(origen, opciones):
+            if entrada["archivo"] in hechos:
+                continue
+
+            nombre = entrada.get("usuario") or usuario_defecto.username
+            if nombre not in usuarios:
+                usuarios[nombre] = Usuario.objects.filter(username=nombre).first()
+            usuario = usuarios[nombre]
+            if usuario is None:
+                self.stderr.write(f"Omitido {entrada['archivo']}: no existe el usuario {nombre}")
+                continue
+
+            if (entrada["titulo"], usuario.pk) in titulos:
+                self.stderr.write(f"Omitido {entrada['archivo']}: el usuario ya tiene un proyecto con ese título")
+                continue
+
+            proyecto, archivo = self._validar(entrada)
+            if proyecto is None:
+                continue
+
+            archivo.close()
+            proyecto.creado_por = usuario
+            proyecto.autor = entrada.get("autor") or usuario.get_full_name() or usuario.username
+            titulos.add((proyecto.titulo, usuario.pk))
+            pendientes.append((entrada["archivo"], proyecto))
+
+        total = len(pendientes)
+        self.stdout.write(f"{total} documentos por importar ({len(hechos)} ya importados).")
+        if not total:
+            return
+
+        inicio = time.monotonic()
+        importados = 0
+        bytes_totales = 0
+        tam_lote = opciones["lote"]
+        lotes = [pendientes[i:i + tam_lote] for i in range(0, total, tam_lote)]
+
+        with ProcessPoolExecutor(max_workers=opciones["procesos"], initializer=django.setup) as pool, \
+                open(ruta_estado, "a", encoding="utf-8") as estado:
+            # Se extrae el lote siguiente mientras se guarda el actual; así
+            # nunca hay más de dos lotes de texto en memoria.
+            extraccion = pool.map(_extraer, [ruta for ruta, _ in lotes[0]])
+
+            for n, lote in enumerate(lotes):
+                resultados = list(extraccion)
+                if n + 1 < len(lotes):
+                    extraccion = pool.map(_extraer, [ruta for ruta, _ in lotes[n + 1]])
+
+                for (ruta, proyecto), (texto, _, error) in zip(lote, resultados):
+                    if error:
+                        self.stderr.write(f"No se pudo leer {ruta}: {error}")
+                    proyecto.texto_extraido = texto
+                    bytes_totales += os.path.getsize(ruta)
+
+                importados += self._guardar_lote(lote, estado, opciones)
+                self._progreso(importados, total, bytes_totales, inicio)
+
+        self.stdout.write(self.style.SUCCESS(f"Importados {importados} proyectos."))
+
+    def _guardar_lote(self, lote, estado, opciones):
+        # Los archivos se guardan dentro de la transacción: su referencia al
+        # blob sólo se suma si el lote se confirma (almacenamiento.py)
+        guardados = []
+        try:
+            with transaction.atomic():
+                proyectos = []
+                for ruta, proyecto in lote:
+                    with open(ruta, "rb") as f:
+                        proyecto.archivo.save(os.path.basename(ruta), File(f), save=False)
+                    guardados.append(proyecto.archivo.name)
+                    if not opciones["sin_sinopsis"]:
+                        proyecto.estado_sinopsis = Proyecto.SINOPSIS_PENDIENTE
+                    proyectos.append(proyecto)
+
+                creados = Proyecto.objects.bulk_create(proyectos)
+                estadisticas.registrar_altas(creados)
+                if not opciones["sin_sinopsis"]:
+                    Tarea.objects.bulk_create(
+                        Tarea(tipo="sinopsis", proyecto=p) for p in creados
+                    )
+                # bulk_create no dispara post_save
+                transaction.on_commit(cache_listado.invalidar)
+        except Exception:
+            self._borrar_huerfanos(guardados)
+            raise
+
+        # Sólo tras el commit se marca el lote como importado
+        estado.writelines(f"{ruta}\n" for ruta, _ in lote)
+        estado.flush()
+        return len(creados)
+
+    def _borrar_huerfanos(self, nombres):
+        # El rollback quita las filas Blob nuevas pero no sus archivos. Los que
+        # conservan fila ya existían o los confirmó otro proceso: se quedan.
+        almacenamiento = Proyecto._meta.get_field("archivo").storage
+        conservados = set(Blob.objects.filter(nombre__in=nombres).values_list("nombre", flat=True))
+        for nombre in set(nombres) - conservados:
+            almacenamiento.delete(nombre)
+
+    def _progreso(self, importados, total, bytes_totales, inicio):
+        transcurrido = max(time.monotonic() - inicio, 1e-6)
+        self.stdout.write(
+            f"{importados}/{total} · {importados / transcurrido:.1f} docs/s · "
+            f"{bytes_totales / transcurrido / 1024 / 1024:.1f} MB/s"
+        )
@@ -0,0 +1,47 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from proyectos.tareas import procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = "Worker de la cola de tareas (extracción de texto y sinopsis IA)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--una-vez", action="store_true",
+            help="Procesa las tareas disponibles y termina.",
+        )
+        parser.add_argument(
+            "--intervalo", type=float, default=2.0,
+            help="Segundos de espera cuando la cola está vacía.",
+        )
+        parser.add_argument(
+            "--lote", type=int, default=20,
+            help="Tareas a procesar antes de renovar la conexión a la BD.",
+        )
+
+    def handle(self, *args, **options):
+        self.detener = False
+        signal.signal(signal.SIGTERM, self._detener)
+        signal.signal(signal.SIGINT, self._detener)
+
+        total = 0
+        while not self.detener:
+            close_old_connections()
+            procesadas = procesar_pendientes(max_tareas=options["lote"])
+            total += procesadas
+
+            if options["una_vez"] and procesadas < options["lote"]:
+                break
+            if not procesadas:
+                time.sleep(options["intervalo"])
+
+        self.stdout.write(self.style.SUCCESS(f"Tareas procesadas: {total}"))
+
+    def _detener(self, signum, frame):
+        # Termina la tarea en curso y sale en la siguiente vuelta
+        self.detener = True
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from proyectos.estadisticas import recalcular
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye las estadísticas del dashboard desde la tabla de proyectos. "
+        "Se puede programar (cron) para corregir cualquier desviación."
+    )
+
+    def handle(self, *args, **options):
+        filas = recalcular()
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas recalculadas ({filas} filas)."))
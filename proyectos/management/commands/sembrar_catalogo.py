@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from proyectos import catalogo_sintetico
+from proyectos.models import Proyecto
+
+TAMANOS = {"k": 1_000, "m": 1_000_000}
+
+
+def _cantidad(valor):
+    # 1000, 1k, 100k, 1M
+    try:
+        if valor[-1].lower() in TAMANOS:
+            return int(float(valor[:-1]) * TAMANOS[valor[-1].lower()])
+        return int(valor)
+    except (ValueError, IndexError):
+        raise CommandError(f"Cantidad no válida: {valor!r} (ej. 1000, 100k, 1M)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra un catálogo sintético de proyectos (carrera/tipo/año con pesos "
+        "realistas y PDFs de muestra) para benchmark_vistas. --limpiar lo borra."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("filas", nargs="?", default="1k", help="Proyectos a crear: 1k, 100k, 1M…")
+        parser.add_argument("--semilla", type=int, default=42)
+        parser.add_argument("--usuarios", type=int, default=200)
+        parser.add_argument("--limpiar", action="store_true", help="Borrar el catálogo sintético y salir.")
+
+    def handle(self, *args, **options):
+        if options["limpiar"]:
+            borrados = catalogo_sintetico.limpiar()
+            self.stdout.write(self.style.SUCCESS(f"{borrados} proyectos sintéticos borrados."))
+            return
+
+        filas = _cantidad(options["filas"])
+        segundos = catalogo_sintetico.sembrar(
+            filas,
+            semilla=options["semilla"],
+            usuarios=options["usuarios"],
+            progreso=lambda n: self.stdout.write(f"  {n}/{filas}"),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{filas} proyectos sembrados en {segundos:.1f}s "
+            f"({Proyecto.objects.count()} en total)."
+        ))
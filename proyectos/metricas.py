@@ -0,0 +1,411 @@
+# proyectos/metricas.py
+import atexit
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import admision, cache_sinopsis
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin archivado de workers muertos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# MÉTRICAS POR VISTA (PROMETHEUS)
+# ------------------------------------
+# MetricasMiddleware abre una Medicion por petición (en un ContextVar, así
+# que la ven también los hilos de sync_to_async y las corrutinas). Mientras
+# dura se le suman:
+#   - cada consulta SQL, con un execute_wrapper instalado en cada conexión;
+#   - el render de cada plantilla (backends.PlantillasMedidas), sin el SQL
+#     perezoso que se ejecuta dentro;
+#   - cada llamada a Gemini (utils._llamar / _llamar_async).
+# Al terminar se acumula por nombre de URL en memoria y cada INTERVALO
+# segundos el proceso escribe su copia en DIRECTORIO/<pid>-<marca>.json.
+# La vista /metricas/ suma los archivos de todos los workers; los de
+# procesos que ya no existen se pasan a historico.json para que los
+# contadores no retrocedan. En respuestas en streaming (CSV, archivos) la
+# latencia llega hasta que la vista devuelve la respuesta, no hasta el
+# último byte.
+
+DIRECTORIO = getattr(settings, "METRICAS_DIR", os.path.join(settings.BASE_DIR, ".metricas"))
+INTERVALO = getattr(settings, "METRICAS_INTERVALO", 5)  # segundos
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Cualquier otro método (lo elige el cliente) se etiqueta "other": así un
+# escáner no puede crear series sin límite
+METODOS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+HISTOGRAMAS = {
+    "proyectos_peticion_segundos": (BUCKETS_SEGUNDOS, "Latencia de la petición por vista."),
+    "proyectos_peticion_consultas_sql": (BUCKETS_CONSULTAS, "Consultas SQL por petición."),
+}
+CONTADORES = {
+    "proyectos_peticiones_total": "Peticiones atendidas por vista, método y estado.",
+    "proyectos_sql_consultas_total": "Consultas SQL ejecutadas por vista.",
+    "proyectos_sql_segundos_total": "Tiempo en consultas SQL por vista.",
+    "proyectos_plantilla_segundos_total": "Tiempo de render de plantillas por vista (sin el SQL de dentro).",
+    "proyectos_gemini_llamadas_total": "Llamadas a Gemini por vista.",
+    "proyectos_gemini_segundos_total": "Tiempo en llamadas a Gemini por vista.",
+    "proyectos_admision_total": "Eventos del control de admisión de sinopsis.",
+    "proyectos_sinopsis_cache_total": "Consultas a la caché de sinopsis por resultado.",
+}
+MEDIDORES = {
+    "proyectos_admision_en_cola": "Llamadas a Gemini esperando turno o en vuelo.",
+    "proyectos_admision_en_vuelo": "Prompts distintos en vuelo (single-flight).",
+    "proyectos_sinopsis_cache_entradas": "Sinopsis en la LRU en memoria de los workers.",
+}
+
+
+# ------------------------------------
+# MEDICIÓN DE UNA PETICIÓN
+# ------------------------------------
+_actual = contextvars.ContextVar("metricas_medicion", default=None)
+
+
+class Medicion:
+    def __init__(self):
+        self.sql_consultas = 0
+        self.sql_segundos = 0.0
+        self.plantilla_segundos = 0.0
+        self.gemini_llamadas = 0
+        self.gemini_segundos = 0.0
+        self.en_plantilla = False
+        self.segundos = 0.0
+
+    def __enter__(self):
+        self._token = _actual.set(self)
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.segundos = time.perf_counter() - self._inicio
+        _actual.reset(self._token)
+
+    def registrar(self, request, response):
+        match = getattr(request, "resolver_match", None)
+        vista = match.view_name if match else "sin_ruta"
+        metodo = request.method if request.method in METODOS else "other"
+        etiquetas = _etiquetas(vista=vista, metodo=metodo)
+        por_vista = _etiquetas(vista=vista)
+
+        with _lock:
+            _contadores["proyectos_peticiones_total"][
+                _etiquetas(vista=vista, metodo=metodo, estado=response.status_code)
+            ] += 1
+            _observar("proyectos_peticion_segundos", etiquetas, self.segundos)
+            _observar("proyectos_peticion_consultas_sql", por_vista, self.sql_consultas)
+            _contadores["proyectos_sql_consultas_total"][por_vista] += self.sql_consultas
+            _contadores["proyectos_sql_segundos_total"][por_vista] += self.sql_segundos
+            _contadores["proyectos_plantilla_segundos_total"][por_vista] += self.plantilla_segundos
+            if self.gemini_llamadas:
+                _contadores["proyectos_gemini_llamadas_total"][por_vista] += self.gemini_llamadas
+                _contadores["proyectos_gemini_segundos_total"][por_vista] += self.gemini_segundos
+
+        volcar_si_toca()
+
+
+def medir_sql(execute, sql, params, many, context):
+    """execute_wrapper permanente (ver instrumentar_conexion)."""
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql_consultas += 1
+        medicion.sql_segundos += time.perf_counter() - inicio
+
+
+def instrumentar_conexion(sender, connection, **kwargs):
+    # Receptor de connection_created: lo mismo que connection.execute_wrapper(),
+    # pero para toda la vida de la conexión y no sólo dentro de un `with`.
+    # Una conexión que se reabre vuelve a disparar la señal.
+    if medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_sql)
+
+
+@contextmanager
+def medir_plantilla():
+    medicion = _actual.get()
+    if medicion is None or medicion.en_plantilla:
+        # Fuera de una petición o plantilla anidada (ya se está midiendo)
+        yield
+        return
+
+    medicion.en_plantilla = True
+    sql_antes = medicion.sql_segundos
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.en_plantilla = False
+        medicion.plantilla_segundos += (
+            time.perf_counter() - inicio - (medicion.sql_segundos - sql_antes)
+        )
+
+
+def registrar_gemini(segundos):
+    medicion = _actual.get()
+    if medicion is not None:
+        medicion.gemini_llamadas += 1
+        medicion.gemini_segundos += segundos
+
+
+# ------------------------------------
+# ACUMULADO DEL PROCESO
+# ------------------------------------
+_lock = threading.Lock()
+_contadores = defaultdict(lambda: defaultdict(float))
+_histogramas = defaultdict(dict)  # nombre -> {etiquetas: [cuenta por bucket..., +Inf, suma]}
+_ultimo_volcado = time.monotonic()
+_archivo = None  # (pid, ruta)
+
+
+def _etiquetas(**valores):
+    return ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in valores.items())
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _observar(nombre, etiquetas, valor):
+    buckets = HISTOGRAMAS[nombre][0]
+    serie = _histogramas[nombre].setdefault(etiquetas, [0] * (len(buckets) + 2))
+    posicion = next((i for i, limite in enumerate(buckets) if valor <= limite), len(buckets))
+    serie[posicion] += 1
+    serie[-1] += valor
+
+
+def _instantanea():
+    with _lock:
+        datos = {
+            "contadores": {nombre: dict(series) for nombre, series in _contadores.items()},
+            "histogramas": {nombre: {e: list(s) for e, s in series.items()} for nombre, series in _histogramas.items()},
+        }
+
+    # El control de admisión ya lleva sus cuentas por proceso
+    estado = admision.estado()
+    en_cola, en_vuelo = estado.pop("en_cola"), estado.pop("en_vuelo")
+    datos["contadores"]["proyectos_admision_total"] = {
+        _etiquetas(evento=evento): valor for evento, valor in estado.items()
+    }
+
+    # Y la caché de sinopsis (la tasa de aciertos se calcula en Prometheus)
+    cache = cache_sinopsis.estadisticas()
+    datos["contadores"]["proyectos_sinopsis_cache_total"] = {
+        _etiquetas(resultado=resultado): cache[resultado]
+        for resultado in ("aciertos_memoria", "aciertos_bd", "fallos")
+    }
+    datos["medidores"] = {
+        "proyectos_admision_en_cola": {"": en_cola},
+        "proyectos_admision_en_vuelo": {"": en_vuelo},
+        "proyectos_sinopsis_cache_entradas": {"": cache["entradas_memoria"]},
+    }
+    return datos
+
+
+def _ruta_propia():
+    global _archivo
+    pid = os.getpid()
+    # Tras un fork (gunicorn --preload) cada worker estrena archivo; la marca
+    # evita pisar el de un proceso muerto que tuvo el mismo pid
+    if _archivo is None or _archivo[0] != pid:
+        _archivo = (pid, os.path.join(DIRECTORIO, f"{pid}-{time.time_ns()}.json"))
+    return _archivo[1]
+
+
+def volcar():
+    """Escribe la copia de este proceso para que la vea /metricas/."""
+    ruta = _ruta_propia()
+    try:
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w") as f:
+            json.dump(_instantanea(), f)
+        os.replace(temporal, ruta)
+    except OSError:
+        logger.exception("No se pudieron escribir las métricas en %s", DIRECTORIO)
+
+
+def volcar_si_toca():
+    global _ultimo_volcado
+
+    with _lock:
+        ahora = time.monotonic()
+        toca_volcar = ahora - _ultimo_volcado >= INTERVALO
+        if toca_volcar:
+            _ultimo_volcado = ahora
+
+    if toca_volcar:
+        volcar()
+
+
+atexit.register(volcar)
+
+
+# ------------------------------------
+# AGREGADO ENTRE WORKERS
+# ------------------------------------
+def _vacio():
+    return {"contadores": {}, "histogramas": {}, "medidores": {}}
+
+
+def _sumar(total, datos, con_medidores=True):
+    for nombre, series in datos.get("contadores", {}).items():
+        destino = total["contadores"].setdefault(nombre, {})
+        for etiquetas, valor in series.items():
+            destino[etiquetas] = destino.get(etiquetas, 0) + valor
+    for nombre, series in datos.get("histogramas", {}).items():
+        destino = total["histogramas"].setdefault(nombre, {})
+        for etiquetas, serie in series.items():
+            previa = destino.get(etiquetas)
+            destino[etiquetas] = [a + b for a, b in zip(previa, serie)] if previa else list(serie)
+    if con_medidores:
+        for nombre, series in datos.get("medidores", {}).items():
+            destino = total["medidores"].setdefault(nombre, {})
+            for etiquetas, valor in series.items():
+                destino[etiquetas] = destino.get(etiquetas, 0) + valor
+
+
+def _leer(ruta):
+    try:
+        with open(ruta) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _archivar_muertos():
+    """Suma a historico.json lo de los workers que ya terminaron (reinicios,
+    max_requests) y borra sus archivos. Los medidores no se conservan."""
+    if fcntl is None:
+        return
+    with open(os.path.join(DIRECTORIO, ".bloqueo"), "w") as bloqueo:
+        fcntl.flock(bloqueo, fcntl.LOCK_EX)
+        muertos = [
+            ruta for ruta in glob.glob(os.path.join(DIRECTORIO, "*-*.json"))
+            if not _vivo(int(os.path.basename(ruta).split("-")[0]))
+        ]
+        if not muertos:
+            return
+
+        historico_ruta = os.path.join(DIRECTORIO, "historico.json")
+        historico = _leer(historico_ruta) or _vacio()
+        for ruta in muertos:
+            datos = _leer(ruta)
+            if datos:
+                _sumar(historico, datos, con_medidores=False)
+        temporal = f"{historico_ruta}.tmp"
+        with open(temporal, "w") as f:
+            json.dump(historico, f)
+        os.replace(temporal, historico_ruta)
+        for ruta in muertos:
+            os.remove(ruta)
+
+
+def agregar():
+    """Suma de todos los procesos de esta máquina (incluido éste, al día)."""
+    volcar()
+    try:
+        _archivar_muertos()
+    except OSError:
+        logger.exception("No se pudieron archivar las métricas de workers terminados")
+
+    total = _vacio()
+    for ruta in glob.glob(os.path.join(DIRECTORIO, "*.json")):
+        datos = _leer(ruta)
+        if datos:
+            _sumar(total, datos)
+    return total
+
+
+# ------------------------------------
+# FORMATO DE TEXTO DE PROMETHEUS
+# ------------------------------------
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) and not valor.is_integer() else str(int(valor))
+
+
+def exportar():
+    total = agregar()
+    lineas = []
+
+    for nombre, ayuda in CONTADORES.items():
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter"]
+        for etiquetas, valor in sorted(total["contadores"].get(nombre, {}).items()):
+            lineas.append(f"{nombre}{{{etiquetas}}} {_numero(valor)}")
+
+    for nombre, ayuda in MEDIDORES.items():
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge"]
+        for etiquetas, valor in sorted(total["medidores"].get(nombre, {}).items()):
+            lineas.append(f"{nombre}{{{etiquetas}}} {_numero(valor)}" if etiquetas else f"{nombre} {_numero(valor)}")
+
+    for nombre, (buckets, ayuda) in HISTOGRAMAS.items():
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} histogram"]
+        for etiquetas, serie in sorted(total["histogramas"].get(nombre, {}).items()):
+            acumulado = 0
+            for limite, cuenta in zip([*buckets, "+Inf"], serie):
+                acumulado += cuenta
+                lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f"{nombre}_sum{{{etiquetas}}} {_numero(serie[-1])}")
+            lineas.append(f"{nombre}_count{{{etiquetas}}} {acumulado}")
+
+    return "\n".join(lineas) + "\n"
+
+
+# ------------------------------------
+# MIDDLEWARE
+# ------------------------------------
+class MetricasMiddleware:
+    """Primero en MIDDLEWARE: mide la petición completa. Sirve en WSGI y ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        with Medicion() as medicion:
+            response = self.get_response(request)
+        medicion.registrar(request, response)
+        return response
+
+    async def __acall__(self, request):
+        with Medicion() as medicion:
+            response = await self.get_response(request)
+        medicion.registrar(request, response)
+        return response
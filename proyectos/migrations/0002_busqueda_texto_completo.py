@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+from proyectos import busqueda
+
+
+def crear_indice(apps, schema_editor):
+    busqueda.crear_indice(schema_editor)
+
+
+def eliminar_indice(apps, schema_editor):
+    busqueda.eliminar_indice(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='texto_extraido',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AlterField(
+            model_name='proyecto',
+            name='año',
+            field=models.PositiveIntegerField(blank=True, choices=[(2020, 2020), (2021, 2021), (2022, 2022), (2023, 2023), (2024, 2024), (2025, 2025), (2026, 2026), (2027, 2027), (2028, 2028), (2029, 2029), (2030, 2030)], null=True),
+        ),
+        migrations.AlterField(
+            model_name='proyecto',
+            name='carrera',
+            field=models.CharField(blank=True, choices=[('Ingeniería en Sistemas Computacionales', 'Ingeniería en Sistemas Computacionales'), ('Mecatrónica', 'Mecatrónica'), ('Ingeniería en Sistemas Automotrices', 'Ingeniería en Sistemas Automotrices'), ('Arquitectura', 'Arquitectura'), ('Contabilidad', 'Contabilidad')], max_length=150),
+        ),
+        migrations.AlterField(
+            model_name='proyecto',
+            name='tipo',
+            field=models.CharField(blank=True, choices=[('Informe de Investigación', 'Informe de Investigación'), ('Proyecto de Investigación', 'Proyecto de Investigación')], max_length=100),
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0003_cola_de_tareas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SinopsisCache',
+            fields=[
+                ('clave', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('modelo', models.CharField(max_length=100)),
+                ('sinopsis', models.TextField()),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+def calcular_estadisticas(apps, schema_editor):
+    from proyectos.estadisticas import recalcular
+
+    recalcular(apps.get_model('proyectos', 'Proyecto'), apps.get_model('proyectos', 'Estadistica'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0004_cache_sinopsis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Estadistica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('carrera', 'Carrera'), ('tipo', 'Tipo'), ('año', 'Año'), ('mes', 'Mes de subida')], max_length=20)),
+                ('valor', models.CharField(blank=True, max_length=150)),
+                ('proyectos', models.IntegerField(default=0)),
+                ('descargas', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['dimension', 'valor'],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'valor'), name='estadistica_dimension_valor_unica')],
+            },
+        ),
+        migrations.RunPython(calcular_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 6.0 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from proyectos import busqueda
+
+
+def crear_indice_titulo(apps, schema_editor):
+    busqueda.crear_indice_titulo(schema_editor)
+
+
+def eliminar_indice_titulo(apps, schema_editor):
+    busqueda.eliminar_indice_titulo(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0005_estadisticas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='proyecto',
+            name='creado_por',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['-fecha_subida', '-id'], name='proyecto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['tipo', '-fecha_subida', '-id'], name='proyecto_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['carrera', '-fecha_subida', '-id'], name='proyecto_carrera_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['año', '-fecha_subida', '-id'], name='proyecto_anio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['creado_por', '-fecha_subida', '-id'], name='proyecto_autor_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['titulo', 'creado_por'], name='proyecto_titulo_autor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['-descargas', '-id'], name='proyecto_descargas_idx'),
+        ),
+        migrations.RunPython(crear_indice_titulo, eliminar_indice_titulo),
+    ]
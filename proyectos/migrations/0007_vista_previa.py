@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0006_indices_listado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='paginas_vista_previa',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
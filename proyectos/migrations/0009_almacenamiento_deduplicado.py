@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 19:05
+
+import proyectos.almacenamiento
+import proyectos.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0008_bandeja_correo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('tamano', models.BigIntegerField(default=0)),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='proyecto',
+            name='archivo',
+            field=models.FileField(storage=proyectos.almacenamiento.almacenamiento_deduplicado, upload_to='proyectos/', validators=[proyectos.models.validar_archivo]),
+        ),
+        migrations.AlterField(
+            model_name='proyecto',
+            name='portada',
+            field=models.ImageField(blank=True, null=True, storage=proyectos.almacenamiento.almacenamiento_deduplicado, upload_to='portadas/', validators=[proyectos.models.validar_imagen]),
+        ),
+    ]
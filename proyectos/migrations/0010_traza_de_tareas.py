@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0009_almacenamiento_deduplicado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarea',
+            name='traza',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 17:55
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copiar_fecha_subida(apps, schema_editor):
+    # Sin historial, lo existente se da por modificado cuando se subió
+    Proyecto = apps.get_model("proyectos", "Proyecto")
+    Proyecto.objects.update(actualizado=F("fecha_subida"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0010_traza_de_tareas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copiar_fecha_subida, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['actualizado', 'id'], name='proyecto_actualizado_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0011_fecha_actualizado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['archivo'], name='proyecto_archivo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['portada'], name='proyecto_portada_idx'),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# proyectos/miniaturas.py
+import io
+import logging
+import re
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# MINIATURAS Y VARIANTES RESPONSIVAS
+# ------------------------------------
+# De cada imagen subida (portada, avatar) se derivan copias reducidas en
+# WebP y JPEG, guardadas junto al resto de media en
+#   miniaturas/<variante>/<imagen original>/<ancho>.<webp|jpg>
+# Se generan al subir (tarea "miniaturas"), con `manage.py generar_miniaturas`
+# o, si faltan, en la primera petición a su URL (ver views.servir_media).
+
+VARIANTES = {
+    # anchos en px; "cuadrada" recorta al centro; "sizes" va al <img>
+    "tarjeta": {"anchos": (360, 720), "cuadrada": False, "sizes": "(min-width: 768px) 33vw, 100vw"},
+    "detalle": {"anchos": (600, 1200), "cuadrada": False, "sizes": "(min-width: 992px) 800px, 100vw"},
+    "mini": {"anchos": (120, 240), "cuadrada": False, "sizes": "120px"},
+    "avatar": {"anchos": (40, 80, 180, 360), "cuadrada": True, "sizes": "40px"},
+}
+
+FORMATOS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True})}
+
+PREFIJO = "miniaturas/"
+_RUTA = re.compile(r"^miniaturas/(?P<variante>\w+)/(?P<original>.+)/(?P<ancho>\d+)\.(?P<formato>webp|jpg)$")
+
+
+def ruta(original, variante, ancho, formato):
+    return f"{PREFIJO}{variante}/{original}/{ancho}.{formato}"
+
+
+def interpretar(nombre):
+    """(original, variante, ancho, formato) si `nombre` es una variante válida, si no None."""
+    coincide = _RUTA.match(nombre)
+    if not coincide:
+        return None
+    variante, ancho = coincide["variante"], int(coincide["ancho"])
+    if variante not in VARIANTES or ancho not in VARIANTES[variante]["anchos"]:
+        return None
+    return coincide["original"], variante, ancho, coincide["formato"]
+
+
+def _reducir(imagen, ancho, cuadrada):
+    if cuadrada:
+        return ImageOps.fit(imagen, (ancho, ancho), Image.LANCZOS)
+    copia = imagen.copy()
+    # Sólo se limita el ancho; nunca se amplía
+    copia.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+    return copia
+
+
+def _codificar(imagen, formato):
+    nombre_pil, opciones = FORMATOS[formato]
+    if formato == "jpg" and imagen.mode != "RGB":
+        # JPEG no tiene transparencia: se aplana sobre blanco
+        fondo = Image.new("RGB", imagen.size, (255, 255, 255))
+        rgba = imagen.convert("RGBA")
+        fondo.paste(rgba, mask=rgba.getchannel("A"))
+        imagen = fondo
+    elif imagen.mode not in ("RGB", "RGBA"):
+        imagen = imagen.convert("RGBA" if "transparency" in imagen.info else "RGB")
+
+    salida = io.BytesIO()
+    imagen.save(salida, nombre_pil, **opciones)
+    return salida.getvalue()
+
+
+def generar(original, variante, solo=None, forzar=False):
+    """Genera las variantes de `original` (nombre en el storage).
+
+    `solo` limita a un (ancho, formato). Devuelve cuántos archivos se crearon.
+    """
+    config = VARIANTES[variante]
+    pendientes = [
+        (ancho, formato)
+        for ancho in config["anchos"]
+        for formato in FORMATOS
+        if (solo is None or (ancho, formato) == solo)
+        and (forzar or not default_storage.exists(ruta(original, variante, ancho, formato)))
+    ]
+    if not pendientes:
+        return 0
+
+    try:
+        with default_storage.open(original, "rb") as f:
+            imagen = Image.open(f)
+            # draft() deja que el decodificador JPEG reduzca al leer
+            imagen.draft("RGB", (max(a for a, _ in pendientes) * 2,) * 2)
+            imagen = ImageOps.exif_transpose(imagen)
+            imagen.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as e:
+        logger.warning("No se pudo leer %s para miniaturas: %s", original, e)
+        return 0
+
+    creadas = 0
+    for ancho in sorted({a for a, _ in pendientes}, reverse=True):
+        reducida = _reducir(imagen, ancho, config["cuadrada"])
+        for a, formato in pendientes:
+            if a != ancho:
+                continue
+            destino = ruta(original, variante, ancho, formato)
+            if forzar and default_storage.exists(destino):
+                default_storage.delete(destino)
+            default_storage.save(destino, ContentFile(_codificar(reducida, formato)))
+            creadas += 1
+    return creadas
+
+
+def generar_desde_ruta(nombre):
+    """Para servir_media: crea la variante pedida si es válida. True si existe."""
+    datos = interpretar(nombre)
+    if datos is None:
+        return False
+    original, variante, ancho, formato = datos
+    if not default_storage.exists(original):
+        return False
+    generar(original, variante, solo=(ancho, formato))
+    return default_storage.exists(nombre)
+
+
+def srcset(original, variante, formato):
+    return ", ".join(
+        f"{default_storage.url(ruta(original, variante, ancho, formato))} {ancho}w"
+        for ancho in VARIANTES[variante]["anchos"]
+    )
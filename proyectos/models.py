@@ -3,6 +3,9 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.utils import timezone
+
+from .almacenamiento import almacenamiento_deduplicado
 
 # ------------------------------------
 # VALIDADORES
@@ -95,6 +98,18 @@ class Proyecto(models.Model):
 
     AÑO_CHOICES = [(year, year) for year in range(2020, 2031)]
 
+    SINOPSIS_PENDIENTE = "pendiente"
+    SINOPSIS_PROCESANDO = "procesando"
+    SINOPSIS_LISTA = "lista"
+    SINOPSIS_ERROR = "error"
+
+    ESTADO_SINOPSIS_CHOICES = [
+        (SINOPSIS_PENDIENTE, "Pendiente"),
+        (SINOPSIS_PROCESANDO, "Procesando"),
+        (SINOPSIS_LISTA, "Lista"),
+        (SINOPSIS_ERROR, "Error"),
+    ]
+
     titulo = models.CharField(max_length=250)
     autor = models.CharField(max_length=200, editable=False)
     descripcion = models.TextField(blank=True)
@@ -119,6 +134,7 @@ class Proyecto(models.Model):
 
     portada = models.ImageField(
         upload_to='portadas/',
+        storage=almacenamiento_deduplicado,
         null=True,
         blank=True,
         validators=[validar_imagen]
@@ -126,24 +142,203 @@ class Proyecto(models.Model):
 
     archivo = models.FileField(
         upload_to='proyectos/',
+        storage=almacenamiento_deduplicado,
         validators=[validar_archivo]
     )
 
     sinopsis_ia = models.TextField(blank=True, null=True)
 
+    estado_sinopsis = models.CharField(
+        max_length=20,
+        choices=ESTADO_SINOPSIS_CHOICES,
+        default=SINOPSIS_LISTA
+    )
+
+    # Texto extraído del PDF/DOCX; alimenta el índice de búsqueda
+    texto_extraido = models.TextField(blank=True, default="", editable=False)
+
+    # Páginas renderizadas como imagen (vista_previa.py); None = aún no se intentó
+    paginas_vista_previa = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+
     descargas = models.PositiveIntegerField(default=0)
 
     creado_por = models.ForeignKey(
         Usuario,
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        db_index=False  # lo cubre proyecto_autor_fecha_idx
     )
 
     fecha_subida = models.DateTimeField(auto_now_add=True)
 
+    # Última modificación de lo que publica la API (updated_since).
+    # Con save(update_fields=...) hay que incluirlo; las descargas no lo tocan.
+    actualizado = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ['-fecha_subida']
+        # Cada índice sigue un acceso real: filtro del listado + orden del
+        # cursor (fecha_subida, id), mis proyectos, duplicados al subir, el
+        # top de descargas y los deltas de la API (actualizado, id). El
+        # trigram de titulo se crea en la migración 0006.
+        indexes = [
+            models.Index(fields=['-fecha_subida', '-id'], name='proyecto_fecha_idx'),
+            models.Index(fields=['tipo', '-fecha_subida', '-id'], name='proyecto_tipo_fecha_idx'),
+            models.Index(fields=['carrera', '-fecha_subida', '-id'], name='proyecto_carrera_fecha_idx'),
+            models.Index(fields=['año', '-fecha_subida', '-id'], name='proyecto_anio_fecha_idx'),
+            models.Index(fields=['creado_por', '-fecha_subida', '-id'], name='proyecto_autor_fecha_idx'),
+            models.Index(fields=['titulo', 'creado_por'], name='proyecto_titulo_autor_idx'),
+            models.Index(fields=['-descargas', '-id'], name='proyecto_descargas_idx'),
+            models.Index(fields=['actualizado', 'id'], name='proyecto_actualizado_idx'),
+            # Quién usa un blob: reutilizar texto/vistas previas y el último delete()
+            models.Index(fields=['archivo'], name='proyecto_archivo_idx'),
+            models.Index(fields=['portada'], name='proyecto_portada_idx'),
+        ]
 
     def __str__(self):
         return self.titulo
+
+
+# ------------------------------------
+# COLA DE TAREAS EN SEGUNDO PLANO
+# ------------------------------------
+class Tarea(models.Model):
+    PENDIENTE = "pendiente"
+    EN_PROCESO = "en_proceso"
+    COMPLETADA = "completada"
+    FALLIDA = "fallida"
+
+    ESTADO_CHOICES = [
+        (PENDIENTE, "Pendiente"),
+        (EN_PROCESO, "En proceso"),
+        (COMPLETADA, "Completada"),
+        (FALLIDA, "Fallida"),
+    ]
+
+    tipo = models.CharField(max_length=50)
+
+    proyecto = models.ForeignKey(
+        Proyecto,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="tareas"
+    )
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+
+    # Pendiente: no antes de esta fecha. En proceso: fin del bloqueo del worker.
+    ejecutar_despues = models.DateTimeField(default=timezone.now)
+
+    error = models.TextField(blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    actualizada = models.DateTimeField(auto_now=True)
+
+    # Traza de la petición que la encoló (trazas.py); el worker la continúa
+    traza = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        ordering = ["ejecutar_despues", "id"]
+        indexes = [models.Index(fields=["estado", "ejecutar_despues"])]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+
+# ------------------------------------
+# CACHÉ DE SINOPSIS IA
+# ------------------------------------
+class SinopsisCache(models.Model):
+    # SHA-256 del texto normalizado + modelo + versión del prompt
+    clave = models.CharField(max_length=64, primary_key=True)
+    modelo = models.CharField(max_length=100)
+    sinopsis = models.TextField()
+    creada = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.clave[:12]} ({self.modelo})"
+
+
+# ------------------------------------
+# ESTADÍSTICAS PRECALCULADAS
+# ------------------------------------
+class Estadistica(models.Model):
+    DIMENSION_CHOICES = [
+        ("total", "Total"),
+        ("carrera", "Carrera"),
+        ("tipo", "Tipo"),
+        ("año", "Año"),
+        ("mes", "Mes de subida"),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    valor = models.CharField(max_length=150, blank=True)  # "" en el total; "2025-12" en mes
+    proyectos = models.IntegerField(default=0)
+    descargas = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["dimension", "valor"]
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "valor"], name="estadistica_dimension_valor_unica")
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.valor}: {self.proyectos} proyectos, {self.descargas} descargas"
+
+
+# ------------------------------------
+# BANDEJA DE SALIDA DE CORREO
+# ------------------------------------
+class CorreoSaliente(models.Model):
+    PENDIENTE = "pendiente"
+    ENVIANDO = "enviando"
+    ENVIADO = "enviado"
+    FALLIDO = "fallido"
+
+    ESTADO_CHOICES = [
+        (PENDIENTE, "Pendiente"),
+        (ENVIANDO, "Enviando"),
+        (ENVIADO, "Enviado"),
+        (FALLIDO, "Fallido"),
+    ]
+
+    asunto = models.CharField(max_length=255, blank=True)
+    remitente = models.CharField(max_length=255)
+    destinatarios = models.JSONField(default=list)  # to + cc + bcc
+    mensaje = models.TextField()                    # MIME completo, tal cual se envía
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+    ejecutar_despues = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True)
+
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["ejecutar_despues", "id"]
+        indexes = [models.Index(fields=["estado", "ejecutar_despues"])]
+        verbose_name = "correo saliente"
+        verbose_name_plural = "correos salientes"
+
+    def __str__(self):
+        return f"{self.asunto} → {', '.join(self.destinatarios)} [{self.estado}]"
+
+
+# ------------------------------------
+# ARCHIVOS DEDUPLICADOS
+# ------------------------------------
+class Blob(models.Model):
+    # Un archivo guardado por AlmacenamientoDeduplicado (almacenamiento.py)
+    nombre = models.CharField(max_length=255, unique=True)   # proyectos/ab/abcd….pdf
+    digest = models.CharField(max_length=64, db_index=True)  # sha256 del contenido
+    tamano = models.BigIntegerField(default=0)
+    referencias = models.PositiveIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} referencias)"
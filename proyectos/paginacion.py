@@ -0,0 +1,130 @@
+# proyectos/paginacion.py
+from datetime import datetime
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# ------------------------------------
+# PAGINACIÓN POR CURSOR (KEYSET)
+# ------------------------------------
+# En lugar de COUNT(*) + OFFSET, cada página se pide como
+#   WHERE (fecha_subida, id) < (última fecha, último id) ORDER BY ... LIMIT n
+# así que la página 500 cuesta lo mismo que la primera. El cursor es un
+# token firmado y opaco con los valores de la última (o primera) fila.
+
+SALT = "proyectos.paginacion"
+
+
+def _codificar(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def _decodificar(valor):
+    if isinstance(valor, str):
+        fecha = parse_datetime(valor)
+        if fecha is not None:
+            return fecha
+    return valor
+
+
+class PaginaCursor:
+    def __init__(self, object_list, cursor_siguiente, cursor_anterior, total_aproximado=None):
+        self.object_list = object_list
+        self.next_cursor = cursor_siguiente
+        self.previous_cursor = cursor_anterior
+        self.total_aproximado = total_aproximado
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class PaginadorCursor:
+    """Pagina `queryset` por `orden`, que debe ser un orden total (termina en id).
+
+    Todos los campos de `orden` van en el mismo sentido: ("-fecha_subida", "-id")
+    o ("actualizado", "id").
+    """
+
+    def __init__(self, queryset, por_pagina, orden=("-fecha_subida", "-id")):
+        self.queryset = queryset
+        self.por_pagina = por_pagina
+        self.orden = tuple(orden)
+        self.descendente = self.orden[0].startswith("-")
+        self.campos = tuple(campo.lstrip("-") for campo in self.orden)
+
+    # ---------- tokens ----------
+    def _token(self, fila, direccion):
+        valores = [_codificar(getattr(fila, campo)) for campo in self.campos]
+        return signing.dumps({"v": valores, "d": direccion}, salt=SALT, compress=True)
+
+    def _leer_token(self, cursor):
+        try:
+            datos = signing.loads(cursor, salt=SALT)
+            valores = [_decodificar(v) for v in datos["v"]]
+            direccion = datos["d"]
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None, None
+        if len(valores) != len(self.campos) or direccion not in ("sig", "ant"):
+            return None, None
+        return valores, direccion
+
+    # ---------- consulta ----------
+    def _despues_de(self, valores, hacia_adelante):
+        # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND b > y) OR ...
+        menor = self.descendente == hacia_adelante
+        operador = "lt" if menor else "gt"
+        condicion = Q()
+        for i, campo in enumerate(self.campos):
+            iguales = {self.campos[j]: valores[j] for j in range(i)}
+            condicion |= Q(**iguales, **{f"{campo}__{operador}": valores[i]})
+        return condicion
+
+    def pagina(self, cursor=None, total_aproximado=None):
+        valores, direccion = self._leer_token(cursor) if cursor else (None, None)
+        hacia_adelante = direccion != "ant"
+
+        if hacia_adelante:
+            orden = self.orden
+        else:
+            orden = tuple(c[1:] if c.startswith("-") else f"-{c}" for c in self.orden)
+
+        qs = self.queryset.order_by(*orden)
+        if valores is not None:
+            qs = qs.filter(self._despues_de(valores, hacia_adelante))
+
+        filas = list(qs[:self.por_pagina + 1])
+        hay_mas = len(filas) > self.por_pagina
+        filas = filas[:self.por_pagina]
+
+        if not hacia_adelante:
+            filas.reverse()
+
+        if not filas:
+            return PaginaCursor([], None, None, total_aproximado)
+
+        if hacia_adelante:
+            hay_siguiente, hay_anterior = hay_mas, valores is not None
+        else:
+            hay_siguiente, hay_anterior = True, hay_mas
+
+        return PaginaCursor(
+            filas,
+            self._token(filas[-1], "sig") if hay_siguiente else None,
+            self._token(filas[0], "ant") if hay_anterior else None,
+            total_aproximado,
+        )
@@ -0,0 +1,98 @@
+# proyectos/resumen.py
+from django.conf import settings
+
+# ------------------------------------
+# RESUMEN POR FRAGMENTOS (MAP-REDUCE)
+# ------------------------------------
+# Un documento largo no va entero en un solo prompt: se parte por páginas o
+# párrafos en fragmentos de hasta TOKENS_POR_FRAGMENTO, cada fragmento se
+# resume por separado (en paralelo) y la sinopsis final se escribe a partir
+# de esos resúmenes parciales. Aquí sólo están la partición y los prompts;
+# las llamadas a Gemini están en utils.py.
+
+TOKENS_POR_FRAGMENTO = getattr(settings, "SINOPSIS_TOKENS_POR_FRAGMENTO", 6000)
+MAX_FRAGMENTOS = getattr(settings, "SINOPSIS_MAX_FRAGMENTOS", 12)
+CONCURRENCIA = getattr(settings, "SINOPSIS_CONCURRENCIA_FRAGMENTOS", 4)
+
+# Aproximación suficiente para español sin cargar un tokenizador
+CARACTERES_POR_TOKEN = 4
+
+
+def estimar_tokens(texto):
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+def _normalizar(texto):
+    return " ".join(texto.split())
+
+
+def _partir_bloque(bloque, limite):
+    # Un párrafo/página más grande que el límite se corta por palabras
+    palabras = bloque.split()
+    actual, largo = [], 0
+    for palabra in palabras:
+        if largo + len(palabra) + 1 > limite and actual:
+            yield " ".join(actual)
+            actual, largo = [], 0
+        actual.append(palabra)
+        largo += len(palabra) + 1
+    if actual:
+        yield " ".join(actual)
+
+
+def dividir(texto, tokens=None):
+    """Parte `texto` en fragmentos normalizados de hasta `tokens` tokens.
+    Sólo se corta en saltos de línea (páginas y párrafos de la extracción),
+    salvo que un bloque solo ya supere el límite."""
+    limite = (tokens or TOKENS_POR_FRAGMENTO) * CARACTERES_POR_TOKEN
+    bloques = [_normalizar(b) for b in texto.splitlines()]
+
+    fragmentos, actual = [], ""
+    for bloque in filter(None, bloques):
+        for trozo in _partir_bloque(bloque, limite) if len(bloque) > limite else [bloque]:
+            if actual and len(actual) + len(trozo) + 1 > limite:
+                fragmentos.append(actual)
+                actual = ""
+            actual = f"{actual} {trozo}" if actual else trozo
+    if actual:
+        fragmentos.append(actual)
+    return fragmentos
+
+
+def seleccionar(fragmentos, maximo=None):
+    """Si hay más de `maximo`, se toman fragmentos repartidos por todo el
+    documento (siempre el primero y el último) para acotar el tiempo."""
+    maximo = maximo or MAX_FRAGMENTOS
+    if len(fragmentos) <= maximo:
+        return fragmentos
+    if maximo == 1:
+        return fragmentos[:1]
+    paso = (len(fragmentos) - 1) / (maximo - 1)
+    return [fragmentos[round(i * paso)] for i in range(maximo)]
+
+
+# ------------------------------------
+# PROMPTS
+# ------------------------------------
+def prompt_sinopsis(texto):
+    return (
+        "Elabora una sinopsis breve, objetiva y de estilo académico sobre el siguiente contenido. "
+        "Limítate a 3–5 líneas y destaca únicamente el propósito, metodología y conclusión general del texto:\n\n"
+        f"{texto}"
+    )
+
+
+def prompt_fragmento(fragmento, numero, total):
+    return (
+        f"El siguiente texto es la parte {numero} de {total} de un documento académico. "
+        "Resúmela en un párrafo de no más de 8 líneas, conservando objetivos, métodos, "
+        "resultados y conclusiones que aparezcan en ella. No añadas información:\n\n"
+        f"{fragmento}"
+    )
+
+
+def prompt_reduccion(parciales):
+    partes = "\n\n".join(f"[Parte {i}] {p}" for i, p in enumerate(parciales, 1))
+    return prompt_sinopsis(
+        "(Resúmenes parciales, en orden, de las partes de un mismo documento)\n\n" + partes
+    )
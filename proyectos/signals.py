@@ -1,10 +1,123 @@
 # proyectos/signals.py
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_migrate, pre_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from .models import Usuario, Perfil
+from .models import Usuario, Perfil, Proyecto
+from .busqueda import asegurar_triggers_sqlite
+from . import estadisticas, cache_listado
+from .context_processors import invalidar as invalidar_navegacion
 
 @receiver(post_save, sender=Usuario)
 def crear_perfil(sender, instance, created, **kwargs):
     if created:
         Perfil.objects.create(usuario=instance)
+
+
+# Nombre y avatar de la barra de navegación (context_processors.navegacion)
+@receiver(post_save, sender=Usuario)
+@receiver(post_save, sender=Perfil)
+def invalidar_barra(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_navegacion(instance.pk if sender is Usuario else instance.usuario_id)
+
+
+@receiver(post_migrate)
+def reparar_indice_busqueda(sender, using, **kwargs):
+    if sender.name == "proyectos":
+        asegurar_triggers_sqlite(using)
+
+
+# ------------------------------------
+# ESTADÍSTICAS DEL DASHBOARD
+# ------------------------------------
+@receiver(pre_save, sender=Proyecto)
+def recordar_dimensiones(sender, instance, update_fields=None, **kwargs):
+    instance._estadistica_anterior = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not {"carrera", "tipo", "año"} & set(update_fields):
+        return
+    instance._estadistica_anterior = (
+        Proyecto.objects.filter(pk=instance.pk)
+        .values_list("carrera", "tipo", "año", "fecha_subida", "descargas")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Proyecto)
+def actualizar_estadisticas(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        estadisticas.ajustar(estadisticas.claves_de(instance), proyectos=1, descargas=instance.descargas)
+        return
+
+    anterior = getattr(instance, "_estadistica_anterior", None)
+    if anterior is None:
+        return
+    carrera, tipo, año, fecha, descargas = anterior
+    antes = estadisticas.claves(carrera, tipo, año, fecha)
+    despues = estadisticas.claves(instance.carrera, instance.tipo, instance.año, fecha)
+    if antes != despues:
+        # Se mueve el proyecto (y sus descargas) a sus nuevas categorías
+        estadisticas.ajustar([c for c in antes if c not in despues], proyectos=-1, descargas=-descargas)
+        estadisticas.ajustar([c for c in despues if c not in antes], proyectos=1, descargas=descargas)
+
+
+@receiver(post_delete, sender=Proyecto)
+def descontar_estadisticas(sender, instance, **kwargs):
+    estadisticas.ajustar(estadisticas.claves_de(instance), proyectos=-1, descargas=-instance.descargas)
+
+
+# ------------------------------------
+# CACHÉ DEL LISTADO DE INICIO
+# ------------------------------------
+@receiver(post_save, sender=Proyecto)
+@receiver(post_delete, sender=Proyecto)
+def invalidar_listado(sender, raw=False, **kwargs):
+    if not raw:
+        # Tras el commit, para no cachear el estado anterior con la nueva generación
+        transaction.on_commit(cache_listado.invalidar)
+
+
+# ------------------------------------
+# REFERENCIAS A ARCHIVOS DEDUPLICADOS
+# ------------------------------------
+# Al cambiar o borrar el documento/portada se suelta la referencia al blob
+# anterior; AlmacenamientoDeduplicado sólo lo borra si era la última.
+CAMPOS_ARCHIVO = ("archivo", "portada")
+
+
+@receiver(pre_save, sender=Proyecto)
+def recordar_archivos(sender, instance, update_fields=None, **kwargs):
+    instance._archivos_anteriores = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(CAMPOS_ARCHIVO) & set(update_fields):
+        return
+    instance._archivos_anteriores = (
+        Proyecto.objects.filter(pk=instance.pk).values_list(*CAMPOS_ARCHIVO).first()
+    )
+
+
+def _soltar(campo, nombre):
+    if nombre:
+        storage = Proyecto._meta.get_field(campo).storage
+        transaction.on_commit(lambda: storage.delete(nombre))
+
+
+@receiver(post_save, sender=Proyecto)
+def soltar_archivos_reemplazados(sender, instance, raw=False, **kwargs):
+    anteriores = getattr(instance, "_archivos_anteriores", None)
+    if raw or anteriores is None:
+        return
+    for campo, anterior in zip(CAMPOS_ARCHIVO, anteriores):
+        if anterior != getattr(instance, campo).name:
+            _soltar(campo, anterior)
+
+
+@receiver(post_delete, sender=Proyecto)
+def soltar_archivos(sender, instance, **kwargs):
+    for campo in CAMPOS_ARCHIVO:
+        _soltar(campo, getattr(instance, campo).name)
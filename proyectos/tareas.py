@@ -0,0 +1,246 @@
+# proyectos/tareas.py
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import cache_listado, trazas
+from .models import Proyecto, Tarea
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# CONFIGURACIÓN
+# ------------------------------------
+MAX_INTENTOS = getattr(settings, "TAREAS_MAX_INTENTOS", 5)
+RETRASO_BASE = getattr(settings, "TAREAS_RETRASO_BASE", 30)      # segundos
+RETRASO_MAX = getattr(settings, "TAREAS_RETRASO_MAX", 3600)      # segundos
+BLOQUEO = getattr(settings, "TAREAS_BLOQUEO", 600)               # segundos
+
+# tipo -> (función, función a llamar cuando se agotan los intentos)
+MANEJADORES = {}
+
+
+def registrar(tipo, al_fallar=None):
+    def decorador(funcion):
+        MANEJADORES[tipo] = (funcion, al_fallar)
+        return funcion
+    return decorador
+
+
+def encolar(tipo, proyecto=None, retraso=0):
+    return Tarea.objects.create(
+        tipo=tipo,
+        proyecto=proyecto,
+        max_intentos=MAX_INTENTOS,
+        ejecutar_despues=timezone.now() + timedelta(seconds=retraso),
+        traza=trazas.traza_actual(),
+    )
+
+
+def calcular_retraso(intentos):
+    # Backoff exponencial con jitter: 30s, 60s, 120s... hasta RETRASO_MAX
+    retraso = min(RETRASO_BASE * 2 ** max(intentos - 1, 0), RETRASO_MAX)
+    return retraso * random.uniform(0.8, 1.2)
+
+
+# ------------------------------------
+# RECLAMAR Y EJECUTAR
+# ------------------------------------
+def reclamar_siguiente():
+    """Marca como en proceso la siguiente tarea disponible y la devuelve.
+
+    Una tarea "en proceso" cuyo bloqueo expiró (worker caído) vuelve a
+    estar disponible si le quedan intentos; si no, se da por fallida. El
+    reclamo es un UPDATE condicional, así que varios workers pueden
+    competir sin bloquear filas.
+    """
+    ahora = timezone.now()
+    _descartar_agotadas(ahora)
+    candidatas = (
+        Tarea.objects
+        .filter(
+            Q(estado=Tarea.PENDIENTE) | Q(estado=Tarea.EN_PROCESO, intentos__lt=F("max_intentos")),
+            ejecutar_despues__lte=ahora,
+        )
+        .values_list("pk", "estado", "ejecutar_despues")[:10]
+    )
+
+    for pk, estado, ejecutar_despues in candidatas:
+        reclamada = Tarea.objects.filter(
+            pk=pk, estado=estado, ejecutar_despues=ejecutar_despues
+        ).update(
+            estado=Tarea.EN_PROCESO,
+            intentos=F("intentos") + 1,
+            ejecutar_despues=ahora + timedelta(seconds=BLOQUEO),
+            actualizada=ahora,
+        )
+        if reclamada:
+            return Tarea.objects.select_related("proyecto").get(pk=pk)
+
+    return None
+
+
+def _descartar_agotadas(ahora):
+    # Tareas que tumbaron al worker en su último intento: reclamarlas otra
+    # vez las reintentaría sin límite
+    agotadas = (
+        Tarea.objects
+        .filter(estado=Tarea.EN_PROCESO, ejecutar_despues__lte=ahora, intentos__gte=F("max_intentos"))
+        .values_list("pk", "ejecutar_despues")[:10]
+    )
+    for pk, ejecutar_despues in agotadas:
+        descartada = Tarea.objects.filter(
+            pk=pk, estado=Tarea.EN_PROCESO, ejecutar_despues=ejecutar_despues
+        ).update(
+            estado=Tarea.FALLIDA,
+            error="El worker no terminó la tarea en ninguno de sus intentos",
+            actualizada=ahora,
+        )
+        if not descartada:
+            continue
+        tarea = Tarea.objects.select_related("proyecto").get(pk=pk)
+        logger.error("Tarea %s descartada: bloqueo expirado tras %s intentos", tarea, tarea.intentos)
+        _, al_fallar = MANEJADORES.get(tarea.tipo, (None, None))
+        if al_fallar:
+            al_fallar(tarea)
+
+
+def ejecutar(tarea):
+    funcion, al_fallar = MANEJADORES.get(tarea.tipo, (None, None))
+
+    with trazas.traza(
+        f"tarea.{tarea.tipo}", traza_id=tarea.traza or None,
+        tarea=tarea.pk, proyecto=tarea.proyecto_id or 0, intento=tarea.intentos,
+    ) as traza:
+        try:
+            if funcion is None:
+                raise LookupError(f"Tipo de tarea desconocido: {tarea.tipo}")
+            funcion(tarea)
+
+        except Exception as e:
+            logger.exception("Falló la tarea %s (intento %s)", tarea, tarea.intentos)
+            tarea.error = str(e)
+            traza.resultado = f"error: {type(e).__name__}: {e}"[:300]
+
+            if tarea.intentos >= tarea.max_intentos or funcion is None:
+                tarea.estado = Tarea.FALLIDA
+                if al_fallar:
+                    al_fallar(tarea)
+            else:
+                tarea.estado = Tarea.PENDIENTE
+                tarea.ejecutar_despues = timezone.now() + timedelta(
+                    seconds=calcular_retraso(tarea.intentos)
+                )
+
+        else:
+            tarea.estado = Tarea.COMPLETADA
+            tarea.error = ""
+
+        tarea.save(update_fields=["estado", "error", "ejecutar_despues", "actualizada"])
+    return tarea
+
+
+def procesar_pendientes(max_tareas=None):
+    procesadas = 0
+    while max_tareas is None or procesadas < max_tareas:
+        tarea = reclamar_siguiente()
+        if tarea is None:
+            break
+        ejecutar(tarea)
+        procesadas += 1
+    return procesadas
+
+
+# ------------------------------------
+# MANEJADORES
+# ------------------------------------
+def _sinopsis_fallida(tarea):
+    if tarea.proyecto_id:
+        # update() no dispara señales: la API (ETag) y el listado se invalidan aquí
+        Proyecto.objects.filter(pk=tarea.proyecto_id).update(
+            estado_sinopsis=Proyecto.SINOPSIS_ERROR, actualizado=timezone.now()
+        )
+        cache_listado.invalidar()
+
+
+@registrar("miniaturas")
+def procesar_miniaturas(tarea):
+    from .miniaturas import generar
+
+    proyecto = tarea.proyecto
+    if proyecto is None or not proyecto.portada:
+        return
+    for variante in ("tarjeta", "detalle", "mini"):
+        generar(proyecto.portada.name, variante)
+
+
+@registrar("vista_previa")
+def procesar_vista_previa(tarea):
+    from .vista_previa import generar
+
+    proyecto = tarea.proyecto
+    # Otra tarea (p. ej. de dos visitas simultáneas) pudo generarla ya
+    if proyecto is None or proyecto.paginas_vista_previa is not None:
+        return
+    trazas.anotar(paginas=generar(proyecto))
+
+
+@registrar("sinopsis", al_fallar=_sinopsis_fallida)
+def procesar_sinopsis(tarea):
+    from .utils import extraer_documento, generar_sinopsis
+
+    proyecto = tarea.proyecto
+    if proyecto is None:
+        return
+
+    proyecto.estado_sinopsis = Proyecto.SINOPSIS_PROCESANDO
+    proyecto.save(update_fields=["estado_sinopsis", "actualizado"])
+
+    # El mismo documento (mismo blob) ya se extrajo para otro proyecto
+    if not proyecto.texto_extraido and proyecto.archivo:
+        previo = (
+            Proyecto.objects.filter(archivo=proyecto.archivo.name)
+            .exclude(pk=proyecto.pk).exclude(texto_extraido="")
+            .values_list("texto_extraido", flat=True).first()
+        )
+        if previo:
+            proyecto.texto_extraido = previo
+            proyecto.save(update_fields=["texto_extraido"])
+
+    # En un reintento el texto ya se extrajo; sólo falta la llamada a Gemini
+    if not proyecto.texto_extraido and proyecto.archivo:
+        try:
+            with trazas.tramo("extraer_texto") as tramo, proyecto.archivo.open("rb") as archivo:
+                extraccion = extraer_documento(archivo)
+                tramo.anotar(
+                    bytes=extraccion.bytes_leidos, paginas=extraccion.paginas,
+                    paginas_leidas=extraccion.paginas_leidas, truncado=extraccion.truncado,
+                )
+            texto = extraccion.texto
+            logger.info(
+                "Extracción de %s: %s/%s páginas, %s bytes leídos%s",
+                proyecto, extraccion.paginas_leidas, extraccion.paginas,
+                extraccion.bytes_leidos, " (truncado)" if extraccion.truncado else "",
+            )
+        except Exception:
+            logger.warning("No se pudo leer el archivo de %s", proyecto, exc_info=True)
+            texto = ""
+
+        # PostgreSQL no admite NUL en campos de texto
+        proyecto.texto_extraido = texto.replace("\x00", "")
+        proyecto.save(update_fields=["texto_extraido"])
+
+    if proyecto.texto_extraido.strip():
+        texto_base = proyecto.texto_extraido
+    else:
+        texto_base = f"{proyecto.titulo}\n{proyecto.descripcion}"
+
+    with trazas.tramo("sinopsis", caracteres=len(texto_base)):
+        proyecto.sinopsis_ia = generar_sinopsis(texto_base)
+    proyecto.estado_sinopsis = Proyecto.SINOPSIS_LISTA
+    with trazas.tramo("guardar"):
+        proyecto.save(update_fields=["sinopsis_ia", "estado_sinopsis", "actualizado"])
@@ -1,5 +1,9 @@
 # proyectos/templatetags/proyecto_tags.py
 from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from proyectos.miniaturas import VARIANTES, ruta, srcset
 
 register = template.Library()
 
@@ -14,3 +18,28 @@ def corta(value, max_length=100):
     if len(value) > max_length:
         return value[:max_length].rstrip() + '...'
     return value
+
+
+@register.simple_tag
+def imagen(archivo, variante, **atributos):
+    """<picture> con srcset WebP/JPEG de las miniaturas de `archivo`.
+
+    Uso: {% imagen proyecto.portada "tarjeta" class="card-img-top" alt=proyecto.titulo %}
+    """
+    if not archivo:
+        return ""
+
+    # Acepta un FieldFile o directamente el nombre en el storage
+    nombre = getattr(archivo, "name", archivo)
+    config = VARIANTES[variante]
+    sizes = atributos.pop("sizes", config["sizes"])
+    atributos = {"loading": "lazy", "decoding": "async", **atributos}
+    menor = ruta(nombre, variante, config["anchos"][0], "jpg")
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        srcset(nombre, variante, "webp"), sizes,
+        default_storage.url(menor), srcset(nombre, variante, "jpg"), sizes,
+        format_html_join("", ' {}="{}"', atributos.items()),
+    )
@@ -1,3 +1,674 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import shutil
+import smtplib
+import tempfile
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail, signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.http.multipartparser import MultiPartParser
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    admision, cache_listado, cache_sinopsis, catalogo_sintetico, contadores, correo, entrega, estadisticas,
+    metricas, miniaturas, paginacion, tareas, trazas, vista_previa,
+)
+from .models import Blob, CorreoSaliente, Estadistica, Proyecto, Tarea, Usuario
+
+
+# ------------------------------------
+# REFERENCIAS A BLOBS (almacenamiento.py)
+# ------------------------------------
+class ReferenciasBlobTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, True)
+        ajuste = override_settings(MEDIA_ROOT=self.media)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.storage = Proyecto._meta.get_field("archivo").storage
+
+    def _guardar(self, contenido=b"%PDF-1.4 documento"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.storage.save("proyectos/doc.pdf", ContentFile(contenido))
+
+    def _borrar(self, nombre):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(nombre)
+
+    def _referencias(self, nombre):
+        return Blob.objects.get(nombre=nombre).referencias
+
+    def _proyecto(self, contenido=b"%PDF-1.4 documento"):
+        proyecto = Proyecto(titulo="Prueba")
+        with self.captureOnCommitCallbacks(execute=True):
+            proyecto.archivo.save("doc.pdf", ContentFile(contenido), save=False)
+            proyecto.save()
+        return proyecto
+
+    def test_mismo_contenido_se_guarda_una_vez(self):
+        primero = self._guardar()
+        segundo = self._guardar()
+
+        self.assertEqual(primero, segundo)
+        self.assertEqual(self._referencias(primero), 2)
+        archivos = os.listdir(os.path.dirname(self.storage.path(primero)))
+        self.assertEqual(archivos, [os.path.basename(primero)])
+
+    def test_contenido_distinto_son_blobs_distintos(self):
+        self.assertNotEqual(self._guardar(b"uno"), self._guardar(b"dos"))
+
+    def test_el_ultimo_delete_borra_archivo_y_derivados(self):
+        nombre = self._guardar()
+        self._guardar()
+        previa = default_storage.save(vista_previa.ruta(nombre, 1), ContentFile(b"webp"))
+        variante = next(iter(miniaturas.VARIANTES))
+        miniatura = default_storage.save(f"{miniaturas.PREFIJO}{variante}/{nombre}/320.webp", ContentFile(b"webp"))
+
+        self._borrar(nombre)
+        self.assertTrue(self.storage.exists(nombre))
+        self.assertEqual(self._referencias(nombre), 1)
+
+        self._borrar(nombre)
+        self.assertFalse(self.storage.exists(nombre))
+        self.assertFalse(Blob.objects.filter(nombre=nombre).exists())
+        self.assertFalse(default_storage.exists(previa))
+        self.assertFalse(default_storage.exists(miniatura))
+
+    def test_transaccion_revertida_no_deja_referencia(self):
+        nombre = self._guardar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.storage.save("proyectos/doc.pdf", ContentFile(b"%PDF-1.4 documento"))
+                    raise RuntimeError("falla el INSERT del proyecto")
+            except RuntimeError:
+                pass
+
+        self.assertEqual(self._referencias(nombre), 1)
+
+    def test_proyecto_confirmado_sin_referencia_contada_mantiene_el_archivo(self):
+        # Otro proyecto ya confirmado cuyo on_commit aún no sumó su referencia
+        nombre = self._guardar()
+        Proyecto.objects.bulk_create([Proyecto(titulo="Pendiente", archivo=nombre)])
+
+        self._borrar(nombre)
+
+        self.assertTrue(self.storage.exists(nombre))
+        self.assertEqual(self._referencias(nombre), 0)
+
+    def test_borrar_proyectos_que_comparten_documento(self):
+        primero = self._proyecto()
+        segundo = self._proyecto()
+        nombre = primero.archivo.name
+        self.assertEqual(nombre, segundo.archivo.name)
+        self.assertEqual(self._referencias(nombre), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.delete()
+        self.assertTrue(self.storage.exists(nombre))
+        self.assertEqual(self._referencias(nombre), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.delete()
+        self.assertFalse(self.storage.exists(nombre))
+        self.assertFalse(Blob.objects.filter(nombre=nombre).exists())
+
+    def test_reemplazar_el_documento_suelta_el_anterior(self):
+        proyecto = self._proyecto(b"version 1")
+        anterior = proyecto.archivo.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            proyecto.archivo.save("doc.pdf", ContentFile(b"version 2"), save=False)
+            proyecto.save()
+
+        self.assertFalse(self.storage.exists(anterior))
+        self.assertEqual(self._referencias(proyecto.archivo.name), 1)
+
+    def test_deduplicar_media_invalida_el_listado(self):
+        # Un documento de antes del almacenamiento por contenido
+        legado = default_storage.save("proyectos/antiguo.pdf", ContentFile(b"%PDF-1.4 antiguo"))
+        proyecto = Proyecto.objects.create(titulo="Antiguo", archivo=legado)
+        generacion = cache_listado.generacion()
+
+        call_command("deduplicar_media", stdout=io.StringIO())
+
+        proyecto.refresh_from_db()
+        self.assertTrue(proyecto.archivo.name.startswith("proyectos/"))
+        self.assertNotEqual(proyecto.archivo.name, legado)
+        self.assertEqual(self._referencias(proyecto.archivo.name), 1)
+        self.assertNotEqual(cache_listado.generacion(), generacion)
+
+
+# ------------------------------------
+# ENTREGA DE MEDIA Y DESCARGAS
+# ------------------------------------
+class EntregaMediaTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, True)
+        ajuste = override_settings(MEDIA_ROOT=self.media)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+        self.proyecto = Proyecto(titulo="Prueba")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proyecto.archivo.save("doc.pdf", ContentFile(b"%PDF-1.4 documento"), save=False)
+            self.proyecto.save()
+
+    def test_blob_se_cachea_como_inmutable(self):
+        response = self.client.get(f"/media/{self.proyecto.archivo.name}")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_media_con_nombre_reutilizable_se_revalida(self):
+        default_storage.save("portadas/foto.jpg", ContentFile(b"jpg"))
+        response = self.client.get("/media/portadas/foto.jpg")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=", response["Cache-Control"])
+
+        revalidada = self.client.get("/media/portadas/foto.jpg", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidada.status_code, 304)
+
+    def test_ver_proyecto_encola_la_vista_previa_sin_renderizarla(self):
+        url = reverse("ver_proyecto", args=[self.proyecto.id])
+        with mock.patch("proyectos.vista_previa.generar") as generar:
+            response = self.client.get(url)
+            self.client.get(url)
+            generar.assert_not_called()
+
+        self.assertContains(response, "La vista previa se está generando")
+        self.assertEqual(Tarea.objects.filter(tipo="vista_previa", proyecto=self.proyecto).count(), 1)
+
+    @mock.patch.object(entrega, "BACKEND", "nginx")
+    def test_con_nginx_solo_cuenta_el_primer_tramo(self):
+        url = reverse("descargar", args=[self.proyecto.id])
+        with mock.patch("proyectos.views.registrar_descarga") as registrar:
+            response = self.client.get(url, HTTP_RANGE="bytes=4-")
+            self.assertIn("X-Accel-Redirect", response)
+            self.client.get(url, HTTP_RANGE="bytes=-8")
+            registrar.assert_not_called()
+
+            self.client.get(url, HTTP_RANGE="bytes=0-3")
+            self.client.get(url)
+            self.assertEqual(registrar.call_count, 2)
+
+    def test_sin_pymupdf_no_se_vuelve_a_encolar(self):
+        with mock.patch.dict("sys.modules", {"pymupdf": None}):
+            self.assertEqual(vista_previa.generar(self.proyecto), 0)
+        self.proyecto.refresh_from_db()
+        self.assertEqual(self.proyecto.paginas_vista_previa, 0)
+
+        response = self.client.get(reverse("ver_proyecto", args=[self.proyecto.id]))
+        self.assertNotContains(response, "La vista previa se está generando")
+        self.assertFalse(Tarea.objects.filter(tipo="vista_previa", proyecto=self.proyecto).exists())
+
+    def test_head_no_cuenta_como_descarga(self):
+        url = reverse("descargar", args=[self.proyecto.id])
+        with mock.patch("proyectos.views.registrar_descarga") as registrar:
+            self.assertEqual(self.client.head(url).status_code, 200)
+            registrar.assert_not_called()
+            self.client.get(url)
+            registrar.assert_called_once_with(self.proyecto.id)
+
+
+# ------------------------------------
+# API DEL CATÁLOGO
+# ------------------------------------
+class ApiCatalogoTests(TestCase):
+    def test_un_borrado_no_da_304_por_last_modified(self):
+        primero = Proyecto.objects.create(titulo="Uno")
+        Proyecto.objects.create(titulo="Dos")
+        cache.set(cache_listado.CLAVE_MODIFICADO, time.time() - 60, None)
+
+        response = self.client.get("/api/proyectos/")
+        self.assertEqual(len(response.json()["resultados"]), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.delete()
+        cache.set(cache_listado.CLAVE_MODIFICADO, time.time() - 30, None)
+
+        response = self.client.get("/api/proyectos/", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["resultados"]), 1)
+
+
+# ------------------------------------
+# CACHÉ DEL LISTADO DE INICIO
+# ------------------------------------
+class ListadoInicioTests(TestCase):
+    def test_enlaces_de_paginacion_con_los_filtros_normalizados(self):
+        carrera = Proyecto.CARRERA_CHOICES[0][0]
+        Proyecto.objects.bulk_create([Proyecto(titulo=f"P{i}", carrera=carrera) for i in range(12)])
+        cache_listado.invalidar()
+
+        # Misma clave de caché: el HTML guardado por la primera se sirve a la segunda
+        self.client.get("/", {"carrera": f"  {carrera} ", "utm_source": "correo"})
+        response = self.client.get("/", {"carrera": carrera})
+
+        self.assertContains(response, "cursor=")
+        self.assertNotContains(response, "utm_source")
+        self.assertContains(response, f'href="?{cache_listado.querystring({"carrera": carrera})}&cursor=')
+
+
+# ------------------------------------
+# BENCHMARK DE VISTAS
+# ------------------------------------
+class BenchmarkVistasTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, True)
+        ajuste = override_settings(MEDIA_ROOT=self.media)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+        Usuario.objects.create_user("bench", password="x", rol="estudiante")
+        self.proyecto = Proyecto(titulo="Prueba")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proyecto.archivo.save("doc.pdf", ContentFile(b"%PDF-1.4 documento"), save=False)
+            self.proyecto.save()
+
+    def test_descargar_no_cambia_los_totales(self):
+        total = Estadistica.objects.filter(dimension="total").values_list("descargas", flat=True).first()
+
+        salida = os.path.join(self.media, "benchmark.json")
+        call_command(
+            "benchmark_vistas", solo="descargar", repeticiones=5, calentamiento=0,
+            salida=salida, stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+        contadores.volcar()
+
+        self.proyecto.refresh_from_db()
+        self.assertEqual(self.proyecto.descargas, 0)
+        self.assertEqual(
+            Estadistica.objects.filter(dimension="total").values_list("descargas", flat=True).first(), total
+        )
+
+
+# ------------------------------------
+# CATÁLOGO SINTÉTICO
+# ------------------------------------
+class CatalogoSinteticoTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, True)
+        ajuste = override_settings(MEDIA_ROOT=self.media)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+    def test_limpiar_no_toca_los_blobs_reales(self):
+        real = Proyecto(titulo="Real")
+        with self.captureOnCommitCallbacks(execute=True):
+            real.portada.save("portada.jpg", ContentFile(b"jpg real"), save=False)
+            real.save()
+        portada = real.portada.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            catalogo_sintetico.sembrar(10, usuarios=2)
+        muestras = set(Proyecto.objects.exclude(pk=real.pk).values_list("archivo", flat=True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            catalogo_sintetico.limpiar()
+
+        self.assertEqual(Blob.objects.get(nombre=portada).referencias, 1)
+        self.assertTrue(default_storage.exists(portada))
+        self.assertFalse(Blob.objects.filter(nombre__in=muestras).exists())
+        self.assertFalse(any(default_storage.exists(nombre) for nombre in muestras))
+
+
+# ------------------------------------
+# TRAZAS DE SUBIDA
+# ------------------------------------
+class TrazaSubidaTests(TestCase):
+    def test_recibir_mide_el_cuerpo_antes_de_csrf(self):
+        # Con CSRF activo, como en producción: CsrfViewMiddleware lee request.POST
+        cliente = Client(enforce_csrf_checks=True)
+        cliente.force_login(Usuario.objects.create_user("subidor", password="x", rol="estudiante"))
+        token = str(cliente.get(reverse("subir")).context["csrf_token"])
+        archivo = SimpleUploadedFile("doc.pdf", b"%PDF-1.4 " + b"x" * 200000, "application/pdf")
+
+        with mock.patch("django.http.multipartparser.MultiPartParser.parse", autospec=True,
+                        side_effect=_parse_lento):
+            response = cliente.post(reverse("subir"), {"titulo": "", "archivo": archivo, "csrfmiddlewaretoken": token})
+        self.assertEqual(response.status_code, 200)
+
+        datos = next(t for t in trazas.recientes() if t["nombre"] == "subir")
+        recibir = next(t for t in datos["tramos"] if t["nombre"] == "recibir")
+        self.assertGreaterEqual(recibir["duracion"], 0.05)
+        self.assertGreaterEqual(recibir["inicio"], datos["inicio"])
+        self.assertGreaterEqual(datos["duracion"], recibir["duracion"])
+
+
+# ------------------------------------
+# BANDEJA DE SALIDA
+# ------------------------------------
+@mock.patch.object(correo, "BACKEND_ENVIO", "django.core.mail.backends.locmem.EmailBackend")
+class CorreoTests(TestCase):
+    def encolar(self):
+        with self.settings(EMAIL_BACKEND="proyectos.correo.BackendBandeja"):
+            enviados = mail.send_mail("Confirma tu cuenta", "Hola, ñandú", "repositorio@example.com", ["ana@example.com"])
+        self.assertEqual(enviados, 1)
+        return CorreoSaliente.objects.get()
+
+    def test_backend_bandeja_encola_sin_enviar(self):
+        guardado = self.encolar()
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(guardado.estado, CorreoSaliente.PENDIENTE)
+        self.assertEqual(guardado.destinatarios, ["ana@example.com"])
+        self.assertIn("Subject: Confirma tu cuenta", guardado.mensaje)
+
+    def test_enviar_pendientes_entrega_el_mime_guardado(self):
+        self.encolar()
+        self.assertEqual(correo.enviar_pendientes(), (1, 0))
+
+        self.assertEqual(len(mail.outbox), 1)
+        enviado = mail.outbox[0]
+        self.assertEqual(enviado.recipients(), ["ana@example.com"])
+        self.assertIn("ñandú", enviado.message().get_content())
+        guardado = CorreoSaliente.objects.get()
+        self.assertEqual(guardado.estado, CorreoSaliente.ENVIADO)
+        self.assertIsNotNone(guardado.enviado)
+
+    def test_enviar_pendientes_reintenta_con_backoff(self):
+        self.encolar()
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages",
+                        side_effect=smtplib.SMTPDataError(451, "Prueba más tarde")):
+            self.assertEqual(correo.enviar_pendientes(), (0, 1))
+
+        guardado = CorreoSaliente.objects.get()
+        self.assertEqual(guardado.estado, CorreoSaliente.PENDIENTE)
+        self.assertEqual(guardado.intentos, 1)
+        self.assertIn("Prueba más tarde", guardado.error)
+        self.assertGreater(guardado.ejecutar_despues, guardado.creado)
+        # Hasta que venza el backoff nadie lo vuelve a reclamar
+        self.assertEqual(correo.enviar_pendientes(), (0, 0))
+
+    def test_envio_expirado_en_el_ultimo_intento_falla(self):
+        guardado = self.encolar()
+        CorreoSaliente.objects.filter(pk=guardado.pk).update(
+            estado=CorreoSaliente.ENVIANDO, intentos=guardado.max_intentos,
+            ejecutar_despues=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(correo.enviar_pendientes(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(CorreoSaliente.objects.get().estado, CorreoSaliente.FALLIDO)
+
+    def test_worker_exige_credenciales_smtp(self):
+        with mock.patch.object(correo, "BACKEND_ENVIO", "django.core.mail.backends.smtp.EmailBackend"), \
+                self.settings(EMAIL_HOST="smtp.gmail.com", EMAIL_HOST_USER="", EMAIL_HOST_PASSWORD=""):
+            with self.assertRaisesMessage(CommandError, "EMAIL_HOST_USER"):
+                call_command("enviar_correos", "--una-vez")
+
+
+# ------------------------------------
+# COLA DE TAREAS
+# ------------------------------------
+class ColaTareasTests(TestCase):
+    def test_reclamar_bloquea_la_tarea(self):
+        tarea = tareas.encolar("prueba")
+        reclamada = tareas.reclamar_siguiente()
+
+        self.assertEqual(reclamada.pk, tarea.pk)
+        self.assertEqual(reclamada.estado, Tarea.EN_PROCESO)
+        self.assertEqual(reclamada.intentos, 1)
+        self.assertGreater(reclamada.ejecutar_despues, timezone.now() + timedelta(seconds=tareas.BLOQUEO - 5))
+        # Otro worker no la ve mientras dure el bloqueo
+        self.assertIsNone(tareas.reclamar_siguiente())
+
+    def test_fallo_reintenta_con_backoff(self):
+        def fallar(tarea):
+            raise RuntimeError("Gemini no responde")
+
+        tarea = tareas.encolar("prueba")
+        with mock.patch.dict(tareas.MANEJADORES, {"prueba": (fallar, None)}):
+            self.assertEqual(tareas.procesar_pendientes(), 1)
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.PENDIENTE)
+        self.assertEqual(tarea.intentos, 1)
+        self.assertEqual(tarea.error, "Gemini no responde")
+        espera = (tarea.ejecutar_despues - timezone.now()).total_seconds()
+        self.assertTrue(0.8 * tareas.RETRASO_BASE - 5 < espera <= 1.2 * tareas.RETRASO_BASE)
+        self.assertIsNone(tareas.reclamar_siguiente())
+
+    def test_bloqueo_expirado_se_reclama(self):
+        tarea = tareas.encolar("prueba")
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado=Tarea.EN_PROCESO, intentos=1, ejecutar_despues=timezone.now() - timedelta(seconds=1)
+        )
+        reclamada = tareas.reclamar_siguiente()
+        self.assertEqual(reclamada.pk, tarea.pk)
+        self.assertEqual(reclamada.intentos, 2)
+
+    def test_bloqueo_expirado_en_el_ultimo_intento_falla(self):
+        al_fallar = mock.Mock()
+        tarea = tareas.encolar("prueba")
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado=Tarea.EN_PROCESO, intentos=tarea.max_intentos,
+            ejecutar_despues=timezone.now() - timedelta(seconds=1),
+        )
+        with mock.patch.dict(tareas.MANEJADORES, {"prueba": (mock.Mock(), al_fallar)}):
+            self.assertIsNone(tareas.reclamar_siguiente())
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.FALLIDA)
+        self.assertEqual(tarea.intentos, tarea.max_intentos)
+        al_fallar.assert_called_once()
+
+
+# ------------------------------------
+# CACHÉ DE SINOPSIS
+# ------------------------------------
+class GeminiFalsoTestCase(TestCase):
+    """Base sin tests: Gemini responde sin red y las cachés empiezan vacías."""
+
+    retraso = 0
+
+    def setUp(self):
+        cache_sinopsis._lru.clear()
+        self.addCleanup(cache_sinopsis._lru.clear)
+        cache.clear()
+
+        async def generar(**kwargs):
+            await asyncio.sleep(self.retraso)
+            return SimpleNamespace(text="Sinopsis de prueba.")
+
+        self.gemini = mock.AsyncMock(side_effect=generar)
+        cliente = SimpleNamespace(
+            aio=SimpleNamespace(models=SimpleNamespace(generate_content=self.gemini), aclose=mock.AsyncMock())
+        )
+        parche = mock.patch("proyectos.utils._crear_cliente", return_value=cliente)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+
+class CacheSinopsisTests(GeminiFalsoTestCase):
+
+    def test_mismo_documento_no_vuelve_a_llamar_a_gemini(self):
+        antes = cache_sinopsis.estadisticas()
+        for texto in ("Un trabajo sobre  riego por goteo.", "Un trabajo sobre riego\npor goteo."):
+            response = self.client.post(reverse("generar_sinopsis"), {"texto": texto})
+            self.assertContains(response, "Sinopsis de prueba.")
+
+        self.assertEqual(self.gemini.await_count, 1)
+        despues = cache_sinopsis.estadisticas()
+        self.assertEqual(despues["fallos"] - antes["fallos"], 1)
+        self.assertEqual(despues["aciertos_memoria"] - antes["aciertos_memoria"], 1)
+
+    def test_contadores_en_metricas(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, True)
+        for parche in (mock.patch.object(metricas, "DIRECTORIO", directorio),
+                       mock.patch.object(metricas, "_archivo", None)):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+        self.client.force_login(Usuario.objects.create_user("adm", password="x", rol="admin"))
+        response = self.client.get(reverse("metricas"))
+        self.assertContains(response, 'proyectos_sinopsis_cache_total{resultado="aciertos_memoria"}')
+        self.assertContains(response, "proyectos_sinopsis_cache_entradas ")
+
+
+# ------------------------------------
+# PAGINACIÓN POR CURSOR
+# ------------------------------------
+class PaginadorCursorTests(TestCase):
+    def setUp(self):
+        Proyecto.objects.bulk_create([Proyecto(titulo=f"P{i}") for i in range(7)])
+        self.paginador = paginacion.PaginadorCursor(Proyecto.objects.all(), 3)
+
+    def ids(self, pagina):
+        return [p.pk for p in pagina]
+
+    def recorrer(self):
+        paginas, cursor = [], None
+        while True:
+            pagina = self.paginador.pagina(cursor)
+            paginas.append(self.ids(pagina))
+            if not pagina.has_next:
+                return paginas
+            cursor = pagina.next_cursor
+
+    def test_siguiente_y_anterior_vuelven_a_la_misma_pagina(self):
+        primera = self.paginador.pagina()
+        segunda = self.paginador.pagina(primera.next_cursor)
+        self.assertFalse(primera.has_previous)
+        self.assertTrue(segunda.has_previous)
+
+        vuelta = self.paginador.pagina(segunda.previous_cursor)
+        self.assertEqual(self.ids(vuelta), self.ids(primera))
+        self.assertFalse(vuelta.has_previous)
+        self.assertEqual(self.ids(self.paginador.pagina(vuelta.next_cursor)), self.ids(segunda))
+
+    def test_empates_en_la_fecha_se_desempatan_por_id(self):
+        Proyecto.objects.update(fecha_subida=timezone.now())
+        paginas = self.recorrer()
+
+        todos = [pk for pagina in paginas for pk in pagina]
+        self.assertEqual([len(p) for p in paginas], [3, 3, 1])
+        self.assertEqual(todos, sorted(Proyecto.objects.values_list("pk", flat=True), reverse=True))
+
+        # Y hacia atrás desde la última
+        ultima = self.paginador.pagina(self.paginador.pagina(self.paginador.pagina().next_cursor).next_cursor)
+        self.assertEqual(self.ids(self.paginador.pagina(ultima.previous_cursor)), paginas[1])
+
+    def test_cursor_alterado_o_falsificado_da_la_primera_pagina(self):
+        primera = self.ids(self.paginador.pagina())
+        valido = self.paginador.pagina().next_cursor
+        alterado = valido[:-2] + ("AA" if not valido.endswith("AA") else "BB")
+        ultima = Proyecto.objects.order_by("id").first()
+        falsificados = [
+            alterado,
+            "no-es-un-cursor",
+            signing.dumps({"v": [ultima.fecha_subida.isoformat(), ultima.pk], "d": "sig"}, salt="otra"),
+            signing.dumps({"v": [ultima.pk], "d": "sig"}, salt=paginacion.SALT),
+            signing.dumps({"v": [ultima.fecha_subida.isoformat(), ultima.pk], "d": "x"}, salt=paginacion.SALT),
+        ]
+        for cursor in falsificados:
+            with self.subTest(cursor=cursor):
+                pagina = self.paginador.pagina(cursor)
+                self.assertEqual(self.ids(pagina), primera)
+                self.assertFalse(pagina.has_previous)
+
+
+# ------------------------------------
+# ADMISIÓN DE SINOPSIS
+# ------------------------------------
+class AdmisionSinopsisTests(GeminiFalsoTestCase):
+    retraso = 0.05
+
+    def test_cubeta_del_cliente_agotada_da_429(self):
+        url = reverse("generar_sinopsis")
+        for i in range(admision.CLIENTE_CAPACIDAD):
+            self.assertEqual(self.client.post(url, {"texto": f"Documento {i}"}).status_code, 200)
+
+        response = self.client.post(url, {"texto": "Uno más"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertEqual(self.gemini.await_count, admision.CLIENTE_CAPACIDAD)
+
+        # Otro cliente tiene su propia cubeta
+        otro = self.client.post(url, {"texto": "Uno más"}, REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(otro.status_code, 200)
+
+    async def test_peticiones_simultaneas_comparten_la_llamada(self):
+        coalescidas = admision.metricas["coalescidas"]
+        respuestas = await asyncio.gather(*(
+            self.async_client.post(reverse("generar_sinopsis"), {"texto": "El mismo trabajo de grado."},
+                                   REMOTE_ADDR=f"10.0.0.{i}")
+            for i in range(1, 4)
+        ))
+
+        for response in respuestas:
+            self.assertContains(response, "Sinopsis de prueba.")
+        self.assertEqual(self.gemini.await_count, 1)
+        self.assertEqual(admision.metricas["coalescidas"] - coalescidas, 2)
+
+
+# ------------------------------------
+# CONTADOR DE DESCARGAS
+# ------------------------------------
+class ContadorDescargasTests(TestCase):
+    def setUp(self):
+        contadores.volcar()
+        # Sin hilo volcador: el test decide cuándo se vuelca
+        parche = mock.patch.object(contadores, "_pid_volcador", os.getpid())
+        parche.start()
+        self.addCleanup(parche.stop)
+
+        self.carrera = Proyecto.CARRERA_CHOICES[0][0]
+        self.a = Proyecto.objects.create(titulo="A", carrera=self.carrera)
+        self.b = Proyecto.objects.create(titulo="B", carrera=self.carrera)
+
+    def descargas(self, dimension, valor=""):
+        return Estadistica.objects.get(dimension=dimension, valor=valor).descargas
+
+    def test_volcar_suma_el_lote_con_incrementos_atomicos(self):
+        total, carrera = self.descargas("total"), self.descargas("carrera", self.carrera)
+        for proyecto_id in (self.a.pk, self.a.pk, self.a.pk, self.b.pk):
+            contadores.registrar_descarga(proyecto_id)
+        self.assertEqual(contadores.pendientes(), 4)
+
+        # Otro worker volcó entre medias: F() suma sobre lo que haya en la fila
+        Proyecto.objects.filter(pk=self.a.pk).update(descargas=10)
+        self.assertEqual(contadores.volcar(), 4)
+
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.descargas, self.b.descargas), (13, 1))
+        self.assertEqual(self.descargas("total"), total + 4)
+        self.assertEqual(self.descargas("carrera", self.carrera), carrera + 4)
+        self.assertEqual(contadores.pendientes(), 0)
+        self.assertEqual(contadores.volcar(), 0)
+
+    def test_volcado_fallido_vuelve_al_bufer(self):
+        contadores.registrar_descarga(self.a.pk)
+        with mock.patch.object(estadisticas, "registrar_descargas", side_effect=RuntimeError("BD caída")):
+            self.assertEqual(contadores.volcar(), 0)
+
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.descargas, 0)
+        self.assertEqual(contadores.pendientes(), 1)
+        self.assertEqual(contadores.volcar(), 1)
+
+
+_parse_original = MultiPartParser.parse
+
+
+def _parse_lento(parser):
+    # Una subida que tarda en llegar
+    time.sleep(0.05)
+    return _parse_original(parser)
@@ -0,0 +1,330 @@
+# proyectos/trazas.py
+import contextvars
+import json
+import logging
+import secrets
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import UnreadablePostError
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# TRAZAS POR ETAPA
+# ------------------------------------
+# traza("subir") abre una traza y tramo("validar") mide una etapa dentro de
+# ella: duración, atributos (bytes, páginas...) y resultado ("ok" o el error).
+# El tramo actual vive en un ContextVar, así que los tramos se anidan solos,
+# también en corrutinas y en hilos de sync_to_async. Fuera de una traza
+# tramo() no hace nada: utils o el almacenamiento pueden medirse sin que un
+# shell o un comando llenen el anillo.
+#
+# Al cerrarse, la traza completa se guarda en un anillo de MAX posiciones en
+# la caché compartida (la ven todos los workers y procesar_tareas) y, si hay
+# ARCHIVO, se añade como una línea OTLP/JSON. Las tareas encoladas durante
+# una traza heredan su id (Tarea.traza): la subida y el trabajo del worker
+# se ven juntos en /trazas/?traza=<id>.
+
+MAX = getattr(settings, "TRAZAS_MAX", 200)
+ARCHIVO = getattr(settings, "TRAZAS_ARCHIVO", "")
+
+CLAVE_SIGUIENTE = "trazas:siguiente"
+
+_actual = contextvars.ContextVar("trazas_tramo", default=None)
+_lock_archivo = threading.Lock()
+
+
+class Tramo:
+    def __init__(self, nombre, atributos, raiz=False, traza_id=None):
+        self.nombre = nombre
+        self.atributos = atributos
+        self.raiz = raiz
+        self.traza_id = traza_id
+        self.tramo_id = None
+        self.padre_id = None
+        self.resultado = None
+        self.activo = False
+
+    def anotar(self, **atributos):
+        self.atributos.update(atributos)
+
+    def __enter__(self):
+        padre = _actual.get()
+        if self.raiz:
+            self.traza_id = self.traza_id or uuid.uuid4().hex
+            self._tramos = []
+        elif padre is not None:
+            self.traza_id = padre.traza_id
+            self.padre_id = padre.tramo_id
+            self._tramos = padre._tramos
+        else:
+            return self
+
+        self.activo = True
+        self.tramo_id = secrets.token_hex(8)
+        self._token = _actual.set(self)
+        self.inicio = time.time()
+        self._reloj = time.perf_counter()
+        return self
+
+    def _cerrar(self, exc):
+        self.duracion = time.perf_counter() - self._reloj
+        _actual.reset(self._token)
+        if exc is not None:
+            self.resultado = f"error: {type(exc).__name__}: {exc}"[:300]
+        self._tramos.append({
+            "nombre": self.nombre,
+            "tramo": self.tramo_id,
+            "padre": self.padre_id,
+            "inicio": self.inicio,
+            "duracion": self.duracion,
+            "atributos": self.atributos,
+            "resultado": self.resultado or "ok",
+        })
+
+    def _traza(self):
+        return {
+            "traza": self.traza_id,
+            "nombre": self.nombre,
+            "inicio": self.inicio,
+            "duracion": self.duracion,
+            "resultado": self.resultado or "ok",
+            "tramos": sorted(self._tramos, key=lambda t: t["inicio"]),
+        }
+
+    def __exit__(self, tipo, exc, tb):
+        if self.activo:
+            self._cerrar(exc)
+            if self.raiz:
+                _guardar(self._traza())
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, tipo, exc, tb):
+        if self.activo:
+            self._cerrar(exc)
+            if self.raiz:
+                await sync_to_async(_guardar)(self._traza())
+        return False
+
+
+def traza(nombre, traza_id=None, **atributos):
+    """Abre una traza nueva (o continúa `traza_id`, p. ej. el de una Tarea)."""
+    return Tramo(nombre, atributos, raiz=True, traza_id=traza_id)
+
+
+def tramo(nombre, **atributos):
+    return Tramo(nombre, atributos)
+
+
+def anotar(**atributos):
+    """Añade atributos al tramo en curso (si lo hay)."""
+    actual = _actual.get()
+    if actual is not None:
+        actual.anotar(**atributos)
+
+
+def traza_actual():
+    actual = _actual.get()
+    return actual.traza_id if actual is not None else ""
+
+
+def tramo_terminado(nombre, inicio, duracion, **atributos):
+    """Cuelga del tramo en curso uno ya medido antes (p. ej. la recepción,
+    que ocurre antes de que la vista abra la traza). Si empezó antes que la
+    raíz, la raíz se estira hasta su inicio."""
+    actual = _actual.get()
+    if actual is None:
+        return
+    if actual.raiz and inicio < actual.inicio:
+        actual._reloj -= actual.inicio - inicio
+        actual.inicio = inicio
+    actual._tramos.append({
+        "nombre": nombre,
+        "tramo": secrets.token_hex(8),
+        "padre": actual.tramo_id,
+        "inicio": inicio,
+        "duracion": duracion,
+        "atributos": atributos,
+        "resultado": "ok",
+    })
+
+
+# ------------------------------------
+# RECEPCIÓN DE SUBIDAS
+# ------------------------------------
+# CsrfViewMiddleware lee request.POST en cada POST de formulario, así que
+# cuando la vista empieza el cuerpo multipart ya llegó y los archivos ya se
+# escribieron en disco. Este middleware va antes que él: lo lee y mide, y
+# deja (inicio, segundos) en request.recepcion para tramo_terminado().
+
+class RecepcionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _leer(request):
+        inicio, reloj = time.time(), time.perf_counter()
+        try:
+            request.FILES
+        except UnreadablePostError:
+            pass  # como CsrfViewMiddleware: que decida la vista
+        request.recepcion = (inicio, time.perf_counter() - reloj)
+
+    @staticmethod
+    def _es_subida(request):
+        return request.method == "POST" and request.content_type == "multipart/form-data"
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        if self._es_subida(request):
+            self._leer(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self._es_subida(request):
+            await sync_to_async(self._leer)(request)
+        return await self.get_response(request)
+
+
+# ------------------------------------
+# ANILLO EN LA CACHÉ
+# ------------------------------------
+def _clave(posicion):
+    return f"trazas:anillo:{posicion}"
+
+
+def _guardar(datos):
+    try:
+        cache.add(CLAVE_SIGUIENTE, 0, None)
+        posicion = cache.incr(CLAVE_SIGUIENTE) % MAX
+        cache.set(_clave(posicion), datos, None)
+    except Exception:
+        logger.warning("No se pudo guardar la traza %s", datos["traza"], exc_info=True)
+
+    if ARCHIVO:
+        _exportar(datos)
+
+
+def recientes():
+    """Trazas del anillo, de la más nueva a la más vieja."""
+    guardadas = cache.get_many([_clave(i) for i in range(MAX)])
+    return sorted(guardadas.values(), key=lambda t: t["inicio"], reverse=True)
+
+
+# ------------------------------------
+# EXPORTACIÓN OTLP/JSON
+# ------------------------------------
+# Una línea por traza con el formato de ExportTraceServiceRequest, el que
+# lee el receptor "otlpjsonfile" del OpenTelemetry Collector.
+
+def _valor_otlp(valor):
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+def a_otlp(datos):
+    tramos = []
+    for t in datos["tramos"]:
+        tramo_otlp = {
+            "traceId": datos["traza"],
+            "spanId": t["tramo"],
+            "name": t["nombre"],
+            "kind": 1,
+            "startTimeUnixNano": str(int(t["inicio"] * 1e9)),
+            "endTimeUnixNano": str(int((t["inicio"] + t["duracion"]) * 1e9)),
+            "attributes": [{"key": k, "value": _valor_otlp(v)} for k, v in t["atributos"].items()],
+            "status": {"code": 1} if t["resultado"] == "ok" else {"code": 2, "message": t["resultado"]},
+        }
+        if t["padre"]:
+            tramo_otlp["parentSpanId"] = t["padre"]
+        tramos.append(tramo_otlp)
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "repositorio"}}]},
+        "scopeSpans": [{"scope": {"name": "proyectos.trazas"}, "spans": tramos}],
+    }]}
+
+
+def _exportar(datos):
+    linea = json.dumps(a_otlp(datos), ensure_ascii=False) + "\n"
+    try:
+        with _lock_archivo, open(ARCHIVO, "a", encoding="utf-8") as f:
+            f.write(linea)
+    except OSError:
+        logger.warning("No se pudo escribir la traza en %s", ARCHIVO, exc_info=True)
+
+
+# ------------------------------------
+# PRESENTACIÓN (vista trazas)
+# ------------------------------------
+def cascada(datos):
+    """Tramos en orden de árbol con su profundidad y su posición relativa
+    (en % de la duración de la traza) para dibujar la cascada."""
+    hijos = defaultdict(list)
+    for t in datos["tramos"]:
+        hijos[t["padre"]].append(t)
+
+    total = datos["duracion"] or 1e-9
+    filas = []
+
+    def recorrer(padre, profundidad):
+        for t in hijos.get(padre, []):
+            filas.append({
+                **t,
+                "profundidad": profundidad,
+                "sangria": profundidad * 1.25,
+                "ms": round(t["duracion"] * 1000, 1),
+                "desplazamiento": round((t["inicio"] - datos["inicio"]) / total * 100, 2),
+                "ancho": max(round(t["duracion"] / total * 100, 2), 0.5),
+            })
+            recorrer(t["tramo"], profundidad + 1)
+
+    recorrer(None, 0)
+    return filas
+
+
+def resumen_por_etapa(trazas):
+    """Por nombre de tramo: cuántos, p50/p95/máximo en ms y errores."""
+    duraciones = defaultdict(list)
+    errores = defaultdict(int)
+    for datos in trazas:
+        for t in datos["tramos"]:
+            duraciones[t["nombre"]].append(t["duracion"] * 1000)
+            if t["resultado"] != "ok":
+                errores[t["nombre"]] += 1
+
+    filas = []
+    for nombre, valores in duraciones.items():
+        valores.sort()
+        p95 = valores[-1] if len(valores) == 1 else statistics.quantiles(valores, n=20, method="inclusive")[18]
+        filas.append({
+            "nombre": nombre,
+            "cuenta": len(valores),
+            "p50": round(statistics.median(valores), 1),
+            "p95": round(p95, 1),
+            "maximo": round(valores[-1], 1),
+            "errores": errores[nombre],
+        })
+    return sorted(filas, key=lambda f: -f["p95"])
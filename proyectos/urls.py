@@ -18,5 +18,8 @@ urlpatterns = [
     path("proyecto/<int:proyecto_id>/", views.ver_proyecto, name="ver_proyecto"),
     path('proyecto/<int:id>/editar/', views.editar_proyecto, name='editar_proyecto'),
     path('proyecto/<int:id>/eliminar/', views.eliminar_proyecto, name='eliminar_proyecto'),
+    path("metricas/", views.exportar_metricas, name="metricas"),
+    path("trazas/", views.ver_trazas, name="trazas"),
+    path("api/proyectos/", views.api_proyectos, name="api_proyectos"),
 
 ]
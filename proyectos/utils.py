@@ -1,57 +1,412 @@
-import PyPDF2
-from docx import Document
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+import weakref
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from google import genai
-from google.genai.types import Content
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
-# Crear cliente Gemini con tu API key
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
+from . import admision, cache_sinopsis, metricas, resumen, trazas
 
+logger = logging.getLogger(__name__)
 
-def extraer_texto(archivo):
+TIMEOUT = getattr(settings, "GEMINI_TIMEOUT", 30)
+CONCURRENCIA = getattr(settings, "GEMINI_CONCURRENCIA", 8)
+
+
+# ------------------------------------
+# CARGA PEREZOSA
+# ------------------------------------
+# google.genai, PyPDF2 y python-docx tardan ~1s en importarse y views.py
+# importa este módulo: cada worker, comando y test pagaba ese costo al
+# arrancar y necesitaba GEMINI_API_KEY sólo para hacerlo. Ahora se importan
+# al usarse por primera vez. Con PRECARGAR_DEPENDENCIAS (gunicorn
+# --preload) se cargan en ready() y los workers las heredan con el fork.
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def _crear_cliente():
+    from google import genai
+    from google.genai.types import HttpOptions
+
+    # el timeout va en milisegundos
+    return genai.Client(
+        api_key=settings.GEMINI_API_KEY,
+        http_options=HttpOptions(timeout=TIMEOUT * 1000),
+    )
+
+
+def obtener_cliente():
+    """Cliente Gemini con tu API key, creado la primera vez que se pide.
+    Para las llamadas async se usa _cliente_async()."""
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = _crear_cliente()
+    return _cliente
+
+
+def precargar():
+    """Importa los extractores y crea el cliente ahora y no en la primera petición."""
+    import docx  # noqa: F401
+    import PyPDF2  # noqa: F401
+
+    try:
+        obtener_cliente()
+    except Exception:
+        # Sin API key se puede arrancar; la sinopsis fallará al usarse
+        logger.warning("No se pudo crear el cliente de Gemini al precargar", exc_info=True)
+
+
+MODELO_GEMINI = "models/gemini-2.5-flash"
+
+# Subir este número al cambiar el prompt invalida la caché de sinopsis
+VERSION_PROMPT = 1
+
+
+# ------------------------------------
+# EXTRACCIÓN DE TEXTO
+# ------------------------------------
+# Se recorre el documento página a página (o párrafo a párrafo) y se corta
+# al llegar al presupuesto: ni el índice ni el prompt necesitan más.
+MAX_CARACTERES = getattr(settings, "EXTRACCION_MAX_CARACTERES", 200000)
+MAX_PAGINAS = getattr(settings, "EXTRACCION_MAX_PAGINAS", 300)
+
+ResultadoExtraccion = namedtuple(
+    "ResultadoExtraccion", "texto paginas paginas_leidas bytes_leidos truncado"
+)
+
+
+class _LectorContado:
+    """Envuelve un archivo y cuenta los bytes que realmente se leen."""
+
+    def __init__(self, archivo):
+        self._archivo = archivo
+        self.bytes_leidos = 0
+
+    def read(self, *args):
+        datos = self._archivo.read(*args)
+        self.bytes_leidos += len(datos)
+        return datos
+
+    def __getattr__(self, nombre):
+        return getattr(self._archivo, nombre)
+
+
+def paginas_pdf(archivo):
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(archivo)
+    return len(reader.pages), ((page.extract_text() or "") for page in reader.pages)
+
+
+def parrafos_docx(archivo):
+    from docx import Document
+
+    parrafos = Document(archivo).paragraphs
+    return len(parrafos), (p.text for p in parrafos)
+
+
+def extraer_documento(archivo, max_caracteres=MAX_CARACTERES, max_paginas=MAX_PAGINAS):
     extension = archivo.name.split(".")[-1].lower()
 
     if extension == "pdf":
-        return leer_pdf(archivo)
-
+        abrir = paginas_pdf
     elif extension == "docx":
-        return leer_docx(archivo)
-
+        abrir = parrafos_docx
+        max_paginas = None  # en DOCX sólo cuenta el límite de caracteres
     else:
-        return ""
-    
+        return ResultadoExtraccion("", 0, 0, 0, False)
+
+    lector = _LectorContado(archivo)
+    total_paginas, paginas = abrir(lector)
+
+    partes = []
+    caracteres = 0
+    leidas = 0
+    truncado = False
+
+    for texto in paginas:
+        if max_paginas is not None and leidas >= max_paginas:
+            truncado = True
+            break
+
+        leidas += 1
+        restante = max_caracteres - caracteres
+        if len(texto) >= restante:
+            partes.append(texto[:restante])
+            truncado = leidas < total_paginas or len(texto) > restante
+            break
+
+        partes.append(texto)
+        caracteres += len(texto) + 1
+
+    return ResultadoExtraccion(
+        texto="\n".join(partes),
+        paginas=total_paginas,
+        paginas_leidas=leidas,
+        bytes_leidos=lector.bytes_leidos,
+        truncado=truncado,
+    )
+
+
+def extraer_texto(archivo):
+    return extraer_documento(archivo).texto
+
 
 def leer_pdf(archivo):
-    texto = ""
-    reader = PyPDF2.PdfReader(archivo)
-    for page in reader.pages:
-        texto += page.extract_text() + "\n"
-    return texto
+    _, paginas = paginas_pdf(archivo)
+    return "".join(texto + "\n" for texto in paginas)
 
 
 def leer_docx(archivo):
-    texto = ""
-    doc = Document(archivo)
-    for p in doc.paragraphs:
-        texto += p.text + "\n"
-    return texto
+    _, parrafos = parrafos_docx(archivo)
+    return "".join(texto + "\n" for texto in parrafos)
+
+
+# ------------------------------------
+# SINOPSIS CON GEMINI
+# ------------------------------------
+# Un texto que cabe en TOKENS_POR_FRAGMENTO va en una sola llamada; uno más
+# largo se resume por fragmentos en paralelo y luego se reduce (resumen.py).
+# Los resúmenes parciales también se guardan en la caché de sinopsis.
+
+def _contenido(prompt):
+    from google.genai.types import Content
+
+    return Content(parts=[{"text": prompt}])
+
+
+def _clave_fragmento(fragmento):
+    return cache_sinopsis.calcular_clave(fragmento, MODELO_GEMINI, f"{VERSION_PROMPT}-fragmento")
+
+
+def _llamar(prompt):
+    inicio = time.perf_counter()
+    try:
+        with trazas.tramo("gemini", caracteres=len(prompt)):
+            response = obtener_cliente().models.generate_content(model=MODELO_GEMINI, contents=_contenido(prompt))
+    finally:
+        metricas.registrar_gemini(time.perf_counter() - inicio)
+    return response.text.strip(), time.perf_counter() - inicio
+
+
+def _registrar_informe(informe):
+    logger.info(
+        "Sinopsis por fragmentos: %(fragmentos)s de %(fragmentos_totales)s "
+        "(%(desde_cache)s desde caché), map %(map_segundos).1fs "
+        "(llamada más lenta %(llamada_max_segundos).1fs), reduce %(reduce_segundos).1fs, "
+        "total %(total_segundos).1fs",
+        informe,
+    )
+
+
+def _informe(todos, fragmentos, pendientes, latencias, inicio, inicio_reduce):
+    fin = time.perf_counter()
+    return {
+        "fragmentos_totales": len(todos),
+        "fragmentos": len(fragmentos),
+        "desde_cache": len(fragmentos) - len(pendientes),
+        "map_segundos": inicio_reduce - inicio,
+        "llamada_max_segundos": max(latencias, default=0.0),
+        "reduce_segundos": fin - inicio_reduce,
+        "total_segundos": fin - inicio,
+    }
+
+
+def resumir_por_fragmentos(texto):
+    """Map-reduce síncrono (worker). Devuelve (sinopsis, informe)."""
+    inicio = time.perf_counter()
+    todos = resumen.dividir(texto)
+    fragmentos = resumen.seleccionar(todos)
+    claves = [_clave_fragmento(f) for f in fragmentos]
+
+    parciales = [cache_sinopsis.obtener(k) for k in claves]
+    pendientes = [i for i, p in enumerate(parciales) if p is None]
+
+    # Los hilos sólo llaman a Gemini; la caché (BD) se usa desde este hilo.
+    # Cada llamada lleva una copia del contexto para colgar de la traza en curso.
+    latencias = []
+    with ThreadPoolExecutor(max_workers=resumen.CONCURRENCIA) as pool:
+        futuros = {
+            pool.submit(
+                contextvars.copy_context().run,
+                _llamar, resumen.prompt_fragmento(fragmentos[i], i + 1, len(fragmentos)),
+            ): i
+            for i in pendientes
+        }
+        for futuro in as_completed(futuros):
+            i = futuros[futuro]
+            parciales[i], segundos = futuro.result()
+            latencias.append(segundos)
+            cache_sinopsis.guardar(claves[i], parciales[i], MODELO_GEMINI)
+
+    inicio_reduce = time.perf_counter()
+    sinopsis, _ = _llamar(resumen.prompt_reduccion(parciales))
+
+    informe = _informe(todos, fragmentos, pendientes, latencias, inicio, inicio_reduce)
+    _registrar_informe(informe)
+    return sinopsis, informe
 
 
 def generar_sinopsis(texto):
     if not texto.strip():
         return "No se pudo generar sinopsis. El archivo está vacío."
 
-    prompt = (
-        "Elabora una sinopsis breve, objetiva y de estilo académico sobre el siguiente contenido. "
-        "Limítate a 3–5 líneas y destaca únicamente el propósito, metodología y conclusión general del texto:\n\n"
-        f"{texto}"
-    )
+    normalizado = cache_sinopsis.normalizar(texto)
+    clave = cache_sinopsis.calcular_clave(normalizado, MODELO_GEMINI, VERSION_PROMPT)
 
-    # Llamada correcta al modelo Gemini más rápido que tienes
-    response = client.models.generate_content(
-        model="models/gemini-2.5-flash",
-        contents=Content(parts=[{"text": prompt}])
-    )
+    sinopsis = cache_sinopsis.obtener(clave)
+    if sinopsis is not None:
+        return sinopsis
+
+    if resumen.estimar_tokens(normalizado) > resumen.TOKENS_POR_FRAGMENTO:
+        # Se parte el texto original: conserva los saltos de página
+        sinopsis, _ = resumir_por_fragmentos(texto)
+    else:
+        sinopsis, _ = _llamar(resumen.prompt_sinopsis(normalizado))
+
+    cache_sinopsis.guardar(clave, sinopsis, MODELO_GEMINI)
+    return sinopsis
+
+
+# ------------------------------------
+# VERSIÓN ASÍNCRONA (ASGI)
+# ------------------------------------
+# Mientras espera a Gemini, la corrutina libera el event loop y el mismo
+# worker atiende otras peticiones. El semáforo limita las llamadas en vuelo
+# y asyncio.timeout corta tanto la espera de turno como cada llamada. La
+# admisión (límites, single-flight, cola) está en admision.py.
+
+# Un semáforo por event loop: fuera de ASGI cada petición async corre en
+# su propio loop y un semáforo no puede compartirse entre loops.
+_semaforos = weakref.WeakKeyDictionary()
+
+
+def _semaforo():
+    loop = asyncio.get_running_loop()
+    if loop not in _semaforos:
+        _semaforos[loop] = asyncio.Semaphore(CONCURRENCIA)
+    return _semaforos[loop]
+
+
+# Lo mismo con el cliente async: su pool de conexiones httpx queda atado al
+# loop que lo usó primero y falla en otro (bajo WSGI, async_to_sync abre un
+# loop por petición). Cada loop tiene su cliente y lo cierra al terminar.
+_clientes_async = weakref.WeakKeyDictionary()  # loop -> (cliente aio, tarea que lo cierra)
+
+
+def _cliente_async():
+    loop = asyncio.get_running_loop()
+    if loop not in _clientes_async:
+        cliente = _crear_cliente().aio
+        _clientes_async[loop] = (cliente, loop.create_task(_cerrar_con_el_loop(loop, cliente)))
+    return _clientes_async[loop][0]
+
+
+async def _cerrar_con_el_loop(loop, cliente):
+    # asyncio.run (el de async_to_sync) cancela las tareas pendientes antes
+    # de cerrar el loop: es el momento de cerrar las conexiones. Bajo ASGI
+    # el loop no termina y el cliente se reutiliza.
+    try:
+        await loop.create_future()
+    finally:
+        _clientes_async.pop(loop, None)
+        await cliente.aclose()
+
+
+async def _llamar_async(prompt):
+    async with asyncio.timeout(TIMEOUT):
+        async with _semaforo():
+            inicio = time.perf_counter()
+            admision.metricas["llamadas"] += 1
+            try:
+                async with trazas.tramo("gemini", caracteres=len(prompt)):
+                    response = await _cliente_async().models.generate_content(
+                        model=MODELO_GEMINI,
+                        contents=_contenido(prompt)
+                    )
+            finally:
+                metricas.registrar_gemini(time.perf_counter() - inicio)
+    return response.text.strip(), time.perf_counter() - inicio
+
+
+async def resumir_por_fragmentos_async(texto):
+    """Map-reduce asíncrono. Devuelve (sinopsis, informe)."""
+    inicio = time.perf_counter()
+    todos = resumen.dividir(texto)
+    fragmentos = resumen.seleccionar(todos)
+    claves = [_clave_fragmento(f) for f in fragmentos]
+
+    obtener = sync_to_async(cache_sinopsis.obtener)
+    parciales = [await obtener(k) for k in claves]
+    pendientes = [i for i, p in enumerate(parciales) if p is None]
+
+    # entrar_en_cola cobró la llamada de reducción; los fragmentos se cobran
+    # antes de lanzar ninguno, así un rechazo no deja la sinopsis a medias
+    if pendientes:
+        await admision.tomar_global(len(pendientes))
+
+    # Además del semáforo global del worker, cada documento usa como mucho
+    # CONCURRENCIA_FRAGMENTOS llamadas a la vez
+    limite = asyncio.Semaphore(resumen.CONCURRENCIA)
+
+    async def resumir(i):
+        async with limite:
+            return await _llamar_async(resumen.prompt_fragmento(fragmentos[i], i + 1, len(fragmentos)))
+
+    resultados = await asyncio.gather(*(resumir(i) for i in pendientes))
+    latencias = []
+    guardar = sync_to_async(cache_sinopsis.guardar)
+    for i, (parcial, segundos) in zip(pendientes, resultados):
+        parciales[i] = parcial
+        latencias.append(segundos)
+        await guardar(claves[i], parcial, MODELO_GEMINI)
+
+    inicio_reduce = time.perf_counter()
+    sinopsis, _ = await _llamar_async(resumen.prompt_reduccion(parciales))
+
+    informe = _informe(todos, fragmentos, pendientes, latencias, inicio, inicio_reduce)
+    _registrar_informe(informe)
+    return sinopsis, informe
+
+
+async def generar_sinopsis_async(texto):
+    """Como generar_sinopsis, pero sin bloquear el worker.
+
+    Lanza TimeoutError si una llamada no responde en GEMINI_TIMEOUT segundos
+    y admision.Rechazado si la cuota global (una por llamada a Gemini) o la
+    cola están llenas.
+    """
+    if not texto.strip():
+        return "No se pudo generar sinopsis. El archivo está vacío."
+
+    normalizado = cache_sinopsis.normalizar(texto)
+    clave = cache_sinopsis.calcular_clave(normalizado, MODELO_GEMINI, VERSION_PROMPT)
+
+    sinopsis = await sync_to_async(cache_sinopsis.obtener)(clave)
+    if sinopsis is not None:
+        return sinopsis
+
+    # Textos idénticos en vuelo comparten la misma llamada
+    return await admision.una_vez(clave, lambda: _sinopsis_async(texto, normalizado, clave))
+
+
+async def _sinopsis_async(texto, normalizado, clave):
+    await admision.entrar_en_cola()
+    try:
+        if resumen.estimar_tokens(normalizado) > resumen.TOKENS_POR_FRAGMENTO:
+            sinopsis, _ = await resumir_por_fragmentos_async(texto)
+        else:
+            sinopsis, _ = await _llamar_async(resumen.prompt_sinopsis(normalizado))
+    finally:
+        admision.salir_de_cola()
 
-    return response.text.strip()
+    await sync_to_async(cache_sinopsis.guardar)(clave, sinopsis, MODELO_GEMINI)
+    return sinopsis
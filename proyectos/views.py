@@ -1,56 +1,71 @@
 # proyectos/views.py
 
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import FileResponse, HttpResponse, Http404
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.core.paginator import Paginator
+from django.core.files.storage import default_storage
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Q, Sum
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
 from django.contrib import messages
 from django.core.mail import send_mail
-from django.db import models
-import csv, os, mimetypes
+from django.db import transaction
+import csv, hashlib, os, time, zlib
+from contextlib import nullcontext
 
-from .models import Proyecto, Perfil, Usuario
+from .models import Proyecto, Perfil, Tarea
 from .forms import ProyectoForm, RegistroForm, PerfilForm, UsuarioForm
-from .utils import extraer_texto, generar_sinopsis
-from .filters import ProyectoFilter
+from .utils import generar_sinopsis_async
+from .tareas import encolar
+from .contadores import registrar_descarga
+from .entrega import servir_archivo, es_descarga_completa, CACHE_CORTA, CACHE_INMUTABLE
+from . import admision, estadisticas, cache_listado, metricas, miniaturas, trazas, vista_previa
+from .almacenamiento import es_blob
+from .paginacion import PaginadorCursor
+from .busqueda import filtrar_proyectos
 from django.http import HttpResponse
 
 # =========================================
 # INICIO (PÁGINA PRINCIPAL) ⭐⭐⭐⭐⭐
 # =========================================
 def inicio(request):
-    proyectos = Proyecto.objects.all()
+    listado = cache_listado.obtener(request.GET, lambda: _render_listado(request))
 
-    # valores GET
-    q = request.GET.get("q", "")
-    tipo = request.GET.get("tipo", "")
-    carrera = request.GET.get("carrera", "")
-
-    # filtrado
-    if q:
-        proyectos = proyectos.filter(titulo__icontains=q)
+    return render(request, "inicio.html", {
+        "listado": listado,
+        "años": Proyecto.AÑO_CHOICES,
+    })
 
-    if tipo:
-        proyectos = proyectos.filter(tipo=tipo)
 
-    if carrera:
-        proyectos = proyectos.filter(carrera=carrera)
+def _render_listado(request):
+    # Todo sale de los parámetros normalizados de la clave de caché y no de
+    # request.GET: el HTML se sirve a cualquier URL con la misma clave
+    params = cache_listado.normalizar(request.GET)
+    proyectos = filtrar_proyectos(Proyecto.objects.all(), params)
 
-    # PAGINACIÓN
-    paginator = Paginator(proyectos, 9)
-    page_number = request.GET.get("page")
-    proyectos_paginados = paginator.get_page(page_number)
+    # PAGINACIÓN por cursor: cada página cuesta lo mismo que la primera
+    if params["q"]:
+        orden = ("-rank", "-id")
+    else:
+        orden = ("-fecha_subida", "-id")
 
-    # construimos la URL sin "page"
-    querystring = request.GET.copy()
-    if "page" in querystring:
-        querystring.pop("page")
-    querystring = querystring.urlencode()
+    proyectos_paginados = PaginadorCursor(proyectos, 9, orden).pagina(
+        params["cursor"] or None,
+        total_aproximado=estadisticas.total_filtrado(params),
+    )
 
-    return render(request, "inicio.html", {
+    # Sin request: el fragmento no depende del usuario y se comparte
+    return render_to_string("_listado_proyectos.html", {
         "proyectos": proyectos_paginados,
-        "querystring": querystring,
+        "querystring": cache_listado.querystring(params),
     })
 
 
@@ -60,45 +75,57 @@ def inicio(request):
 @login_required
 def subir(request):
     if request.method == "POST":
-        form = ProyectoForm(request.POST, request.FILES)
-
-        if form.is_valid():
-            titulo = form.cleaned_data['titulo']
-            # Validar duplicados para el mismo usuario
-            if Proyecto.objects.filter(titulo=titulo, creado_por=request.user).exists():
-                messages.error(request, "Ya tienes un proyecto con ese nombre.")
-                return redirect("subir")
-            
-            proyecto = form.save(commit=False)
-            proyecto.creado_por = request.user
-            proyecto.autor = request.user.get_full_name() or request.user.username
-
-            # Extraer texto
-            archivo = request.FILES.get("archivo")
-            texto_extraido = ""
-
-            if archivo:
-                try:
-                    texto_extraido = extraer_texto(archivo)
-                except Exception as e:
-                    messages.warning(request, f"No se pudo leer el archivo: {str(e)}")
-
-            # IA sinopsis
-            try:
-                if texto_extraido.strip():
-                    proyecto.sinopsis_ia = generar_sinopsis(texto_extraido)
-                else:
-                    texto_base = f"{proyecto.titulo}\n{proyecto.descripcion}"
-                    proyecto.sinopsis_ia = generar_sinopsis(texto_base)
-            except Exception as e:
-                proyecto.sinopsis_ia = ""
-                messages.warning(request, f"No se pudo generar sinopsis automática: {str(e)}")
-
-            proyecto.save()
-            messages.success(request, "Proyecto subido correctamente.")
-            return redirect("inicio")
-
-        messages.error(request, "Por favor corrige los errores del formulario.")
+        try:
+            recibidos = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            recibidos = 0  # cabecera mal formada: que falle el formulario, no la traza
+
+        with trazas.traza("subir", usuario=request.user.pk) as traza:
+            # El cuerpo multipart ya se leyó (y los archivos se escribieron)
+            # en trazas.RecepcionMiddleware, antes de CSRF y de esta vista
+            if hasattr(request, "recepcion"):
+                trazas.tramo_terminado("recibir", *request.recepcion, bytes=recibidos)
+            else:
+                with trazas.tramo("recibir", bytes=recibidos):
+                    request.FILES
+
+            with trazas.tramo("validar"):
+                form = ProyectoForm(request.POST, request.FILES)
+                valido = form.is_valid()
+
+            if valido:
+                titulo = form.cleaned_data['titulo']
+                # Validar duplicados para el mismo usuario
+                if Proyecto.objects.filter(titulo=titulo, creado_por=request.user).exists():
+                    traza.resultado = "titulo duplicado"
+                    messages.error(request, "Ya tienes un proyecto con ese nombre.")
+                    return redirect("subir")
+
+                proyecto = form.save(commit=False)
+                proyecto.creado_por = request.user
+                proyecto.autor = request.user.get_full_name() or request.user.username
+
+                # La extracción de texto y la sinopsis IA las hace el worker
+                # (manage.py procesar_tareas); aquí sólo se guarda el archivo.
+                proyecto.estado_sinopsis = Proyecto.SINOPSIS_PENDIENTE
+
+                # Atómico: si el INSERT falla no queda referencia al blob (almacenamiento.py)
+                with trazas.tramo("guardar", bytes=proyecto.archivo.size if proyecto.archivo else 0), transaction.atomic():
+                    proyecto.save()
+                traza.anotar(proyecto=proyecto.pk)
+
+                # Las tareas heredan la traza: /trazas/?traza=<id> muestra también el worker
+                with trazas.tramo("encolar"):
+                    encolar("sinopsis", proyecto)
+                    encolar("vista_previa", proyecto)
+                    if proyecto.portada:
+                        encolar("miniaturas", proyecto)
+
+                messages.success(request, "Proyecto subido correctamente. La sinopsis se generará en unos momentos.")
+                return redirect("inicio")
+
+            traza.resultado = "formulario invalido"
+            messages.error(request, "Por favor corrige los errores del formulario.")
     else:
         form = ProyectoForm()
 
@@ -111,7 +138,11 @@ def subir(request):
 @login_required
 def perfil(request):
     usuario = request.user
-    perfil, creado = Perfil.objects.get_or_create(usuario=usuario)
+    try:
+        # Ya viene con el usuario (BackendConPerfil)
+        perfil = usuario.perfil
+    except Perfil.DoesNotExist:
+        perfil = Perfil.objects.create(usuario=usuario)
 
     if request.method == "POST":
         usuario_form = UsuarioForm(request.POST, instance=usuario)
@@ -119,7 +150,10 @@ def perfil(request):
 
         if usuario_form.is_valid() and perfil_form.is_valid():
             usuario_form.save()
-            perfil_form.save()
+            perfil = perfil_form.save()
+            if "avatar" in perfil_form.changed_data and perfil.avatar:
+                # Son pocas y pequeñas: se generan ya, antes del redirect
+                miniaturas.generar(perfil.avatar.name, "avatar")
             messages.success(request, "Perfil actualizado correctamente.")
             return redirect("perfil")
 
@@ -138,56 +172,235 @@ def perfil(request):
 # DESCARGAR ARCHIVOS
 # =========================================
 def descargar(request, proyecto_id):
-    proyecto = Proyecto.objects.get(id=proyecto_id)
-    file_path = proyecto.archivo.path
+    # Sólo se necesita la ruta; el contador se incrementa aparte
+    proyecto = get_object_or_404(Proyecto.objects.only("archivo", "titulo"), id=proyecto_id)
+    if not proyecto.archivo:
+        raise Http404("El archivo no existe")
 
-    try:
-        mime_type, _ = mimetypes.guess_type(file_path)
-        mime_type = mime_type or "application/octet-stream"
+    # En disco el archivo se llama como su hash; se descarga con el título
+    extension = os.path.splitext(proyecto.archivo.name)[1]
+    response = servir_archivo(
+        request, proyecto.archivo.name, adjunto=True,
+        nombre_descarga=f"{slugify(proyecto.titulo) or 'proyecto'}{extension}",
+    )
+
+    # Un HEAD (comprobadores de enlaces, gestores de descargas) no es una descarga
+    if request.method != "HEAD" and es_descarga_completa(request, response):
+        registrar_descarga(proyecto.id)
 
-        response = FileResponse(open(file_path, 'rb'), content_type=mime_type)
-        response['Content-Disposition'] = f'attachment; filename="{proyecto.archivo.name.split('/')[-1]}"'
+    return response
 
-        proyecto.descargas += 1
-        proyecto.save()
 
-        return response
+# =========================================
+# ARCHIVOS SUBIDOS (MEDIA)
+# =========================================
+def _es_inmutable(path):
+    # Un blob se llama como su hash y sus miniaturas derivan sólo de él
+    variante = miniaturas.interpretar(path)
+    return es_blob(variante[0] if variante else path)
 
-    except FileNotFoundError:
-        raise Http404("El archivo no existe")
+
+def servir_media(request, path):
+    # Miniatura que aún no existe: se genera en esta primera petición
+    if path.startswith(miniaturas.PREFIJO) and not default_storage.exists(path):
+        if not miniaturas.generar_desde_ruta(path):
+            raise Http404("La imagen no existe")
+
+    # El resto (archivos anteriores a los blobs, vistas previas) puede
+    # cambiar con el mismo nombre: caché corta y revalidación con ETag
+    cache_control = CACHE_INMUTABLE if _es_inmutable(path) else CACHE_CORTA
+    return servir_archivo(request, path, cache_control=cache_control)
 
 
 # =========================================
 # DASHBOARD
 # =========================================
+TOP_DESCARGAS = 100
+
+
 @login_required
 def dashboard(request):
-    proyectos = Proyecto.objects.all()
-    total_proyectos = proyectos.count()
-    total_descargas = proyectos.aggregate(total=Sum('descargas'))['total'] or 0
+    # Totales y desgloses precalculados (proyectos/estadisticas.py)
+    resumen = estadisticas.resumen()
+
+    # Top-N por descargas, paginado; nunca se recorre la tabla completa
+    top = Proyecto.objects.only("titulo", "autor", "fecha_subida", "descargas").order_by("-descargas", "-id")
+    paginator = Paginator(top[:TOP_DESCARGAS], 20)
+    proyectos = paginator.get_page(request.GET.get("page"))
 
     return render(request, 'dashboard.html', {
         'proyectos': proyectos,
-        'total_proyectos': total_proyectos,
-        'total_descargas': total_descargas,
+        'total_proyectos': resumen["total_proyectos"],
+        'total_descargas': resumen["total_descargas"],
+        'resumen': resumen,
     })
 
 
 # =========================================
 # EXPORTAR CSV
 # =========================================
+COLUMNAS_CSV = ['id', 'titulo', 'autor', 'carrera', 'año', 'tipo', 'fecha_subida', 'descargas']
+
+
+class _Eco:
+    # csv.writer escribe en este "archivo" y devuelve la línea tal cual
+    def write(self, valor):
+        return valor
+
+
+def _filas_csv(proyectos, filas_por_bloque=500):
+    writer = csv.writer(_Eco())
+    bloque = [writer.writerow(COLUMNAS_CSV)]
+
+    for fila in proyectos.values_list(*COLUMNAS_CSV).iterator(chunk_size=2000):
+        bloque.append(writer.writerow(fila))
+        if len(bloque) >= filas_por_bloque:
+            yield "".join(bloque)
+            bloque = []
+
+    if bloque:
+        yield "".join(bloque)
+
+
+def _comprimir_gzip(bloques):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloque in bloques:
+        datos = compresor.compress(bloque.encode("utf-8"))
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
 def export_csv(request):
-    proyectos = Proyecto.objects.all()
+    # Mismos filtros que el inicio; se envía fila a fila sin cargar la tabla
+    proyectos = filtrar_proyectos(Proyecto.objects.all(), request.GET)
+    filas = _filas_csv(proyectos)
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="proyectos.csv"'
+    if request.GET.get("gzip"):
+        response = StreamingHttpResponse(_comprimir_gzip(filas), content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="proyectos.csv.gz"'
+    else:
+        response = StreamingHttpResponse(filas, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="proyectos.csv"'
 
-    writer = csv.writer(response)
-    writer.writerow(['id','titulo','autor','carrera','año','tipo','fecha_subida','descargas'])
+    return response
 
-    for p in proyectos:
-        writer.writerow([p.id,p.titulo,p.autor,p.carrera,p.año,p.tipo,p.fecha_subida,p.descargas])
 
+# =========================================
+# API JSON DEL CATÁLOGO
+# =========================================
+# Sólo lectura, para los sistemas que sincronizan el catálogo:
+#   /api/proyectos/?tipo=&carrera=&año=&q=     mismos filtros que el inicio
+#   &updated_since=2026-01-01T00:00:00Z        modificados desde entonces
+#                                              (inclusive: deduplicar por id)
+#   &campos=id,titulo,actualizado              sólo esos campos
+#   &limite=100&cursor=...                     páginas por cursor
+# Con updated_since se recorre por (actualizado, id) ascendente: el cliente
+# guarda el `actualizado` más alto que vio y lo manda en la siguiente
+# consulta. Los borrados no aparecen; para detectarlos se pide campos=id
+# sin updated_since y se compara.
+#
+# El ETag sale de la generación del listado (cualquier alta, edición o baja
+# la sube) y de la consulta, así que un sondeo sin cambios devuelve 304 sin
+# tocar la tabla. Last-Modified es la hora del último cambio del catálogo
+# (cache_listado.modificado), que también sube con las bajas.
+API_POR_PAGINA = 50
+API_MAX_POR_PAGINA = 500
+
+# nombre -> (columnas que necesita, valor)
+CAMPOS_API = {
+    "id": (("id",), lambda p, r: p.id),
+    "titulo": (("titulo",), lambda p, r: p.titulo),
+    "autor": (("autor",), lambda p, r: p.autor),
+    "descripcion": (("descripcion",), lambda p, r: p.descripcion),
+    "tipo": (("tipo",), lambda p, r: p.tipo),
+    "carrera": (("carrera",), lambda p, r: p.carrera),
+    "año": (("año",), lambda p, r: p.año),
+    "sinopsis": (("sinopsis_ia",), lambda p, r: p.sinopsis_ia),
+    "estado_sinopsis": (("estado_sinopsis",), lambda p, r: p.estado_sinopsis),
+    "fecha_subida": (("fecha_subida",), lambda p, r: p.fecha_subida.isoformat()),
+    "actualizado": (("actualizado",), lambda p, r: p.actualizado.isoformat()),
+    "url": ((), lambda p, r: r.build_absolute_uri(reverse("ver_proyecto", args=[p.id]))),
+    "archivo": ((), lambda p, r: r.build_absolute_uri(reverse("descargar", args=[p.id]))),
+    "portada": (("portada",), lambda p, r: r.build_absolute_uri(p.portada.url) if p.portada else None),
+}
+
+
+def _error_api(mensaje):
+    return JsonResponse({"error": mensaje}, status=400, json_dumps_params={"ensure_ascii": False})
+
+
+def _etag_api(request):
+    consulta = "&".join(f"{k}={v}" for k, valores in sorted(request.GET.lists()) for v in valores)
+    firma = f"{cache_listado.generacion()}|{request.get_host()}|{consulta}"
+    return '"%s"' % hashlib.sha256(firma.encode("utf-8")).hexdigest()[:32]
+
+
+@require_GET
+def api_proyectos(request):
+    campos = [c.strip() for c in request.GET.get("campos", "").split(",") if c.strip()] or list(CAMPOS_API)
+    desconocidos = [c for c in campos if c not in CAMPOS_API]
+    if desconocidos:
+        return _error_api(f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(CAMPOS_API)}.")
+
+    desde = None
+    if request.GET.get("updated_since"):
+        desde = parse_datetime(request.GET["updated_since"].replace(" ", "+"))
+        if desde is None:
+            return _error_api("updated_since debe ser una fecha ISO 8601, p. ej. 2026-01-01T00:00:00Z.")
+        if timezone.is_naive(desde):
+            desde = timezone.make_aware(desde)
+
+    limite = request.GET.get("limite", "")
+    por_pagina = min(int(limite), API_MAX_POR_PAGINA) if limite.isdigit() and int(limite) > 0 else API_POR_PAGINA
+
+    # ---------- GET condicional ----------
+    # Una fecha HTTP tiene resolución de segundos: si el último cambio es de
+    # este mismo segundo no se envía, porque otro cambio antes de que acabe
+    # tendría la misma fecha y daría un 304 falso
+    etag = _etag_api(request)
+    modificado = int(cache_listado.modificado())
+    if modificado >= int(time.time()):
+        modificado = None
+    condicional = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if condicional is not None:
+        return condicional
+
+    # ---------- consulta ----------
+    proyectos = filtrar_proyectos(Proyecto.objects.all(), request.GET)
+    if desde is not None:
+        proyectos = proyectos.filter(actualizado__gte=desde)
+        orden = ("actualizado", "id")
+    elif request.GET.get("q"):
+        orden = ("-rank", "-id")
+    else:
+        orden = ("-fecha_subida", "-id")
+
+    columnas = {"id", *(c.lstrip("-") for c in orden if c != "-rank")}
+    for campo in campos:
+        columnas.update(CAMPOS_API[campo][0])
+    proyectos = proyectos.only(*columnas)
+
+    pagina = PaginadorCursor(proyectos, por_pagina, orden).pagina(request.GET.get("cursor"))
+
+    def enlace(cursor):
+        if cursor is None:
+            return None
+        consulta = request.GET.copy()
+        consulta["cursor"] = cursor
+        return request.build_absolute_uri(f"{request.path}?{consulta.urlencode()}")
+
+    response = JsonResponse({
+        "resultados": [{campo: CAMPOS_API[campo][1](p, request) for campo in campos} for p in pagina],
+        "siguiente": enlace(pagina.next_cursor),
+        "anterior": enlace(pagina.previous_cursor),
+    }, json_dumps_params={"ensure_ascii": False})
+
+    response["ETag"] = etag
+    if modificado is not None:
+        response["Last-Modified"] = http_date(modificado)
+    # Siempre se revalida: el 304 es barato
+    response["Cache-Control"] = "no-cache"
     return response
 
 
@@ -201,6 +414,7 @@ def registro(request):
         if form.is_valid():
             user = form.save()
 
+            # Sólo encola en la bandeja de salida; lo envía `enviar_correos`
             send_mail(
                 "Bienvenido",
                 f"Hola {user.first_name}, tu cuenta fue creada exitosamente.",
@@ -221,10 +435,10 @@ def registro(request):
 # ROLES
 # =========================================
 def es_admin(user):
-    return user.rol == "admin"
+    return user.is_authenticated and user.rol == "admin"
 
 def es_estudiante(user):
-    return user.rol == "estudiante"
+    return user.is_authenticated and user.rol == "estudiante"
 
 
 @user_passes_test(es_admin)
@@ -237,6 +451,49 @@ def subir_proyecto(request):
     return render(request, "subir.html")
 
 
+# =========================================
+# MÉTRICAS (PROMETHEUS)
+# =========================================
+@never_cache
+@user_passes_test(es_admin)
+def exportar_metricas(request):
+    return HttpResponse(metricas.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# =========================================
+# TRAZAS (SUBIDAS Y SINOPSIS)
+# =========================================
+TRAZAS_EN_CASCADA = 20
+
+
+@never_cache
+@user_passes_test(es_admin)
+def ver_trazas(request):
+    recientes = trazas.recientes()
+    nombre = request.GET.get("nombre", "")
+    traza_id = request.GET.get("traza", "")
+
+    if traza_id:
+        # La petición y las tareas del worker que encoló, en orden
+        seleccion = sorted((t for t in recientes if t["traza"] == traza_id), key=lambda t: t["inicio"])
+    elif nombre:
+        seleccion = [t for t in recientes if t["nombre"] == nombre]
+    else:
+        seleccion = recientes
+
+    return render(request, "trazas.html", {
+        "nombres": sorted({t["nombre"] for t in recientes}),
+        "nombre": nombre,
+        "traza_id": traza_id,
+        "total": len(seleccion),
+        "resumen": trazas.resumen_por_etapa(seleccion),
+        "trazas": [
+            {**t, "ms": round(t["duracion"] * 1000, 1), "filas": trazas.cascada(t)}
+            for t in seleccion[:TRAZAS_EN_CASCADA]
+        ],
+    })
+
+
 # =========================================
 # MIS PROYECTOS
 # =========================================
@@ -254,7 +511,21 @@ def editar_proyecto(request, id):
     if request.method == "POST":
         form = ProyectoForm(request.POST, request.FILES, instance=proyecto)
         if form.is_valid():
-            form.save()
+            proyecto = form.save(commit=False)
+
+            # Archivo nuevo: hay que volver a extraer texto y generar sinopsis
+            if "archivo" in form.changed_data:
+                proyecto.texto_extraido = ""
+                proyecto.estado_sinopsis = Proyecto.SINOPSIS_PENDIENTE
+                proyecto.paginas_vista_previa = None
+
+            with transaction.atomic():
+                proyecto.save()
+            if "archivo" in form.changed_data:
+                encolar("sinopsis", proyecto)
+                encolar("vista_previa", proyecto)
+            if "portada" in form.changed_data and proyecto.portada:
+                encolar("miniaturas", proyecto)
             return redirect('mis_proyectos')
     else:
         form = ProyectoForm(instance=proyecto)
@@ -269,10 +540,8 @@ def eliminar_proyecto(request, id):
     proyecto = get_object_or_404(Proyecto, id=id, creado_por=request.user)
 
     if request.method == "POST":
-        # Eliminar el archivo físico si existe
-        if proyecto.archivo:
-            if os.path.isfile(proyecto.archivo.path):
-                os.remove(proyecto.archivo.path)
+        # El archivo se borra en signals.soltar_archivos, sólo si ningún
+        # otro proyecto comparte el mismo documento
         proyecto.delete()
         return redirect('mis_proyectos')
 
@@ -285,19 +554,61 @@ def eliminar_proyecto(request, id):
 # =========================================
 def ver_proyecto(request, proyecto_id):
     proyecto = get_object_or_404(Proyecto, id=proyecto_id)
-    return render(request, "ver_proyecto.html", {"proyecto": proyecto})
+
+    # Sin vista previa aún (recién subido o anterior a las vistas previas):
+    # la renderiza el worker; aquí sólo se encola si no hay tarea en curso
+    pendiente = proyecto.paginas_vista_previa is None
+    if pendiente and not Tarea.objects.filter(
+        tipo="vista_previa", proyecto=proyecto, estado__in=[Tarea.PENDIENTE, Tarea.EN_PROCESO]
+    ).exists():
+        encolar("vista_previa", proyecto)
+
+    return render(request, "ver_proyecto.html", {
+        "proyecto": proyecto,
+        "vista_previa": vista_previa.urls(proyecto),
+        "vista_previa_pendiente": pendiente,
+        "es_pdf": vista_previa.es_pdf(proyecto.archivo.name),
+    })
 
 
 # =========================================
 # GENERAR SINOPSIS ia
 # =========================================
-def generar_sinopsis_view(request):
+# Vista async: bajo ASGI, mientras Gemini responde el worker sigue
+# atendiendo otras peticiones (ver utils.generar_sinopsis_async).
+async def generar_sinopsis_view(request):
     sinopsis = None
-
-    if request.method == "POST":
-        texto = request.POST.get("texto", "")
-        sinopsis = generar_sinopsis(texto)
-
-    return render(request, "generar_sinopsis.html", {"sinopsis": sinopsis})
+    error = None
+    rechazo = None
+
+    # Sólo los POST (los que llaman a Gemini) dejan traza
+    raiz = trazas.traza("generar_sinopsis") if request.method == "POST" else nullcontext()
+    async with raiz:
+        if request.method == "POST":
+            texto = request.POST.get("texto", "")
+            raiz.anotar(caracteres=len(texto))
+            try:
+                async with trazas.tramo("admision"):
+                    await admision.limitar_cliente(request)
+                async with trazas.tramo("sinopsis", caracteres=len(texto)):
+                    sinopsis = await generar_sinopsis_async(texto)
+            except admision.Rechazado as e:
+                rechazo = e
+                error = e.mensaje
+                raiz.resultado = f"rechazado {e.estado}"
+            except TimeoutError:
+                error = "El servicio de IA tardó demasiado en responder. Inténtalo de nuevo."
+                raiz.resultado = "timeout"
+
+        # render toca la BD (usuario, perfil): se ejecuta en un hilo
+        async with trazas.tramo("render"):
+            response = await sync_to_async(render)(request, "generar_sinopsis.html", {
+                "sinopsis": sinopsis,
+                "error": error,
+            }, status=rechazo.estado if rechazo else 200)
+
+    if rechazo:
+        response["Retry-After"] = str(rechazo.reintentar)
+    return response
 
 
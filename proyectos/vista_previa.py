@@ -0,0 +1,103 @@
+# proyectos/vista_previa.py
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .models import Proyecto
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------
+# VISTA PREVIA DE DOCUMENTOS
+# ------------------------------------
+# En lugar de incrustar el PDF completo (hasta 20MB) en ver_proyecto, se
+# renderizan sus primeras páginas a WebP una sola vez y se guardan en
+#   vistas_previas/<archivo>/<n>.webp
+# Se sirven como media con caché corta y ETag. El PDF sólo se carga
+# cuando el usuario lo pide. Requiere pymupdf; sin él no hay vista previa.
+
+PAGINAS = getattr(settings, "VISTA_PREVIA_PAGINAS", 3)
+ANCHO = getattr(settings, "VISTA_PREVIA_ANCHO", 900)
+CALIDAD = 75
+
+PREFIJO = "vistas_previas/"
+
+
+def es_pdf(nombre):
+    return (nombre or "").lower().endswith(".pdf")
+
+
+def ruta(archivo, pagina):
+    return f"{PREFIJO}{archivo}/{pagina}.webp"
+
+
+def urls(proyecto):
+    if not proyecto.paginas_vista_previa:
+        return []
+    return [
+        default_storage.url(ruta(proyecto.archivo.name, n))
+        for n in range(1, proyecto.paginas_vista_previa + 1)
+    ]
+
+
+def _abrir(archivo):
+    import pymupdf
+
+    try:
+        # Desde disco pymupdf sólo lee las páginas que se renderizan
+        return pymupdf.open(default_storage.path(archivo.name), filetype="pdf")
+    except NotImplementedError:
+        with archivo.open("rb") as f:
+            return pymupdf.open(stream=f.read(), filetype="pdf")
+
+
+def _renderizar(archivo, paginas, ancho):
+    import pymupdf
+
+    with _abrir(archivo) as documento:
+        for indice in range(min(paginas, documento.page_count)):
+            pagina = documento[indice]
+            zoom = ancho / pagina.rect.width
+            pix = pagina.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            imagen = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+            salida = io.BytesIO()
+            imagen.save(salida, "WEBP", quality=CALIDAD, method=4)
+            yield salida.getvalue()
+
+
+def generar(proyecto, paginas=PAGINAS, ancho=ANCHO):
+    """Renderiza las primeras páginas del PDF de `proyecto` y guarda
+    cuántas quedaron en `paginas_vista_previa` (0 si no hay vista previa)."""
+    total = 0
+    nombre = proyecto.archivo.name if proyecto.archivo else ""
+
+    # Otro proyecto con el mismo documento ya tiene sus páginas renderizadas
+    previas = nombre and (
+        Proyecto.objects.filter(archivo=nombre, paginas_vista_previa__gt=0)
+        .exclude(pk=proyecto.pk).values_list("paginas_vista_previa", flat=True).first()
+    )
+    if previas and default_storage.exists(ruta(nombre, previas)):
+        total = previas
+    elif es_pdf(nombre):
+        try:
+            for total, imagen in enumerate(_renderizar(proyecto.archivo, paginas, ancho), 1):
+                destino = ruta(nombre, total)
+                if default_storage.exists(destino):
+                    default_storage.delete(destino)
+                default_storage.save(destino, ContentFile(imagen))
+        except ImportError:
+            # Se guarda 0 igual: con None ver_proyecto encolaría en cada visita
+            logger.warning("pymupdf no está instalado: no se generan vistas previas")
+            total = 0
+        except Exception:
+            logger.warning("No se pudo generar la vista previa de %s", proyecto, exc_info=True)
+
+    # update() y no save(): no debe invalidar el listado ni tocar estadísticas
+    Proyecto.objects.filter(pk=proyecto.pk).update(paginas_vista_previa=total)
+    proyecto.paginas_vista_previa = total
+    return total
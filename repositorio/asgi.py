@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'repositorio.settings')
 
+# Las vistas async (sinopsis IA) sólo liberan el worker bajo ASGI:
+#   gunicorn repositorio.asgi:application -k uvicorn.workers.UvicornWorker
+# Con --preload y PRECARGAR_DEPENDENCIAS=True el cliente de Gemini y los
+# extractores se cargan una vez en el maestro y no en cada worker.
 application = get_asgi_application()
@@ -66,9 +66,12 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 
 MIDDLEWARE = [
+    'proyectos.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    # Antes que CSRF, que lee el cuerpo: mide la recepción de las subidas
+    'proyectos.trazas.RecepcionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -83,7 +86,7 @@ ROOT_URLCONF = 'repositorio.urls'
 
 TEMPLATES = [
     {   
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'proyectos.backends.PlantillasMedidas',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -94,6 +97,7 @@ TEMPLATES = [
                 'django.template.context_processors.csrf',
                 'django.template.context_processors.static',
                 'django.contrib.messages.context_processors.messages',  
+                'proyectos.context_processors.navegacion',
             ],
         },
     },
@@ -141,6 +145,13 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 AUTH_USER_MODEL = "proyectos.Usuario"
 
+# BackendConPerfil carga usuario + perfil en una consulta. ModelBackend se
+# mantiene para las sesiones iniciadas antes del cambio.
+AUTHENTICATION_BACKENDS = [
+    "proyectos.backends.BackendConPerfil",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -163,23 +174,119 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Documentos y portadas de proyectos se guardan una vez por contenido
+# (proyectos/almacenamiento.py); el resto de media usa el almacenamiento normal
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "deduplicado": {"BACKEND": "proyectos.almacenamiento.AlmacenamientoDeduplicado"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'inicio'
 LOGOUT_REDIRECT_URL = 'inicio'
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-EMAIL_HOST = "smtp.gmail.com"
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST_USER = "mobj990516@gmail.com"
-EMAIL_HOST_PASSWORD = "uxhd fuvc vhtp fkxs"  # la de 16 caracteres
-DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# send_mail() sólo encola en CorreoSaliente (proyectos/correo.py);
+# `manage.py enviar_correos` entrega por SMTP en lotes.
+# Para probar en local: python -m aiosmtpd -n -l localhost:1025
+# con EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=False
+EMAIL_BACKEND = "proyectos.correo.BackendBandeja"
+CORREO_BACKEND_ENVIO = "django.core.mail.backends.smtp.EmailBackend"
+CORREO_MAX_INTENTOS = 5
+CORREO_BLOQUEO = 300         # un correo "enviando" más tiempo que esto se reintenta
+EMAIL_HOST = config("EMAIL_HOST", default="smtp.gmail.com")
+EMAIL_PORT = config("EMAIL_PORT", default=587, cast=int)
+EMAIL_USE_TLS = config("EMAIL_USE_TLS", default=True, cast=bool)
+# Credenciales sólo desde el entorno (.env); con Gmail, una contraseña de aplicación.
+# Vacías basta para encolar; enviar_correos se niega a arrancar sin ellas.
+EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
+EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default=EMAIL_HOST_USER or "webmaster@localhost")
 
 SITE_ID = 1
 ACCOUNT_EMAIL_VERIFICATION = "mandatory"
 ACCOUNT_SIGNUP_FIELDS = ['email*', 'username*', 'password1*', 'password2*']
 LOGIN_REDIRECT_URL = "/"
 GEMINI_API_KEY = config("GEMINI_API_KEY", default=None)
+GEMINI_TIMEOUT = 30          # segundos por llamada
+GEMINI_CONCURRENCIA = 8      # llamadas simultáneas por worker (vista async)
+# Cargar genai/PyPDF2/docx en ready() y no en la primera petición.
+# Sólo tiene sentido con `gunicorn --preload` (los workers lo heredan).
+PRECARGAR_DEPENDENCIAS = config("PRECARGAR_DEPENDENCIAS", default=False, cast=bool)
+
+# Documentos largos: resumen por fragmentos (proyectos/resumen.py)
+SINOPSIS_TOKENS_POR_FRAGMENTO = 6000   # también el umbral para fragmentar
+SINOPSIS_MAX_FRAGMENTOS = 12           # acota el tiempo total
+SINOPSIS_CONCURRENCIA_FRAGMENTOS = 4
+
+# Admisión de /sinopsis/ (proyectos/admision.py): cubetas de tokens
+SINOPSIS_CLIENTE_CAPACIDAD = 5       # ráfaga por usuario/IP
+SINOPSIS_CLIENTE_POR_MINUTO = 5
+SINOPSIS_GLOBAL_CAPACIDAD = 30       # llamadas reales a Gemini, todo el sitio
+SINOPSIS_GLOBAL_POR_MINUTO = 60
+SINOPSIS_MAX_COLA = 32               # llamadas esperando o en vuelo por worker
+ADMISION_CABECERA_IP = config("ADMISION_CABECERA_IP", default=None)
+
+# Límites de la extracción de texto de PDF/DOCX
+EXTRACCION_MAX_CARACTERES = 200000
+EXTRACCION_MAX_PAGINAS = 300
+
+# Vista previa de PDF en ver_proyecto: primeras páginas como WebP (pymupdf)
+VISTA_PREVIA_PAGINAS = 3
+VISTA_PREVIA_ANCHO = 900
+
+# Entrega de archivos subidos: "python", "nginx" (X-Accel-Redirect) o
+# "apache" (X-Sendfile). Con nginx hace falta una location interna:
+#   location /media-interna/ { internal; alias /ruta/a/media/; }
+ENTREGA_ARCHIVOS = config("ENTREGA_ARCHIVOS", default="python")
+ENTREGA_PREFIJO_INTERNO = "/media-interna/"
+MEDIA_CACHE_SEGUNDOS = 60 * 60 * 24 * 365
+# Media que puede cambiar con el mismo nombre (archivos previos a los blobs,
+# vistas previas): caché corta y luego revalidación con ETag
+MEDIA_CACHE_CORTA_SEGUNDOS = 300
+
+# Cada cuántos segundos se escriben en la BD las descargas acumuladas
+DESCARGAS_INTERVALO_VOLCADO = 10
+
+# Cola de tareas (manage.py procesar_tareas)
+TAREAS_MAX_INTENTOS = 5
+TAREAS_RETRASO_BASE = 30     # segundos; se duplica en cada reintento
+TAREAS_RETRASO_MAX = 3600
+TAREAS_BLOQUEO = 600         # una tarea "en proceso" más tiempo que esto se reintenta
+
+# Caché compartida entre workers (listado de inicio). Con REDIS_URL se usa
+# Redis; si no, archivos en disco, que también ven todos los procesos.
+REDIS_URL = config("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": config("CACHE_DIR", default=str(BASE_DIR / ".cache")),
+            # Con las 300 entradas por defecto el anillo de trazas desalojaría el listado
+            "OPTIONS": {"MAX_ENTRIES": 3000},
+        }
+    }
+LISTADO_CACHE_SEGUNDOS = 600
+
+# Métricas por vista en /metricas/ (formato Prometheus, sólo admins). Cada
+# worker escribe su copia en METRICAS_DIR cada METRICAS_INTERVALO segundos;
+# el directorio debe ser local a la máquina (la vista suma los de sus workers).
+METRICAS_DIR = config("METRICAS_DIR", default=str(BASE_DIR / ".metricas"))
+METRICAS_INTERVALO = 5
+
+# Trazas por etapa de subidas, sinopsis y tareas (/trazas/, sólo admins):
+# las últimas TRAZAS_MAX en la caché compartida y, con TRAZAS_ARCHIVO, una
+# línea OTLP/JSON por traza (receptor "otlpjsonfile" del Collector).
+TRAZAS_MAX = 200
+TRAZAS_ARCHIVO = config("TRAZAS_ARCHIVO", default="")
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
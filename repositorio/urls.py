@@ -20,7 +20,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
-from django.views.static import serve
+from proyectos.views import servir_media
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -41,10 +41,8 @@ urlpatterns = [
     path('reset/done/', auth_views.PasswordResetCompleteView.as_view(), name='password_reset_complete'),
     
 
-     path('media/<path:path>', serve, {
-        'document_root': settings.MEDIA_ROOT,
-        'show_indexes': True
-    }),
+    # Archivos subidos: Range, ETag y caché larga (ver proyectos/entrega.py)
+    path('media/<path:path>', servir_media, name='media'),
     
 
 
@@ -56,9 +54,8 @@ urlpatterns = [
     path('password/change/done/', 
          auth_views.PasswordChangeDoneView.as_view(template_name="auth/password_change_done.html"),
          name='password_change_done'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
 
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])